@@ -5,6 +5,8 @@ CCG2LAMP_HOME = os.path.dirname(os.path.dirname(__file__))
 
 CCG2LAMP_PARSER_EXE = os.path.join(CCG2LAMP_HOME, "candc-1.00/bin/candc")
 CCG2LAMP_PARSER_MODEL = os.path.join(CCG2LAMP_HOME, "candc-1.00/models")
+CCG2LAMP_PARSER_SERVER = os.path.join(CCG2LAMP_HOME, "candc-1.00/bin/soap_server")
+CCG2LAMP_PARSER_CLIENT = os.path.join(CCG2LAMP_HOME, "candc-1.00/bin/soap_client")
 
 CCG2LAMP_SEM_TEMPLATE = os.path.join(CCG2LAMP_HOME, "ccg2lamp/en/semantic_templates_en_emnlp2015.yaml")
 
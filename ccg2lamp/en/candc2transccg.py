@@ -16,6 +16,7 @@
 #  limitations under the License.
 
 import argparse
+import bisect
 import copy
 from lxml import etree
 import logging
@@ -202,37 +203,96 @@ def make_token_sentence(sentence_id, token_sentence: List[str]):
         tokens_parent.append(token_node)
     return transccg_tree
 
-def translate_candc_tree(token_sentences, xml_fname, log_fname):
-    """translate C&C parse tree to CCG tree"""
-    failed_inds = set()
-    if log_fname:
-        # failed_inds is 1-based
-        failed_inds = get_failed_inds_from_log(log_fname)
-        logging.debug('Found failures: {0}'.format(failed_inds))
+def get_token_words(ccg_tree):
+    """the words of the leaves of a C&C parse tree in sentence order"""
+    return [lf.get('word') for lf in ccg_tree.iter('lf')]
 
-    xml_tree = deserialize_file_to_tree(xml_fname)
-    root = xml_tree.getroot()
-    ccg_trees = root.findall('ccg')
-    ccg_index = 0
+def iter_candc_trees(candc_stream):
+    """
+    Yield the <ccg> parse trees of a C&C XML stream (e.g. the stdout of the
+    parser) as soon as each one is complete, without waiting for the rest.
+    """
+    for _event, ccg_tree in etree.iterparse(candc_stream, events=('end',), tag='ccg',
+                                            remove_blank_text=True):
+        yield ccg_tree
+
+def align_ccg_trees(token_sentences, ccg_trees):
+    """
+    Pair every token sentence with its C&C parse tree, or None if the
+    parser failed on it. C&C prints no tree for a failed sentence, so
+    without a log file the trees are aligned by comparing their words
+    with the tokens. A tree whose words match no remaining sentence
+    (e.g. the parser escaped a token) is assigned to the current one,
+    with a warning, since it may belong to a later sentence.
+    The trees are consumed lazily, so they can come from a stream.
+    """
+    # the positions of every sentence, to find whether it comes later
+    sentence_positions = {}
+    for sentence_index, tokens in enumerate(token_sentences):
+        sentence_positions.setdefault(tuple(tokens), []).append(sentence_index)
+    ccg_trees = iter(ccg_trees)
+    ccg_tree = next(ccg_trees, None)
+    for sentence_index, tokens in enumerate(token_sentences):
+        if ccg_tree is None:
+            yield None
+            continue
+        words = get_token_words(ccg_tree)
+        if words != tokens:
+            positions = sentence_positions.get(tuple(words), [])
+            if bisect.bisect_right(positions, sentence_index) < len(positions):
+                # the parser skipped this sentence
+                yield None
+                continue
+            logging.warning(f'C&C tree of "{" ".join(words)}" assigned to '
+                            f'sentence {sentence_index + 1} "{" ".join(tokens)}"')
+        yield ccg_tree
+        ccg_tree = next(ccg_trees, None)
+    assert ccg_tree is None, 'C&C trees left without a sentence'
 
+def translate_ccg_trees(token_sentences, sentence_trees):
+    """translate C&C parse trees, one per sentence or None if failed, to CCG tree"""
     transccg_trees = []
-    total_sentences = len(token_sentences)
-    for sentence_num in range(1, total_sentences + 1):
-        if sentence_num in failed_inds:
+    for sentence_num, ccg_tree in enumerate(sentence_trees, start=1):
+        if ccg_tree is None:
             # Make sentence node with just tokens
-            transccg_tree = make_token_sentence(sentence_num - 1, 
+            transccg_tree = make_token_sentence(sentence_num - 1,
                                                 token_sentences[sentence_num - 1])
             logging.debug(f'Make dummy node for sentence {sentence_num}')
         else:
             # Translate C&C parse tree
-            transccg_tree = candc_to_transccg(ccg_trees[ccg_index], sentence_num - 1)
-            ccg_index += 1
+            transccg_tree = candc_to_transccg(ccg_tree, sentence_num - 1)
             logging.debug(f'Translate CCG tree for sentence {sentence_num}')
         transccg_trees.append(transccg_tree)
+    assert len(transccg_trees) == len(token_sentences)
+    return make_transccg_xml_tree(transccg_trees)
 
-    assert len(transccg_trees) == total_sentences
-    transccg_xml_tree = make_transccg_xml_tree(transccg_trees)
-    return transccg_xml_tree, xml_tree.docinfo.encoding
+def read_candc_trees(token_sentences, xml_fname, log_fname):
+    """
+    Read the C&C parse trees of a file, one per token sentence or None if
+    the parser failed on it. The failures in the log are 1-based indices
+    into token_sentences.
+    """
+    failed_inds = set()
+    if log_fname:
+        # failed_inds is 1-based
+        failed_inds = get_failed_inds_from_log(log_fname)
+        logging.debug('Found failures: {0}'.format(failed_inds))
+
+    xml_tree = deserialize_file_to_tree(xml_fname)
+    root = xml_tree.getroot()
+    ccg_trees = root.findall('ccg')
+    if not log_fname:
+        return list(align_ccg_trees(token_sentences, ccg_trees)), xml_tree.docinfo.encoding
+    ccg_trees = iter(ccg_trees)
+    sentence_trees = [None if sentence_num in failed_inds else next(ccg_trees)
+                      for sentence_num in range(1, len(token_sentences) + 1)]
+    return sentence_trees, xml_tree.docinfo.encoding
+
+def translate_candc_tree(token_sentences, xml_fname, log_fname):
+    """translate C&C parse tree to CCG tree"""
+    sentence_trees, encoding = read_candc_trees(token_sentences, xml_fname, log_fname)
+    transccg_xml_tree = translate_ccg_trees(token_sentences, sentence_trees)
+    return transccg_xml_tree, encoding
 
 def read_token_file(token_fname):
     with open(token_fname, "r") as fp:
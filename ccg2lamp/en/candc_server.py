@@ -0,0 +1,131 @@
+"""Long-lived C&C parser servers that load the models only once"""
+import atexit
+import logging
+import queue
+import socket
+import subprocess
+import threading
+import time
+from typing import List
+
+import ccg2lamp
+
+my_logger = logging.getLogger(__name__)
+
+# the pools shared by all the parsers of this process
+SERVER_POOLS = {}
+SERVER_POOLS_LOCK = threading.Lock()
+
+def find_free_port(host: str = "localhost") -> int:
+    """ask the OS for a port nobody listens to"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+class CandCServerPool():
+    """
+    A pool of C&C soap servers that share the same models and printer.
+    Each server loads the models once at start-up, then every batch of
+    sentences is sent to a free server with the soap client, so several
+    batches can be parsed at the same time.
+    """
+    def __init__(self, workers: int = 1,
+                 config_file: str = None,
+                 parser_printer: str = "xml",
+                 host: str = "localhost",
+                 startup_timeout: int = 300):
+        assert workers >= 1
+        self.server_exe = ccg2lamp.CCG2LAMP_PARSER_SERVER
+        self.client_exe = ccg2lamp.CCG2LAMP_PARSER_CLIENT
+        self.model_path = ccg2lamp.CCG2LAMP_PARSER_MODEL
+        self.workers = workers
+        self.config_file = config_file
+        self.parser_printer = parser_printer
+        self.host = host
+        self.startup_timeout = startup_timeout
+        self.servers = []
+        self.free_urls = queue.Queue()
+
+    def start(self):
+        """launch the servers and wait until all of them accept connections"""
+        ports = [find_free_port(self.host) for _ in range(self.workers)]
+        for port in ports:
+            server_command = [self.server_exe]
+            if self.config_file:
+                server_command += ["--config", self.config_file]
+            server_command += ["--models", self.model_path,
+                               "--candc-printer", self.parser_printer,
+                               "--server", f"{self.host}:{port}"]
+            server = subprocess.Popen(server_command,
+                                      stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+            self.servers.append(server)
+            my_logger.debug(f"{server_command} -> pid {server.pid}")
+        try:
+            for server, port in zip(self.servers, ports):
+                self.wait_for_server(server, port)
+                self.free_urls.put(f"http://{self.host}:{port}")
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def wait_for_server(self, server: subprocess.Popen, port: int):
+        """poll the port of a server until the models are loaded"""
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"C&C server on port {port} exited with {server.returncode}")
+            try:
+                with socket.create_connection((self.host, port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.5)
+        raise TimeoutError(f"C&C server on port {port} not ready in {self.startup_timeout}s")
+
+    def parse(self, token_sentences: List[List[str]]) -> bytes:
+        """parse tokenized sentences on the next free server"""
+        token_text = "".join(" ".join(tokens) + "\n" for tokens in token_sentences)
+        url = self.free_urls.get()
+        try:
+            client_command = [self.client_exe, "--url", url]
+            completed_process = subprocess.run(client_command, check=True,
+                                               input=token_text.encode("utf-8"),
+                                               stdout=subprocess.PIPE,
+                                               stderr=subprocess.DEVNULL)
+            my_logger.debug(f"{client_command} -> {completed_process.returncode}")
+        finally:
+            self.free_urls.put(url)
+        return completed_process.stdout
+
+    def close(self):
+        """stop all the servers"""
+        for server in self.servers:
+            if server.poll() is None:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+        self.servers = []
+        self.free_urls = queue.Queue()
+
+def get_server_pool(workers: int = 1, config_file: str = None,
+                    parser_printer: str = "xml") -> CandCServerPool:
+    """get the running pool for a configuration, starting it on first use"""
+    pool_key = (workers, config_file, parser_printer)
+    with SERVER_POOLS_LOCK:
+        if pool_key not in SERVER_POOLS:
+            server_pool = CandCServerPool(workers=workers,
+                                          config_file=config_file,
+                                          parser_printer=parser_printer)
+            SERVER_POOLS[pool_key] = server_pool.start()
+        return SERVER_POOLS[pool_key]
+
+@atexit.register
+def close_server_pools():
+    """stop the servers of all the pools when the process exits"""
+    with SERVER_POOLS_LOCK:
+        for server_pool in SERVER_POOLS.values():
+            server_pool.close()
+        SERVER_POOLS.clear()
@@ -0,0 +1,53 @@
+"""On-disk cache of C&C parse trees keyed by the tokens of a sentence"""
+import logging
+from typing import List
+
+from lxml import etree
+
+from ccg2lamp.scripts.sqlite_store import LRUStore
+
+my_logger = logging.getLogger(__name__)
+
+# the value of a sentence the parser failed on
+FAILED_PARSE = b""
+
+class ParseCache(LRUStore):
+    """
+    A store that maps a hash of the tokens of a sentence and the identity of
+    the parser to the C&C <ccg> tree of the sentence, or to FAILED_PARSE if
+    the parser failed on it. The raw tree is stored instead of the
+    translated <sentence>, because the translated ids depend on the position
+    of the sentence in its corpus. When the store grows over max_bytes, the
+    least recently used trees are evicted.
+    """
+    def __init__(self, cache_file: str,
+                 parser_identity: str = "",
+                 max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(cache_file, "parses", [("tree", "BLOB NOT NULL")],
+                         parser_identity, max_bytes)
+
+    def get_trees(self, token_sentences: List[List[str]]) -> dict:
+        """
+        Look up the sentences, returning a dict from the index of each hit
+        to its <ccg> tree, or None if the parser failed on the sentence.
+        """
+        keys = [self.make_key(" ".join(tokens)) for tokens in token_sentences]
+        stored_trees = {key: tree for key, (tree,) in self.get_rows(keys).items()}
+        cached_trees = {}
+        for sentence_index, key in enumerate(keys):
+            if key not in stored_trees:
+                continue
+            tree_bytes = stored_trees[key]
+            # every sentence gets its own copy, since the translation changes it
+            cached_trees[sentence_index] = \
+                None if tree_bytes == FAILED_PARSE else etree.fromstring(tree_bytes)
+        my_logger.debug(f"{len(cached_trees)} of {len(keys)} parses found in {self.store_file}")
+        return cached_trees
+
+    def put_trees(self, token_sentences: List[List[str]], sentence_trees: list):
+        """store the <ccg> trees of the sentences, None if the parser failed"""
+        rows = []
+        for tokens, ccg_tree in zip(token_sentences, sentence_trees):
+            tree_bytes = FAILED_PARSE if ccg_tree is None else etree.tostring(ccg_tree)
+            rows.append((self.make_key(" ".join(tokens)), (tree_bytes,), len(tree_bytes)))
+        self.put_rows(rows)
@@ -0,0 +1,46 @@
+"""Precompile the WordNet relations of every lemma, and the VerbOcean relations, into a LexicalIndex"""
+import argparse
+import json
+import logging
+
+from nltk.corpus import wordnet as wn
+
+from ccg2lamp.scripts.lexical_index import POS_LIST, write_lexical_index
+from ccg2lamp.scripts.linguistic_tools import make_synsets_record, make_word_record
+
+my_logger = logging.getLogger(__name__)
+
+def make_word_records():
+    for word_index, word in enumerate(wn.all_lemma_names()):
+        if word_index % 10000 == 0:
+            my_logger.info(f"{word_index} lemmas indexed")
+        yield word, make_word_record(word)
+
+def make_lemma_records():
+    """the records of the synsets of every lemma with each part of speech, as wn.synsets finds them"""
+    # the satellite adjectives are listed with the adjectives, as in wn.synsets
+    for lemma, pos_offsets in wn._lemma_pos_offset_map.items():
+        for pos in POS_LIST:
+            if pos in pos_offsets:
+                synsets = [wn.synset_from_pos_and_offset(pos, offset)
+                           for offset in pos_offsets[pos]]
+                yield lemma, pos, make_synsets_record(synsets)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("outfile", help="SQLite file of the index")
+    parser.add_argument("--verbocean", default=None,
+                        help="JSON file made by verbocean_to_json.py")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    verbocean = None
+    if args.verbocean:
+        with open(args.verbocean, 'r') as fin:
+            verbocean = json.load(fin)
+    wn.ensure_loaded()
+    write_lexical_index(args.outfile, make_word_records(), verbocean,
+                        lemma_records=make_lemma_records(),
+                        exceptions={pos: wn._exception_map[pos] for pos in POS_LIST},
+                        substitutions={pos: wn.MORPHOLOGICAL_SUBSTITUTIONS[pos]
+                                       for pos in POS_LIST})
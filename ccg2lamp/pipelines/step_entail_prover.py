@@ -17,9 +17,27 @@ class COQEntailmentProver(TransformerMixin):
     def __init__(self, do_abduction: str = "no",
                  gold_trees: bool = False,
                  timeout: int = 100,
-                 use_ncores: int = 1):
+                 use_ncores: int = 1,
+                 coq_sessions: int = 0,
+                 proof_cache_file: str = None,
+                 coq_workers: int = 1,
+                 failure_logs: str = "unknown",
+                 staged_tactics: bool = False,
+                 wordnet_cache_file: str = None,
+                 lexical_index_file: str = None,
+                 batch_axiom_checks: bool = False,
+                 ranked_semantics: bool = False):
         """initialize the prover with parameters
         Parameters:
+            coq_sessions: number of warm coqtop sessions per core, 0 to start a coqtop per theorem
+            proof_cache_file: SQLite file that caches the coqtop outputs, None to always run coqtop
+            coq_workers: number of theorems and negations proved at the same time per core
+            failure_logs: "unknown" to analyze the failures of the unknown theorems, "no" to skip it
+            staged_tactics: try cheap tactics with adaptive timeouts before the full tactics
+            wordnet_cache_file: SQLite file of the WordNet relations of word pairs, None to not keep them
+            lexical_index_file: SQLite index built by en/wordnet_to_index.py, None to query WordNet
+            batch_axiom_checks: check the types of all the candidate axioms of an abduction in one coq run
+            ranked_semantics: prove the n-best theorems best first and skip the failed conclusions
         """
         # set up parameters for the prover
         prover.ARGS = argparse.Namespace()
@@ -27,6 +45,15 @@ class COQEntailmentProver(TransformerMixin):
         prover.ARGS.gold_trees = gold_trees
         prover.ARGS.timeout = timeout
         prover.ARGS.ncores = use_ncores
+        prover.ARGS.coq_sessions = coq_sessions
+        prover.ARGS.proof_cache = proof_cache_file
+        prover.ARGS.coq_workers = coq_workers
+        prover.ARGS.failure_logs = failure_logs
+        prover.ARGS.staged_tactics = staged_tactics
+        prover.ARGS.wordnet_cache = wordnet_cache_file
+        prover.ARGS.lexical_index = lexical_index_file
+        prover.ARGS.batch_axiom_checks = batch_axiom_checks
+        prover.ARGS.ranked_semantics = ranked_semantics
         prover.ARGS.print = "result"
         prover.ARGS.print_length = "full"
 
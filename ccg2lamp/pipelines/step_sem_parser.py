@@ -1,12 +1,10 @@
 import logging
-import argparse
 
 from sklearn.base import TransformerMixin
 
 import ccg2lamp
 from ccg2lamp.scripts.utils import time_count
-import ccg2lamp.scripts.semparse as semparse
-from ccg2lamp.scripts.semparse import sem_parse
+from ccg2lamp.scripts.semparse import SemanticParser
 
 from ccg2lamp.pipelines.data_types import ParseData
 
@@ -22,22 +20,36 @@ class CCGSemParser(TransformerMixin):
         
         self.model_path = ccg2lamp.CCG2LAMP_SEM_TEMPLATE
         
-        # set up the global parameters for the semantic parser
-        semparse.ARGS = argparse.Namespace()
-        semparse.ARGS.templates = self.model_path
-        semparse.ARGS.arbi_types = arbitrary_types
-        semparse.ARGS.gold_trees = gold_trees
-        semparse.ARGS.nbest = nbest_output
-        semparse.ARGS.ncores = use_ncores
+        # the semantic parser loads the templates once for all the documents
+        self.sem_parser = SemanticParser(self.model_path,
+                                         arbi_types=arbitrary_types,
+                                         gold_trees=gold_trees,
+                                         nbest=nbest_output,
+                                         ncores=use_ncores)
     
     @time_count
     def transform(self, parse_data: ParseData) -> ParseData:
         # this will extend the parse tree with semantic nodes
         if parse_data.parse_result is not None:
-            sem_parse(parse_data.parse_result)
+            self.sem_parser.parse(parse_data.parse_result)
         # so we can just return the parse data as is
         return parse_data
 
+    def close(self):
+        """stop the worker processes of the semantic parser, which restarts them if needed"""
+        self.sem_parser.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # the parser is missing if __init__ failed
+        if getattr(self, "sem_parser", None) is not None:
+            self.close()
+
 # unit test
 if __name__ == "__main__":
     import os
@@ -48,8 +60,8 @@ if __name__ == "__main__":
     tree_reader = CCGTreeReader()
     tree_writer = CCGTreeWriter(output_suffix="sem.xml", output_encode="utf-8")
     parse_data = tree_reader.transform("datasets/corpus_fail/sem_fail.syn.xml")
-    sem_parser = CCGSemParser(use_ncores=0)   
-    parse_data = sem_parser.transform(parse_data)
+    with CCGSemParser(use_ncores=0) as sem_parser:
+        parse_data = sem_parser.transform(parse_data)
     output = tree_writer.transform(parse_data)
     print("output=", output)
     assert os.path.basename(output.output_file) == "sem_fail.sem.xml"                  
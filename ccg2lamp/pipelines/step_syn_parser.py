@@ -1,7 +1,10 @@
+import io
 import os
 import subprocess
 import logging
 import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from sklearn.base import TransformerMixin
@@ -9,16 +12,68 @@ from sklearn.base import TransformerMixin
 import ccg2lamp
 from ccg2lamp.scripts.utils import time_count
 from .data_types import ParseData
-from ccg2lamp.en.candc2transccg import translate_candc_tree
+from ccg2lamp.en.candc2transccg import (read_candc_trees, iter_candc_trees,
+                                        align_ccg_trees, translate_ccg_trees)
+from ccg2lamp.en.candc_server import get_server_pool
+from ccg2lamp.en.parse_cache import ParseCache
+from ccg2lamp.scripts.sqlite_store import get_path_identity
 from ccg2lamp.pipelines.step_corpus_io import CorpusWriter
 
 my_logger = logging.getLogger(__name__)
 
+# C&C prints its XML trees in UTF-8
+CANDC_ENCODING = "UTF-8"
+
+def write_token_sentences(token_stream, token_sentences: List[List[str]]):
+    """write one sentence of tokens per line, then close the stream"""
+    try:
+        for tokens in token_sentences:
+            token_stream.write((" ".join(tokens) + "\n").encode(CANDC_ENCODING))
+        token_stream.close()
+    except BrokenPipeError:
+        # the parser died, its exit code tells why
+        pass
+
+def split_into_shards(token_sentences: List[List[str]], num_shards: int) -> List[List[List[str]]]:
+    """split the sentences into at most num_shards contiguous shards of even sizes"""
+    num_shards = max(1, min(num_shards, len(token_sentences)))
+    shard_size, remainder = divmod(len(token_sentences), num_shards)
+    shards = []
+    start = 0
+    for shard_index in range(num_shards):
+        end = start + shard_size + (1 if shard_index < remainder else 0)
+        shards.append(token_sentences[start:end])
+        start = end
+    return shards
+
 class CCGSynParser(TransformerMixin):
-    """Adapt C&C parser to scikit-learn transformer"""
+    """Adapt C&C parser to scikit-learn transformer
+
+    mode="file" runs a new parser process over token, log and output files.
+    mode="stream" pipes the tokens into a new parser process and translates
+    its output trees as they arrive, without any token, log or output file.
+    mode="pool" sends the tokens to a pool of long-lived parser servers
+    that load the models once and are shared by all the parsers of the
+    process, so several inputs can be parsed at the same time.
+
+    shards=N splits the sentences into N contiguous shards that are parsed
+    in parallel, then joined back in order.
+
+    cache_file=path keeps the parse of every sentence in an on-disk cache
+    of at most cache_size bytes, so only the sentences that were never
+    parsed with the same parser and models go to the parser.
+    """
     def __init__(self, config_file: str = None,
                  parser_printer: str = "xml",
-                 output_dir: str = None):
+                 output_dir: str = None,
+                 mode: str = "file",
+                 workers: int = 1,
+                 shards: int = 1,
+                 cache_file: str = None,
+                 cache_size: int = 256 * 1024 * 1024):
+        assert mode in ("file", "stream", "pool")
+        # the trees are translated as they come from the parser
+        assert mode == "file" or parser_printer == "xml"
 
         # figure out the command to run the parser
         self.parser_exe = ccg2lamp.CCG2LAMP_PARSER_EXE
@@ -27,6 +82,9 @@ class CCGSynParser(TransformerMixin):
         self.model_path = ccg2lamp.CCG2LAMP_PARSER_MODEL
         self.parser_printer = parser_printer
         self.output_dir = output_dir
+        self.mode = mode
+        self.workers = workers
+        self.shards = shards
         self.input_file = None
 
         if self.config_file:
@@ -37,9 +95,6 @@ class CCGSynParser(TransformerMixin):
         if self.output_dir and not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir, exist_ok=True)
 
-        # write tokens to a file for C&C parser
-        self.token_writer = CorpusWriter()
-        
         # prepare the commands to run
         input_file = "{0}"
         log_file = "{1}"
@@ -48,6 +103,21 @@ class CCGSynParser(TransformerMixin):
                           f"--models {self.model_path} " +
                           f"--candc-printer {self.parser_printer} " +
                           f"--input {input_file} --log {log_file} --output {output_file}")
+        # without files the parser reads stdin and writes stdout
+        self.ccg_stream = (f"{self.parser_exe} {config_option} " +
+                           f"--models {self.model_path} " +
+                           f"--candc-printer {self.parser_printer}")
+
+        # the parser command and the files it reads tell the parser and models
+        # that made a cached tree, so rebuilt models at the same path miss
+        self.parse_cache = None
+        if cache_file:
+            parser_identity = "\n".join(
+                [self.ccg_stream] + [get_path_identity(path) for path in
+                                     (self.parser_exe, self.model_path, self.config_file) if path])
+            self.parse_cache = ParseCache(cache_file,
+                                          parser_identity=parser_identity,
+                                          max_bytes=cache_size)
     
     def set_params(self, input_file=None):
         """set the input file before transform()"""
@@ -56,10 +126,105 @@ class CCGSynParser(TransformerMixin):
     @time_count
     def transform(self, token_sentences: List[List[str]]) -> ParseData:
         """parse tokenized sentences to XML trees"""
+        assert self.input_file is not None
+        try:
+            cached_trees = {}
+            if self.parse_cache:
+                cached_trees = self.parse_cache.get_trees(token_sentences)
+            # only the sentences missing from the cache go to the parser
+            missed_sentences = [tokens for sentence_index, tokens in enumerate(token_sentences)
+                                if sentence_index not in cached_trees]
+            input_file, output_file = self.input_file, None
+            parsed_trees = []
+            parse_encode = CANDC_ENCODING
+            if missed_sentences:
+                parsed_trees, parse_encode, (input_file, output_file) = \
+                    self.parse_sentences(missed_sentences)
+                if self.parse_cache:
+                    self.parse_cache.put_trees(missed_sentences, parsed_trees)
+            if cached_trees:
+                # the parser files hold only the missed sentences
+                input_file, output_file = self.input_file, None
+
+            # splice the cached trees between the parsed ones
+            parsed_trees = iter(parsed_trees)
+            sentence_trees = [cached_trees[sentence_index] if sentence_index in cached_trees
+                              else next(parsed_trees)
+                              for sentence_index in range(len(token_sentences))]
+            # transccg_root is the root element, not the entire document
+            transccg_root = translate_ccg_trees(token_sentences, sentence_trees)
+            parse_data = ParseData(parse_result=transccg_root,
+                                   parse_encode=parse_encode,
+                                   input_file=input_file,
+                                   output_file=output_file)
+        except Exception as error:
+            parse_data = ParseData(parse_error=error)
+            my_logger.error(str(error))
+        return parse_data
+
+    def parse_sentences(self, token_sentences: List[List[str]]):
+        """parse the sentences in shards to C&C trees, one per sentence or None if failed
+        returns the trees with the encoding of the parser output and the input and output files"""
+        shards = split_into_shards(token_sentences, self.shards)
+        if len(shards) == 1:
+            return self.parse_shard(token_sentences)
 
+        # the parsers are external processes, so threads run them in parallel
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            shard_results = list(executor.map(self.parse_shard, shards, range(len(shards))))
+        # join the shards in order, so every sentence gets its global number
+        sentence_trees = [ccg_tree for shard_trees, _, _ in shard_results
+                          for ccg_tree in shard_trees]
+        # the shards are parsed by the same parser, so they share the encoding of the first
+        _, parse_encode, _ = shard_results[0]
+        return sentence_trees, parse_encode, (self.input_file, None)
+
+    def parse_shard(self, token_sentences: List[List[str]], shard_index: int = None):
+        """parse a shard of sentences to C&C trees, one per sentence or None if failed
+        returns the trees with the encoding of the parser output and the input and output files"""
+        if self.mode == "pool":
+            return self.parse_with_pool(token_sentences), CANDC_ENCODING, (self.input_file, None)
+        elif self.mode == "stream":
+            return self.parse_with_stream(token_sentences), CANDC_ENCODING, (self.input_file, None)
+        return self.parse_with_files(token_sentences, shard_index)
+
+    def parse_with_pool(self, token_sentences: List[List[str]]) -> list:
+        """parse the sentences on the shared parser servers"""
+        server_pool = get_server_pool(workers=self.workers,
+                                      config_file=self.config_file,
+                                      parser_printer=self.parser_printer)
+        candc_output = server_pool.parse(token_sentences)
+        # no log file tells the failures, so align the trees to the tokens
+        candc_trees = iter_candc_trees(io.BytesIO(candc_output))
+        return list(align_ccg_trees(token_sentences, candc_trees))
+
+    def parse_with_stream(self, token_sentences: List[List[str]]) -> list:
+        """pipe the sentences through a parser process"""
+        parse_command = shlex.split(self.ccg_stream)
+        with subprocess.Popen(parse_command,
+                              stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL) as parser_process:
+            # feed the tokens from another thread, so the pipes cannot block each other
+            token_feeder = threading.Thread(target=write_token_sentences,
+                                            args=(parser_process.stdin, token_sentences))
+            token_feeder.start()
+            # pull each tree as soon as the parser prints it
+            candc_trees = iter_candc_trees(parser_process.stdout)
+            sentence_trees = list(align_ccg_trees(token_sentences, candc_trees))
+            token_feeder.join()
+        if parser_process.returncode:
+            raise subprocess.CalledProcessError(parser_process.returncode, parse_command)
+        my_logger.debug(f"{parse_command} -> {parser_process.returncode}")
+        return sentence_trees
+
+    def parse_with_files(self, token_sentences: List[List[str]], shard_index: int = None):
+        """run a parser process over token, log and output files"""
         # figure out where to save the output from the input
-        assert self.input_file is not None
         input_root = os.path.basename(self.input_file).split(".")[0]
+        # every shard has its own files
+        if shard_index is not None:
+            input_root = f"{input_root}.{shard_index}"
 
         # save the output files to a given dir or the input folder
         if self.output_dir:
@@ -75,28 +240,21 @@ class CCGSynParser(TransformerMixin):
         log_file = os.path.join(output_dir, log_file)
 
         # save the tokens to the output file to be read by the parser
-        self.token_writer.set_params(input_file=self.input_file)
-        self.token_writer.transform(token_sentences)
-        input_file = self.token_writer.output_file
+        token_suffix = "tok.txt" if shard_index is None else f"{shard_index}.tok.txt"
+        token_writer = CorpusWriter(output_suffix=token_suffix)
+        token_writer.set_params(input_file=self.input_file)
+        input_file = token_writer.transform(token_sentences)
 
         # run the external parsers with the input, log and output files
         parse_command = shlex.split(self.ccg_parse.format(input_file, log_file, output_file))
-        try:            
-            completed_process = subprocess.run(parse_command, check=True, 
-                                               stdout=subprocess.DEVNULL,
-                                               stderr=subprocess.STDOUT)
-            # transccg_root is the root element, not the entire document
-            transccg_root, encoding = translate_candc_tree(token_sentences, output_file, log_file)
-            parse_data = ParseData(parse_result=transccg_root, 
-                                   parse_encode=encoding,
-                                   input_file=input_file,
-                                   output_file=output_file)
-            my_logger.debug(f"{parse_command} -> {completed_process.returncode}")
-        except Exception as error:
-            parse_data = ParseData(parse_error=error)
-            my_logger.error(str(error))
-        return parse_data
-            
+        completed_process = subprocess.run(parse_command, check=True,
+                                           stdout=subprocess.DEVNULL,
+                                           stderr=subprocess.STDOUT)
+        my_logger.debug(f"{parse_command} -> {completed_process.returncode}")
+        # the failed indices of the log are local to the shard
+        sentence_trees, parse_encode = read_candc_trees(token_sentences, output_file, log_file)
+        return sentence_trees, parse_encode, (input_file, output_file)
+
 # unit test
 if __name__ == "__main__":
     import lxml
@@ -118,4 +276,35 @@ if __name__ == "__main__":
     tree_writer = CCGTreeWriter(output_suffix="syn.xml", output_encode=None)
     parse_data = tree_writer.transform(parse_data)
     print(f"{input_file} => {parse_data}")
-    
\ No newline at end of file
+
+    # the stream and the servers of the pool must produce the same trees as the files
+    stream_parser = CCGSynParser(mode="stream")
+    stream_parser.set_params(input_file=input_file)
+    stream_data = stream_parser.transform(token_sentences)
+    assert lxml.etree.tostring(stream_data.parse_result) == \
+        lxml.etree.tostring(parse_data.parse_result)
+
+    # so must the shards parsed in parallel
+    shard_parser = CCGSynParser(shards=2)
+    shard_parser.set_params(input_file=input_file)
+    shard_data = shard_parser.transform(token_sentences)
+    assert lxml.etree.tostring(shard_data.parse_result) == \
+        lxml.etree.tostring(parse_data.parse_result)
+
+    # so must the trees of the cache, parsed or not
+    import tempfile
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for _ in range(2):
+            cache_parser = CCGSynParser(mode="stream", cache_file=f"{cache_dir}/parses.db")
+            cache_parser.set_params(input_file=input_file)
+            cache_data = cache_parser.transform(token_sentences)
+            cache_parser.parse_cache.close()
+            assert lxml.etree.tostring(cache_data.parse_result) == \
+                lxml.etree.tostring(parse_data.parse_result)
+
+    pool_parser = CCGSynParser(mode="pool", workers=2)
+    pool_parser.set_params(input_file=input_file)
+    pool_data = pool_parser.transform(token_sentences)
+    assert lxml.etree.tostring(pool_data.parse_result) == \
+        lxml.etree.tostring(parse_data.parse_result)
+    
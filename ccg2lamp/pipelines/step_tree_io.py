@@ -20,14 +20,16 @@ my_logger = logging.getLogger(__name__)
 #===================================================
 
 class XMLLogHandler(FileHandler):
-    def __init__(self, xml_tree, output_file, output_encode):
+    def __init__(self, xml_tree, output_file, output_encode, pretty_print=True):
         super().__init__(output_file, encoding=output_encode)
         self.xml_tree = xml_tree
+        self.pretty_print = pretty_print
 
     def emit(self, _record):
         serialize_tree_to_file(self.xml_tree, 
                                self.baseFilename, 
-                               encoding=self.encoding)
+                               encoding=self.encoding,
+                               pretty_print=self.pretty_print)
         self.flush()
         
 class CCGTreeReader(TransformerMixin):
@@ -48,8 +50,12 @@ class CCGTreeWriter(TransformerMixin):
     def __init__(self, output_file=None, 
                  output_suffix=None, 
                  output_dir=None, 
-                 output_encode='utf-8'):
-        """initialization"""
+                 output_encode='utf-8',
+                 pretty_print=True):
+        """initialization
+        Parameters:
+            pretty_print: indent the output, or write each document on one line to save time
+        """
         assert output_suffix
 
         if output_dir and not os.path.exists(output_dir):
@@ -59,6 +65,7 @@ class CCGTreeWriter(TransformerMixin):
         self.output_dir = output_dir
         self.output_suffix = output_suffix
         self.output_encode = output_encode
+        self.pretty_print = pretty_print
 
     def transform(self, parse_data: ParseData) -> ParseData:
         """save xml tree to output file"""
@@ -83,7 +90,8 @@ class CCGTreeWriter(TransformerMixin):
         assert(output_encode)
 
         xml_logger = logging.getLogger(__name__)
-        xml_handler = XMLLogHandler(parse_data.parse_result, output_file, output_encode)
+        xml_handler = XMLLogHandler(parse_data.parse_result, output_file, output_encode,
+                                    self.pretty_print)
         xml_logger.addHandler(xml_handler)
         xml_logger.debug(f"save result to {output_file}")
         xml_logger.removeHandler(xml_handler)
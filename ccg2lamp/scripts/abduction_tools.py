@@ -15,12 +15,23 @@
 #  limitations under the License.
 
 from collections import OrderedDict
+import re
 
 from .coq_analyzer import get_predicate_arguments, get_premises_that_match_conclusion_args, make_failure_log
 from .knowledge import get_lexical_relations_from_preds
+from .theorem import get_theorem_line
 from .theorem import insert_axioms_in_coq_script
 from .theorem import is_theorem_error
 from .theorem import run_coq_script
+from .theorem import DEFAULT_PROVER_CONFIG
+
+# seconds to check the type of an axiom
+AXIOM_CHECK_TIMEOUT = 2
+# the definition before each axiom of a batched check, to attribute the errors
+AXIOM_CHECK_MARKER = 'ccg2lamp_axiom_check_'
+AXIOM_CHECK_MARKER_REGEX = re.compile(AXIOM_CHECK_MARKER + r'(\d+) is defined')
+# a coq sentence ends with a period followed by a blank or the end of the input
+COQ_SENTENCE_END_REGEX = re.compile(r'\.(\s|$)')
 
 def make_axioms_from_premises_and_conclusion(premises, conclusion, coq_output_lines=None):
     matching_premises = get_premises_that_match_conclusion_args(
@@ -73,18 +84,84 @@ def try_abductions(theorem):
     return
 
 
-def filter_wrong_axioms(axioms, coq_script):
+def filter_wrong_axioms(axioms, coq_script, config=DEFAULT_PROVER_CONFIG):
+    if config.batch_axiom_checks:
+        return filter_wrong_axioms_batched(axioms, coq_script, config)
     good_axioms = set()
     for axiom in axioms:
         new_coq_script = insert_axioms_in_coq_script(set([axiom]), coq_script)
         # We only need to check if there is a type mismatch, which should
         # be fast (2 secs. maximum).
-        output_lines = run_coq_script(new_coq_script, timeout=2)
+        output_lines = run_coq_script(new_coq_script, timeout=AXIOM_CHECK_TIMEOUT,
+                                      config=config)
         if not is_theorem_error(output_lines):
             good_axioms.add(axiom)
     return good_axioms
 
 
+def make_axiom_check_script(axioms, coq_script):
+    """
+    Keep the declarations and the theorem statement of coq_script, and
+    declare every axiom in a module of its own after a marker definition.
+    The proof is aborted: its tactics only try, so the per-axiom check of
+    filter_wrong_axioms gets its type errors from the statement alone,
+    which are the same for every axiom.
+    """
+    coq_script_lines = coq_script.split('\n')
+    theorem_line = get_theorem_line(coq_script_lines)
+    check_lines = coq_script_lines[:theorem_line]
+    theorem = '\n'.join(coq_script_lines[theorem_line:])
+    statement_end = COQ_SENTENCE_END_REGEX.search(theorem)
+    statement = theorem if statement_end is None else theorem[:statement_end.start() + 1]
+    check_lines.extend([statement, 'Abort.'])
+    for axiom_index, axiom in enumerate(axioms):
+        axiom_name = axiom.split()[1]
+        check_lines.extend([
+            'Definition {0}{1} := tt.'.format(AXIOM_CHECK_MARKER, axiom_index),
+            'Module AxiomCheck{0}.'.format(axiom_index),
+            axiom,
+            'Hint Resolve {0}.'.format(axiom_name),
+            'End AxiomCheck{0}.'.format(axiom_index)])
+    return '\n'.join(check_lines)
+
+
+def filter_wrong_axioms_batched(axioms, coq_script, config=DEFAULT_PROVER_CONFIG):
+    """
+    Check the types of all the axioms in one coq run, and attribute every
+    error to the axiom after the last marker definition before it.
+    """
+    axioms = list(axioms)
+    if not axioms:
+        return set()
+    check_script = make_axiom_check_script(axioms, coq_script)
+    output_lines = run_coq_script(
+        check_script, timeout=AXIOM_CHECK_TIMEOUT * len(axioms), config=config)
+    declaration_lines, axiom_output_lines = split_axiom_check_output(
+        output_lines, len(axioms))
+    # an error in the declarations or the statement would have rejected every axiom
+    if not output_lines or is_theorem_error(declaration_lines):
+        return set()
+    return set(axiom for axiom, lines in zip(axioms, axiom_output_lines)
+               if not is_theorem_error(lines))
+
+
+def split_axiom_check_output(output_lines, num_axioms):
+    """
+    Split the output of make_axiom_check_script at the marker definitions,
+    into the lines of the declarations and the lines of every axiom.
+    """
+    declaration_lines = []
+    axiom_output_lines = [[] for _ in range(num_axioms)]
+    current_lines = declaration_lines
+    for output_line in output_lines:
+        marker_match = AXIOM_CHECK_MARKER_REGEX.search(output_line)
+        if marker_match:
+            current_lines = axiom_output_lines[int(marker_match.group(1))]
+        else:
+            current_lines.append(output_line)
+    return declaration_lines, axiom_output_lines
+
+
 def make_axioms_from_coq_analysis(failure_log):
     axioms = set()
     for subgoal in failure_log.get('other_sub-goals', []):
@@ -107,7 +184,7 @@ def try_abduction(theorem, previous_axioms=None, expected='yes'):
         return abduction_theorem
 
     axioms = make_axioms_from_coq_analysis(failure_log)
-    axioms = filter_wrong_axioms(axioms, theorem.coq_script)
+    axioms = filter_wrong_axioms(axioms, theorem.coq_script, theorem.config)
     axioms = axioms.union(previous_axioms)
     abduction_theorem = theorem.copy(new_axioms=axioms)
     abduction_theorem.prove_simple()
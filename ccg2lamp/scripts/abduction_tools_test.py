@@ -17,6 +17,10 @@
 
 import unittest
 
+from . import abduction_tools
+from .abduction_tools import filter_wrong_axioms_batched
+from .abduction_tools import make_axiom_check_script
+from .abduction_tools import split_axiom_check_output
 from .coq_analyzer import get_tree_pred_args
 from .coq_analyzer import get_premises_that_match_conclusion_args
 from .tree_tools import tree_or_string
@@ -127,9 +131,152 @@ class GetPremisesThatMatchConclusionArgsTestCase(unittest.TestCase):
             premise_lines, conclusion_line)
         self.assertEqual(expected_premises, matching_premises)
 
+# the script of a batched check of two axioms, and the output of the coqtop 8.6
+# that reads it (stdout and stderr), where the second axiom has a type error
+AXIOM_CHECK_SCRIPT = """Require Export coqlib.
+Parameter _dog : Entity -> Prop.
+Parameter _animal : Entity -> Prop.
+Theorem t1: forall x, _dog x -> _animal x.
+Abort.
+Definition ccg2lamp_axiom_check_0 := tt.
+Module AxiomCheck0.
+Axiom ax_ex_dog_animal : forall x, _dog x -> _animal x.
+Hint Resolve ax_ex_dog_animal.
+End AxiomCheck0.
+Definition ccg2lamp_axiom_check_1 := tt.
+Module AxiomCheck1.
+Axiom ax_ex_dog_cat : forall x, _dog x -> _cat x.
+Hint Resolve ax_ex_dog_cat.
+End AxiomCheck1."""
+
+AXIOM_CHECK_OUTPUT = """Welcome to Coq 8.6 (October 2017)
+
+Coq < Coq < _dog is declared
+
+Coq < _animal is declared
+
+Coq < 1 subgoal
+  
+  ============================
+   forall x : Entity, _dog x -> _animal x
+
+t1 < Coq < ccg2lamp_axiom_check_0 is defined
+
+Coq < Interactive Module AxiomCheck0 started
+
+Coq < ax_ex_dog_animal is declared
+
+Coq < Coq < Module AxiomCheck0 is defined
+
+Coq < ccg2lamp_axiom_check_1 is defined
+
+Coq < Interactive Module AxiomCheck1 started
+
+Coq < Toplevel input, characters 42-46:
+> Axiom ax_ex_dog_cat : forall x, _dog x -> _cat x.
+>                                           ^^^^
+Error: The reference _cat was not found in the current environment.
+
+Coq < Toplevel input, characters 13-26:
+> Hint Resolve ax_ex_dog_cat.
+>              ^^^^^^^^^^^^^
+Error: The reference ax_ex_dog_cat was not found in the current environment.
+
+Coq < Module AxiomCheck1 is defined
+
+Coq < 
+"""
+
+class AxiomCheckTestCase(unittest.TestCase):
+    def setUp(self):
+        self.run_coq_script = abduction_tools.run_coq_script
+        self.coq_scripts = []
+
+    def tearDown(self):
+        abduction_tools.run_coq_script = self.run_coq_script
+
+    def fake_coqtop(self, output):
+        def run_coq_script(coq_script, timeout=100, config=None):
+            self.coq_scripts.append(coq_script)
+            # as theorem.run_coqtop splits the output
+            return [line.strip() for line in output.split('\n')]
+        abduction_tools.run_coq_script = run_coq_script
+
+    def test_make_axiom_check_script(self):
+        coq_script = ('Require Export coqlib.\n'
+                      'Parameter _dog : Entity -> Prop.\n'
+                      'Theorem t1: forall x, _dog x. nltac. Qed.')
+        axioms = ['Axiom ax_ex_dog_animal : forall x, _dog x -> _animal x.']
+        expected_script = ('Require Export coqlib.\n'
+                           'Parameter _dog : Entity -> Prop.\n'
+                           'Theorem t1: forall x, _dog x.\n'
+                           'Abort.\n'
+                           'Definition ccg2lamp_axiom_check_0 := tt.\n'
+                           'Module AxiomCheck0.\n'
+                           'Axiom ax_ex_dog_animal : forall x, _dog x -> _animal x.\n'
+                           'Hint Resolve ax_ex_dog_animal.\n'
+                           'End AxiomCheck0.')
+        self.assertEqual(expected_script, make_axiom_check_script(axioms, coq_script))
+
+    def test_statement_over_lines(self):
+        coq_script = ('Require Export coqlib.\n'
+                      'Theorem t1: forall x,\n_dog x -> _num 3.5 x.\nnltac.\nQed.')
+        self.assertEqual('Require Export coqlib.\n'
+                         'Theorem t1: forall x,\n_dog x -> _num 3.5 x.\n'
+                         'Abort.',
+                         make_axiom_check_script([], coq_script))
+
+    def test_filter_wrong_axioms_batched(self):
+        self.fake_coqtop(AXIOM_CHECK_OUTPUT)
+        coq_script = ('Require Export coqlib.\n'
+                      'Parameter _dog : Entity -> Prop.\n'
+                      'Parameter _animal : Entity -> Prop.\n'
+                      'Theorem t1: forall x, _dog x -> _animal x. '
+                      'Set Firstorder Depth 1. nltac. Qed.')
+        axioms = ['Axiom ax_ex_dog_animal : forall x, _dog x -> _animal x.',
+                  'Axiom ax_ex_dog_cat : forall x, _dog x -> _cat x.']
+        self.assertEqual({axioms[0]}, filter_wrong_axioms_batched(axioms, coq_script))
+        self.assertEqual([AXIOM_CHECK_SCRIPT], self.coq_scripts)
+
+    def test_statement_error_rejects_all_axioms(self):
+        # the per-axiom checks would all have failed on the statement
+        statement_output = AXIOM_CHECK_OUTPUT[
+            AXIOM_CHECK_OUTPUT.index('Coq < 1 subgoal'):AXIOM_CHECK_OUTPUT.index('t1 < ') + 5]
+        output = AXIOM_CHECK_OUTPUT.replace(statement_output, """Coq < Toplevel input, characters 32-39:
+> Theorem t1: forall x, _dog x -> _animal x.
+>                                 ^^^^^^^
+Error: The reference _animal was not found in the current environment.
+
+Coq < Toplevel input, characters 0-6:
+> Abort.
+> ^^^^^^
+Error: No focused proof (No proof-editing in progress).
+
+""")
+        self.fake_coqtop(output)
+        axioms = ['Axiom ax_ex_dog_animal : forall x, _dog x -> _animal x.',
+                  'Axiom ax_ex_dog_cat : forall x, _dog x -> _cat x.']
+        coq_script = 'Require Export coqlib.\nTheorem t1: forall x, _dog x -> _animal x. nltac. Qed.'
+        self.assertEqual(set(), filter_wrong_axioms_batched(axioms, coq_script))
+
+    def test_split_axiom_check_output(self):
+        output_lines = [
+            'Coq < _dog is declared',
+            'Coq < ccg2lamp_axiom_check_0 is defined',
+            'Coq < Interactive Module AxiomCheck0 started',
+            'Coq < Coq < Toplevel input, characters 40-47:',
+            '> ^^^^^^^',
+            'Coq < ccg2lamp_axiom_check_1 is defined',
+            'Coq < Interactive Module AxiomCheck1 started']
+        declaration_lines, axiom_output_lines = split_axiom_check_output(output_lines, 2)
+        self.assertEqual(['Coq < _dog is declared'], declaration_lines)
+        self.assertEqual(3, len(axiom_output_lines[0]))
+        self.assertEqual(['Coq < Interactive Module AxiomCheck1 started'], axiom_output_lines[1])
+
 if __name__ == '__main__':
     suite1 = unittest.TestLoader().loadTestsFromTestCase(GetTreePredArgsTestCase)
     suite2 = unittest.TestLoader().loadTestsFromTestCase(
         GetPremisesThatMatchConclusionArgsTestCase)
-    suites = unittest.TestSuite([suite1, suite2])
+    suite3 = unittest.TestLoader().loadTestsFromTestCase(AxiomCheckTestCase)
+    suites = unittest.TestSuite([suite1, suite2, suite3])
     unittest.TextTestRunner(verbosity=2).run(suites)
@@ -0,0 +1,59 @@
+"""Tests of the alignment of the C&C parse trees with their sentences"""
+import unittest
+
+from lxml import etree
+
+from ccg2lamp.en.candc2transccg import align_ccg_trees
+
+def make_ccg_tree(sentence):
+    ccg_tree = etree.Element('ccg')
+    for word in sentence.split():
+        etree.SubElement(ccg_tree, 'lf', word=word)
+    return ccg_tree
+
+class AlignCCGTreesTestCase(unittest.TestCase):
+    def align(self, sentences, parsed_sentences):
+        token_sentences = [sentence.split() for sentence in sentences]
+        ccg_trees = [make_ccg_tree(sentence) for sentence in parsed_sentences]
+        sentence_trees = list(align_ccg_trees(token_sentences, iter(ccg_trees)))
+        self.assertEqual(len(sentences), len(sentence_trees))
+        return [None if ccg_tree is None else ccg_trees.index(ccg_tree)
+                for ccg_tree in sentence_trees]
+
+    def test_all_parsed(self):
+        sentences = ['A dog runs .', 'A cat sleeps .', 'A dog runs .']
+        self.assertEqual([0, 1, 2], self.align(sentences, sentences))
+
+    def test_skipped_sentences(self):
+        sentences = ['A dog runs .', 'A cat sleeps .', 'Birds fly .', 'Fish swim .']
+        self.assertEqual([None, 0, None, 1], self.align(sentences, ['A cat sleeps .', 'Fish swim .']))
+        self.assertEqual([None] * 4, self.align(sentences, []))
+
+    def test_skipped_repeated_sentence(self):
+        # the tree of the first sentence is the one of its repetition
+        sentences = ['A dog runs .', 'A cat sleeps .', 'A dog runs .']
+        self.assertEqual([None, 0, 1], self.align(sentences, ['A cat sleeps .', 'A dog runs .']))
+        self.assertEqual([0, None, None], self.align(sentences, ['A dog runs .']))
+
+    def test_escaped_words(self):
+        sentences = ['Tom & Jerry run .', 'A cat sleeps .']
+        with self.assertLogs(level='WARNING') as logs:
+            self.assertEqual([0, 1], self.align(sentences, ['Tom &amp; Jerry run .', 'A cat sleeps .']))
+        self.assertEqual(1, len(logs.output))
+        self.assertIn('sentence 1 "Tom & Jerry run ."', logs.output[0])
+
+    def test_skipped_sentence_before_escaped_words(self):
+        # the escaped tree cannot be told from the tree of the skipped sentence
+        sentences = ['A dog runs .', 'Tom & Jerry run .']
+        with self.assertLogs(level='WARNING') as logs:
+            self.assertEqual([0, None], self.align(sentences, ['Tom &amp; Jerry run .']))
+        self.assertIn('sentence 1 "A dog runs ."', logs.output[0])
+
+    def test_trees_left(self):
+        with self.assertRaises(AssertionError):
+            self.align(['A dog runs .'], ['A dog runs .', 'A cat sleeps .'])
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(AlignCCGTreesTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
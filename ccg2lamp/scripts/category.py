@@ -14,6 +14,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import functools
 from nltk import FeatStruct
 import re
 
@@ -22,11 +23,15 @@ class Category(object):
 
     def __init__(self, category):
         if isinstance(category, self.__class__):
+            self.category = category.category
             self.types = category.types
             self.type_features = category.type_features
+            self.types_regex = category.types_regex
         else:
+            self.category = category
             self.types = remove_feats_from_category(category)
             self.type_features = get_feats_from_category(category)
+            self.types_regex = compile_types_regex(self.types)
 
     def __repr__(self):
         return "Types: {0}\tFeats: {1}".format(self.types, self.type_features)
@@ -34,13 +39,12 @@ class Category(object):
     def match(self, other):
         if not isinstance(other, self.__class__):
             return False
+        return match_categories(self.category, other.category)
+
+    def match_uncached(self, other):
         if len(self.type_features) != len(other.type_features):
             return False
-        # TODO: Ideally these substitutions should be precomputed for speed-up.
-        types = re.sub(r'\\', r'\\\\', self.types)
-        types = types.replace('|', '[/\\\]')
-        types = types.replace('(', '\\(').replace(')', '\\)')
-        if not re.fullmatch(types, other.types):
+        if not self.types_regex.fullmatch(other.types):
             return False
         return all([a.subsumes(b)
                     for (a, b) in zip(self.type_features, other.type_features)])
@@ -55,6 +59,25 @@ class Category(object):
     def get_num_args(self):
         return len(self.type_features) - 1
 
+@functools.lru_cache(maxsize=None)
+def intern_category(category):
+    """ Returns the Category shared by all the occurrences of a category string. """
+    return Category(category)
+
+@functools.lru_cache(maxsize=65536)
+def match_categories(src_category, trg_category):
+    """ Whether the category string src_category matches trg_category. """
+    return intern_category(src_category).match_uncached(intern_category(trg_category))
+
+def compile_types_regex(types):
+    r""" Compiles the types of a category to a regex, where "|" matches either slash.
+    types="NP|NP" --> regex="NP[/\]NP"
+    """
+    types = re.sub(r'\\', r'\\\\', types)
+    types = types.replace('|', '[/\\\]')
+    types = types.replace('(', '\\(').replace(')', '\\)')
+    return re.compile(types)
+
 def get_feats_from_category(category):
     r""" Returns the features of the syntactic category.
     category="S[mod=nm,form=base]" --> feats=['[mod=nm,form=base]']
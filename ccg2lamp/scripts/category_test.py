@@ -17,7 +17,7 @@
 
 import unittest
 
-from .category import Category
+from .category import Category, intern_category, match_categories
 
 class CategoryTestCase(unittest.TestCase):
     def test_category_matches(self):
@@ -104,6 +104,17 @@ class CategoryTestCase(unittest.TestCase):
         cat2 =  Category('(NP/NP)\\NP')
         self.assertTrue(cat1.match(cat2))
 
+    def test_interned_category(self):
+        cat1 =  intern_category('N[dcl=true]')
+        cat2 =  intern_category('N[dcl=true]')
+        self.assertIs(cat1, cat2)
+        self.assertTrue(cat1.match(Category('N[dcl=true]')))
+
+    def test_cached_match(self):
+        self.assertTrue(match_categories('NP|NP', 'NP\\NP'))
+        self.assertFalse(match_categories('NP|NP', 'NP'))
+        self.assertTrue(match_categories('NP|NP', 'NP\\NP'))
+
 
 if __name__ == '__main__':
     suite1 = unittest.TestLoader().loadTestsFromTestCase(CategoryTestCase)
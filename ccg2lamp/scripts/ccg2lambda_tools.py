@@ -23,26 +23,33 @@ from nltk.sem.logic import ConstantExpression
 
 from .normalization import normalize_token
 from . import semantic_index
+from .semantic_index import (index_nodes_by_id, get_node_semantics,
+                             set_node_semantics, serialize_node_semantics)
 from ccg2lamp.scripts.logic_parser import (lexpr, 
+                                           lexpr_shared,
                                            PartialExpression, 
                                            combine_partial_expressions, 
-                                           recover_partial_expressions)
+                                           recover_partial_expressions,
+                                           apply_and_simplify)
 
-def build_ccg_tree(ccg_xml, root_id=None):
+def build_ccg_tree(ccg_xml, root_id=None, node_index=None):
     """
     This function re-arranges the nodes of the XML CCG tree to have
     a tree structure. It will be useful to traverse the tree.
+    The spans are looked up in node_index, built once for the whole tree.
     """
     if ccg_xml == None or len(ccg_xml) == 0:
         return None
     if root_id == None:
         root_id = ccg_xml.get('root')
-    root_span = copy.deepcopy(semantic_index.find_node_by_id(root_id, ccg_xml))
+    if node_index is None:
+        node_index = semantic_index.index_nodes_by_id(ccg_xml)
+    root_span = copy.deepcopy(semantic_index.find_node_by_id(root_id, node_index))
     if 'child' not in root_span.attrib:
         return root_span
     children_id = root_span.get('child').split()
     for child_id in children_id:
-        child_node = build_ccg_tree(ccg_xml, child_id)
+        child_node = build_ccg_tree(ccg_xml, child_id, node_index)
         if child_node != None:
             root_span.append(child_node)
     return root_span
@@ -58,16 +65,13 @@ def normalize_tokens(tokens):
     from surface forms is implemented:
     """
     for token in tokens:
-        if token.get('base', None) == '*':
-            token.set('base', token.get('surf', '*'))
-        if 'base' in token.attrib and not token.get('base', '').startswith('_'):
-            base = token.get('base', '')
-            base_normalized = normalize_token(base)
-            token.set('base', base_normalized)
-        if 'surf' in token.attrib and not token.get('surf', '').startswith('_'):
-            surf = token.get('surf', '')
-            surf_normalized = normalize_token(surf)
-            token.set('surf', surf_normalized)
+        attrib = token.attrib
+        if attrib.get('base', None) == '*':
+            attrib['base'] = attrib.get('surf', '*')
+        for attr_name in ('base', 'surf'):
+            value = attrib.get(attr_name, None)
+            if value is not None and not value.startswith('_'):
+                attrib[attr_name] = normalize_token(value)
     return tokens
 
 def assign_semantics_to_ccg(ccg_xml, semantic_index, tree_index=1):
@@ -95,7 +99,12 @@ def assign_semantics_to_ccg(ccg_xml, semantic_index, tree_index=1):
     ccg_tree = build_ccg_tree(ccg_flat_tree)
     tokens = copy.deepcopy(ccg_xml.find('.//tokens'))
     tokens = normalize_tokens(tokens)
-    status = assign_semantics(ccg_tree, semantic_index, tokens)
+    # look up the tokens of the leaves by id in constant time
+    token_index = index_nodes_by_id(tokens)
+    # carry the expressions by node id, and print them only once at the end
+    node_semantics = {}
+    status = assign_semantics(ccg_tree, semantic_index, token_index, node_semantics)
+    serialize_node_semantics(ccg_tree, node_semantics)
     return status, ccg_tree
 
 def is_forward_operation(ccg_tree):
@@ -131,21 +140,21 @@ def type_raise(function, order = 1):
     """
     assert order >= 0, 'The order of the type-raising should be >= 0'
     if isinstance(function, ConstantExpression):
-        type_raiser = lexpr(r'\P X.P(X)')
-        type_raised_function = type_raiser(function).simplify()
+        type_raiser = lexpr_shared(r'\P X.P(X)')
+        type_raised_function = apply_and_simplify(type_raiser, function)
     else:
         if order == 1:
-            type_raiser = lexpr(r'\P0 P1 X0.P0(P1(X0))')
+            type_raiser = lexpr_shared(r'\P0 P1 X0.P0(P1(X0))')
         elif order == 2:
-            type_raiser = lexpr(r'\P0 P1 X0 X1.P0(P1(X0, X1))')
+            type_raiser = lexpr_shared(r'\P0 P1 X0 X1.P0(P1(X0, X1))')
         elif order == 3:
-            type_raiser = lexpr(r'\P0 P1 X0 X1 X2.P0(P1(X0, X1, X2))')
+            type_raiser = lexpr_shared(r'\P0 P1 X0 X1 X2.P0(P1(X0, X1, X2))')
         else:
             assert False, 'Type-raising at order > 3 is not supported'
-        type_raised_function = type_raiser(function).simplify()
+        type_raised_function = apply_and_simplify(type_raiser, function)
     return type_raised_function
 
-def combine_children_exprs(ccg_tree, tokens, semantic_index):
+def combine_children_exprs(ccg_tree, tokens, semantic_index, node_semantics=None):
     """
     Perform forward/backward function application/combination.
     """
@@ -163,9 +172,9 @@ def combine_children_exprs(ccg_tree, tokens, semantic_index):
     else:
         coq_types = coq_types_right
     ccg_tree.set('coq_type', coq_types)
-    semantics = semantic_index.get_semantic_representation(ccg_tree, tokens)
+    semantics = semantic_index.get_semantic_representation(ccg_tree, tokens, node_semantics)
     if semantics:
-        ccg_tree.set('sem', str(semantics))
+        set_node_semantics(ccg_tree, semantics, node_semantics)
         return not isinstance(semantics, PartialExpression)
 
     # Back-off mechanism in case no semantic templates are available:
@@ -173,22 +182,22 @@ def combine_children_exprs(ccg_tree, tokens, semantic_index):
         function_index, argument_index = 0, 1
     else:
         function_index, argument_index = 1, 0
-    function = lexpr(ccg_tree[function_index].attrib['sem'])
-    argument = lexpr(ccg_tree[argument_index].attrib['sem'])
+    function = get_node_semantics(ccg_tree[function_index], node_semantics)
+    argument = get_node_semantics(ccg_tree[argument_index], node_semantics)
 
     # check if any child is a partial expression
     partial_exp = combine_partial_expressions(function, argument)
     if partial_exp:
-        ccg_tree.set("sem", str(partial_exp))
+        set_node_semantics(ccg_tree, partial_exp, node_semantics)
         return False
         
     combination_operation = get_combination_op(ccg_tree)
     if combination_operation == 'function_application':
-        evaluation = function(argument).simplify()
+        evaluation = apply_and_simplify(function, argument)
     elif combination_operation == 'function_combination':
         num_arguments = get_num_args(ccg_tree)
         type_raised_function = type_raise(function, num_arguments)
-        evaluation = type_raised_function(argument).simplify()
+        evaluation = apply_and_simplify(type_raised_function, argument)
     else:
         assert False, 'This node should be a function application or combination'\
                       .format(etree.tostring(ccg_tree, pretty_print=True))
@@ -196,32 +205,34 @@ def combine_children_exprs(ccg_tree, tokens, semantic_index):
     # nltk may produce invalid logic expressions itself cannot parse
     # we check such expressions before assign them to the node
     evaluation = recover_partial_expressions(evaluation, function, argument)
-    ccg_tree.set('sem', str(evaluation))
+    set_node_semantics(ccg_tree, evaluation, node_semantics)
     return not isinstance(evaluation, PartialExpression)
 
-def assign_semantics(ccg_tree, semantic_index, tokens):
+def assign_semantics(ccg_tree, semantic_index, tokens, node_semantics=None):
     """
     Visit recursively the CCG tree in depth-first order, assigning lambda expressions
     (semantics) to each node.
+    If node_semantics is a dict, the expressions are kept there by node id
+    instead of in the 'sem' attributes, until serialize_node_semantics.
     """
     category = ccg_tree.attrib['category']
     if len(ccg_tree) == 0:
         # assign semantics to a leaf (lexical node)
-        semantics = semantic_index.get_semantic_representation(ccg_tree, tokens)
-        ccg_tree.set('sem', str(semantics))
+        semantics = semantic_index.get_semantic_representation(ccg_tree, tokens, node_semantics)
+        set_node_semantics(ccg_tree, semantics, node_semantics)
         return not isinstance(semantics, PartialExpression)
 
     if len(ccg_tree) == 1:
         # assign semantics to a node with a single child
-        assign_semantics(ccg_tree[0], semantic_index, tokens)
-        semantics = semantic_index.get_semantic_representation(ccg_tree, tokens)
-        ccg_tree.set('sem', str(semantics))
+        assign_semantics(ccg_tree[0], semantic_index, tokens, node_semantics)
+        semantics = semantic_index.get_semantic_representation(ccg_tree, tokens, node_semantics)
+        set_node_semantics(ccg_tree, semantics, node_semantics)
         return not isinstance(semantics, PartialExpression)
 
     for child in ccg_tree:
         # recurse into more than one child
-        assign_semantics(child, semantic_index, tokens)
+        assign_semantics(child, semantic_index, tokens, node_semantics)
     
     # combine two children into their parent
-    status = combine_children_exprs(ccg_tree, tokens, semantic_index)
+    status = combine_children_exprs(ccg_tree, tokens, semantic_index, node_semantics)
     return status
@@ -23,7 +23,8 @@ from nltk.sem.logic import Expression
 from .ccg2lambda_tools import (assign_semantics_to_ccg, type_raise, build_ccg_tree)
 from .logic_parser import lexpr
 from .semantic_index import (SemanticRule, SemanticIndex,
-                            get_attributes_from_ccg_node_recursively, find_node_by_id)
+                            get_attributes_from_ccg_node_recursively, find_node_by_id,
+                            index_nodes_by_id)
 
 class TypeRaiseTestCase(unittest.TestCase):
     def test_const_expr_raised1(self):
@@ -943,6 +944,34 @@ class get_attributes_from_ccg_node_recursivelyTestCase(unittest.TestCase):
         for k in expected_attributes:
             self.assertEqual(expected_attributes.get(k, None), attributes.get(k, None))
 
+    def test_token_index(self):
+        sentence_str = r"""
+      <sentence id="s1">
+        <tokens>
+          <token surf="surf1" id="t1_1"/>
+          <token surf="surf2" id="t1_2"/>
+        </tokens>
+        <ccg root="sp1-3">
+          <span terminal="t1_1" category="cat1" id="sp1-1"/>
+          <span terminal="t1_2" category="cat2" id="sp1-2"/>
+          <span child="sp1-1 sp1-2" rule="lex" category="NP" id="sp1-3"/>
+        </ccg>
+      </sentence>
+    """
+        sentence = etree.fromstring(sentence_str)
+        ccg_tree = sentence.find("ccg")
+        tokens = sentence.find("tokens")
+        token_index = index_nodes_by_id(tokens)
+        for token_id in ["t1_1", "t1_2"]:
+            self.assertIs(find_node_by_id(token_id, tokens),
+                          find_node_by_id(token_id, token_index))
+        with self.assertRaises(ValueError):
+            find_node_by_id("t1_3", token_index)
+        attributes = get_attributes_from_ccg_node_recursively(
+            build_ccg_tree(ccg_tree), token_index)
+        self.assertEqual('surf1', attributes['child0_surf'])
+        self.assertEqual('surf2', attributes['child1_surf'])
+
 class AssignSemanticsToCCGWithFeatsTestCase(unittest.TestCase):
     def test_np_feature_no(self):
         semantic_index = SemanticIndex(None)
@@ -0,0 +1,214 @@
+"""Long-lived coqtop sessions that load coqlib only once"""
+import atexit
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import List
+
+my_logger = logging.getLogger(__name__)
+
+COQTOP_COMMAND = ("coqtop",)
+# the first line of the scripts made by theorem.make_coq_script
+COQLIB_REQUIRE = "Require Export coqlib."
+# the name checked after each batch of commands to find the end of its output
+SYNC_NAME = "ccg2lamp_sync"
+# the name every script is reset to, so its declarations do not leak
+CHECKPOINT_NAME = "ccg2lamp_checkpoint"
+# seconds between two checks of the cancellation of a running script
+CANCEL_POLL_INTERVAL = 0.1
+
+# the pools shared by all the theorems of this process
+SESSION_POOLS = {}
+SESSION_POOLS_LOCK = threading.Lock()
+
+class CoqCancelled(Exception):
+    """a script was stopped because its result is not needed anymore"""
+
+def wait_time(deadline: float, cancel_event: threading.Event = None) -> float:
+    """the time to wait before checking the deadline and the cancellation again"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise CoqCancelled()
+    remaining = max(deadline - time.monotonic(), 0)
+    return remaining if cancel_event is None else min(remaining, CANCEL_POLL_INTERVAL)
+
+def run_coqtop_process(coq_script: str, timeout: int = 100,
+                       cancel_event: threading.Event = None) -> bytes:
+    """run a script on a new coqtop, which is killed if cancel_event is set"""
+    with subprocess.Popen(COQTOP_COMMAND,
+                          stdin=subprocess.PIPE,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT) as process:
+        deadline = time.monotonic() + timeout
+        script_input = coq_script.encode("utf-8")
+        while True:
+            try:
+                output, _ = process.communicate(script_input,
+                                                timeout=wait_time(deadline, cancel_event))
+                break
+            except subprocess.TimeoutExpired:
+                if time.monotonic() >= deadline:
+                    process.kill()
+                    raise subprocess.TimeoutExpired(COQTOP_COMMAND, timeout)
+                # the input was sent by the first call
+                script_input = None
+            except CoqCancelled:
+                process.kill()
+                raise
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, COQTOP_COMMAND, output)
+    return output
+
+class CoqSession():
+    """
+    A coqtop process that has loaded coqlib. Every script runs after a
+    checkpoint definition, then the session goes back to the checkpoint
+    with Reset, so the next script starts from the same state as a new
+    coqtop that has just required coqlib.
+    """
+    def __init__(self, startup_timeout: int = 60):
+        self.process = subprocess.Popen(COQTOP_COMMAND,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT)
+        my_logger.debug(f"{COQTOP_COMMAND} -> pid {self.process.pid}")
+        # a thread reads the output, so a hung proof can be timed out
+        self.output_lines = queue.Queue()
+        self.reader = threading.Thread(target=self.read_output, daemon=True)
+        self.reader.start()
+        try:
+            self.run_commands(f"{COQLIB_REQUIRE}\n"
+                              f"Definition {SYNC_NAME} := tt.\n"
+                              f"Definition {CHECKPOINT_NAME} := tt.",
+                              startup_timeout)
+        except Exception:
+            self.close()
+            raise
+
+    def read_output(self):
+        for line in self.process.stdout:
+            self.output_lines.put(line.decode("utf-8", errors="replace"))
+        # the end of the output
+        self.output_lines.put(None)
+
+    def read_line(self, deadline: float, timeout: int,
+                  cancel_event: threading.Event = None) -> str:
+        while True:
+            try:
+                line = self.output_lines.get(timeout=wait_time(deadline, cancel_event))
+                break
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise subprocess.TimeoutExpired(COQTOP_COMMAND, timeout)
+        if line is None:
+            raise subprocess.CalledProcessError(self.process.wait(), COQTOP_COMMAND)
+        return line.strip()
+
+    def run_commands(self, commands: str, timeout: int,
+                     cancel_event: threading.Event = None) -> List[str]:
+        """send commands to coqtop and return their output lines"""
+        try:
+            self.process.stdin.write(f"{commands}\nCheck {SYNC_NAME}.\n".encode("utf-8"))
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            raise subprocess.CalledProcessError(self.process.wait(), COQTOP_COMMAND)
+        deadline = time.monotonic() + timeout
+        output_lines = []
+        while True:
+            line = self.read_line(deadline, timeout, cancel_event)
+            if line.endswith(SYNC_NAME):
+                # skip the type printed after the name
+                self.read_line(deadline, timeout)
+                return output_lines
+            output_lines.append(line)
+
+    def run_script(self, coq_script: str, timeout: int = 100,
+                   cancel_event: threading.Event = None) -> List[str]:
+        """run a script of theorem.make_coq_script and return its output lines"""
+        if coq_script.startswith(COQLIB_REQUIRE):
+            coq_script = coq_script[len(COQLIB_REQUIRE):]
+        output_lines = self.run_commands(coq_script, timeout, cancel_event)
+        self.run_commands(f"Abort All.\n"
+                          f"Reset {CHECKPOINT_NAME}.\n"
+                          f"Definition {CHECKPOINT_NAME} := tt.",
+                          timeout)
+        return output_lines
+
+    def close(self):
+        """stop coqtop"""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+class CoqSessionPool():
+    """
+    A pool of coqtop sessions, so several theorems can be proved at the
+    same time. The sessions are started on first use, and a session that
+    times out, exits or is cancelled is replaced by a new one.
+    """
+    def __init__(self, workers: int = 1):
+        assert workers >= 1
+        self.workers = workers
+        self.free_sessions = queue.Queue()
+        for _ in range(workers):
+            self.free_sessions.put(None)
+        self.sessions = set()
+        self.sessions_lock = threading.Lock()
+
+    def run_script(self, coq_script: str, timeout: int = 100,
+                   cancel_event: threading.Event = None) -> List[str]:
+        """run a script on the next free session and return its output lines"""
+        session = self.free_sessions.get()
+        try:
+            if session is None:
+                session = CoqSession()
+                with self.sessions_lock:
+                    self.sessions.add(session)
+            return session.run_script(coq_script, timeout, cancel_event)
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, CoqCancelled):
+            # a session in an unknown state is not reused
+            self.close_session(session)
+            session = None
+            raise
+        finally:
+            self.free_sessions.put(session)
+
+    def close_session(self, session: CoqSession):
+        if session is None:
+            return
+        session.close()
+        with self.sessions_lock:
+            self.sessions.discard(session)
+
+    def close(self):
+        """stop all the sessions"""
+        with self.sessions_lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions.clear()
+        # the free sessions are started again on next use
+        free_count = 0
+        while not self.free_sessions.empty():
+            self.free_sessions.get()
+            free_count += 1
+        for _ in range(free_count):
+            self.free_sessions.put(None)
+
+def get_session_pool(workers: int = 1) -> CoqSessionPool:
+    """get the pool of this process for a number of sessions"""
+    # the worker processes forked by prove.py must not share the pipes of their parent
+    pool_key = (os.getpid(), workers)
+    with SESSION_POOLS_LOCK:
+        if pool_key not in SESSION_POOLS:
+            SESSION_POOLS[pool_key] = CoqSessionPool(workers=workers)
+        return SESSION_POOLS[pool_key]
+
+@atexit.register
+def close_session_pools():
+    """stop the sessions of all the pools when the process exits"""
+    with SESSION_POOLS_LOCK:
+        for session_pool in SESSION_POOLS.values():
+            session_pool.close()
+        SESSION_POOLS.clear()
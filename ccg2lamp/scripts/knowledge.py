@@ -18,6 +18,7 @@ from collections import defaultdict
 import itertools
 
 from .linguistic_tools import linguistic_relationship
+from .linguistic_tools import linguistic_relationships
 from .linguistic_tools import get_wordnet_cascade
 from .normalization import denormalize_token, normalize_token
 
@@ -32,16 +33,13 @@ def get_lexical_relations(doc):
     # Get tokens from all CCG trees and de-normalize them.
     # (e.g. remove the preceding underscore).
     tokens = get_tokens_from_xml_node(doc)
-    # For every token pair, extract linguistic relationships.
+    # For every pair of different tokens, extract linguistic relationships.
+    # Symmetrical relationships are excluded by taking the pairs in the order
+    # of the first occurrence of their tokens.
     relations_to_pairs = defaultdict(list)
-    token_pairs = list(itertools.product(tokens, tokens))
-    for i, (t1, t2) in enumerate(token_pairs):
-        if t1 == t2:
-            continue
-        # Exclude symmetrical relationships.
-        if (t2, t1) in token_pairs[:i]:
-            continue
-        relations = linguistic_relationship(t1, t2)
+    unique_tokens = list(dict.fromkeys(tokens))
+    token_pairs = list(itertools.combinations(unique_tokens, 2))
+    for (t1, t2), relations in zip(token_pairs, linguistic_relationships(token_pairs)):
         for relation in relations:
             relations_to_pairs[relation].append((t1, t2))
     # For every linguistic relationship, check if 'antonym' is present.
@@ -0,0 +1,202 @@
+"""Precompiled WordNet and VerbOcean relations, built by en/wordnet_to_index.py"""
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+from .sqlite_store import select_in
+
+my_logger = logging.getLogger(__name__)
+
+# the fields of a word record that hold sets of synset names or lemma names
+RECORD_SETS = ('synsets', 'hypernyms', 'similar', 'holonyms',
+               'antonyms', 'entailments', 'derivations')
+
+# the parts of speech tried by WordNet's morphy, in order
+POS_LIST = ('n', 'v', 'a', 'r')
+
+# bytes of the index file mapped in memory by SQLite
+MMAP_SIZE = 1024 * 1024 * 1024
+
+def write_record(record: dict) -> str:
+    return json.dumps({field: sorted(value) if field in RECORD_SETS else value
+                       for field, value in record.items()})
+
+def write_lexical_index(index_file: str,
+                        word_records: Iterable[Tuple[str, dict]],
+                        verbocean: Dict[str, Dict[str, list]] = None,
+                        lemma_records: Iterable[Tuple[str, str, dict]] = (),
+                        exceptions: Dict[str, Dict[str, List[str]]] = None,
+                        substitutions: Dict[str, List[Tuple[str, str]]] = None):
+    """
+    Write the records of linguistic_tools.make_word_record, the VerbOcean
+    relations, and what the index needs to find the records of the other
+    words as WordNet would: the records of make_synsets_record of every
+    lemma and part of speech, the exception lists and the suffix rules of
+    morphy by part of speech.
+    """
+    connection = sqlite3.connect(index_file)
+    with connection:
+        for table in ("words", "lemmas", "exceptions", "substitutions", "verbocean"):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute("CREATE TABLE words (word TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        connection.execute("""CREATE TABLE lemmas (lemma TEXT NOT NULL, pos TEXT NOT NULL,
+                              record TEXT NOT NULL, PRIMARY KEY (lemma, pos))""")
+        connection.execute("""CREATE TABLE exceptions (form TEXT NOT NULL, pos TEXT NOT NULL,
+                              bases TEXT NOT NULL, PRIMARY KEY (form, pos))""")
+        connection.execute("""CREATE TABLE substitutions (pos TEXT NOT NULL, rank INTEGER NOT NULL,
+                              old TEXT NOT NULL, new TEXT NOT NULL, PRIMARY KEY (pos, rank))""")
+        connection.execute("""CREATE TABLE verbocean (verb1 TEXT NOT NULL, verb2 TEXT NOT NULL,
+                              relations TEXT NOT NULL, PRIMARY KEY (verb1, verb2))""")
+        connection.executemany(
+            "INSERT INTO words (word, record) VALUES (?, ?)",
+            ((word, write_record(record)) for word, record in word_records))
+        connection.executemany(
+            "INSERT INTO lemmas (lemma, pos, record) VALUES (?, ?, ?)",
+            ((lemma, pos, write_record(record)) for lemma, pos, record in lemma_records))
+        if exceptions:
+            connection.executemany(
+                "INSERT INTO exceptions (form, pos, bases) VALUES (?, ?, ?)",
+                ((form, pos, json.dumps(bases))
+                 for pos, form_bases in exceptions.items()
+                 for form, bases in form_bases.items()))
+        if substitutions:
+            connection.executemany(
+                "INSERT INTO substitutions (pos, rank, old, new) VALUES (?, ?, ?, ?)",
+                ((pos, rank, old, new)
+                 for pos, pos_substitutions in substitutions.items()
+                 for rank, (old, new) in enumerate(pos_substitutions)))
+        if verbocean:
+            connection.executemany(
+                "INSERT INTO verbocean (verb1, verb2, relations) VALUES (?, ?, ?)",
+                ((verb1, verb2, json.dumps(relations))
+                 for verb1, verb2_relations in verbocean.items()
+                 for verb2, relations in verb2_relations.items()))
+    connection.execute("VACUUM")
+    connection.close()
+
+def make_empty_record() -> dict:
+    record = {field: frozenset() for field in RECORD_SETS}
+    record['base'] = None
+    return record
+
+class LexicalIndex():
+    """
+    A read-only SQLite index from the WordNet lemmas to their base form,
+    their synsets and the synsets or lemmas they are related to, and from
+    verb pairs to their VerbOcean relations. The records of the other words,
+    as inflected forms, are found with the same rules as WordNet's morphy,
+    so the index answers for every word without loading WordNet. The file is
+    mapped in memory, so a process only reads the pages of the words it
+    looks up.
+    """
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.connection = None
+        self.connection_pid = None
+        self.substitutions = None
+
+    def get_connection(self) -> sqlite3.Connection:
+        # the worker processes forked by prove.py open their own connection
+        if self.connection_pid != os.getpid():
+            # the index can be shared by the threads of a prover
+            self.connection = sqlite3.connect(f"file:{self.index_file}?mode=ro", uri=True,
+                                              check_same_thread=False)
+            self.connection.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self.connection_pid = os.getpid()
+        return self.connection
+
+    def get_substitutions(self) -> Dict[str, List[Tuple[str, str]]]:
+        """the suffix rules of morphy by part of speech"""
+        if self.substitutions is None:
+            try:
+                rows = self.get_connection().execute(
+                    "SELECT pos, old, new FROM substitutions ORDER BY pos, rank").fetchall()
+            except sqlite3.OperationalError:
+                raise ValueError(f"{self.index_file} was built by an older "
+                                 "en/wordnet_to_index.py, build it again")
+            substitutions = {pos: [] for pos in POS_LIST}
+            for pos, old, new in rows:
+                substitutions.setdefault(pos, []).append((old, new))
+            self.substitutions = substitutions
+        return self.substitutions
+
+    def get_word_record(self, word: str) -> dict:
+        """the record of a word, which is empty if WordNet does not know it"""
+        return self.get_word_records([word])[word]
+
+    @staticmethod
+    def read_record(record_json: str) -> dict:
+        record = json.loads(record_json)
+        for field in RECORD_SETS:
+            record[field] = frozenset(record[field])
+        return record
+
+    def get_word_records(self, words: List[str]) -> Dict[str, dict]:
+        """the records of words, from the lemmas or else from their base forms"""
+        words = list(dict.fromkeys(words))
+        rows = select_in(self.get_connection(),
+                         "SELECT word, record FROM words WHERE word IN ({0})", words)
+        word_records = {word: self.read_record(record) for word, record in rows}
+        missing_words = [word for word in words if word not in word_records]
+        if missing_words:
+            word_records.update(self.make_word_records(missing_words))
+        return word_records
+
+    def make_word_records(self, words: List[str]) -> Dict[str, dict]:
+        """
+        Make the records of words that are not lemmas as make_word_record
+        does with WordNet: the base form is the first form found by morphy,
+        and the synsets are those of the forms found for the lower case word
+        with every part of speech.
+        """
+        substitutions = self.get_substitutions()
+        forms = list(dict.fromkeys(form for word in words for form in (word, word.lower())))
+        rows = select_in(self.get_connection(),
+                         "SELECT form, pos, bases FROM exceptions WHERE form IN ({0})", forms)
+        exceptions = {(form, pos): json.loads(bases) for form, pos, bases in rows}
+
+        candidates = {}
+        for form in forms:
+            for pos in POS_LIST:
+                if (form, pos) in exceptions:
+                    pos_forms = exceptions[(form, pos)]
+                else:
+                    pos_forms = [form[:-len(old)] + new
+                                 for old, new in substitutions.get(pos, []) if form.endswith(old)]
+                candidates[(form, pos)] = list(dict.fromkeys([form] + pos_forms))
+        candidate_lemmas = list(set(lemma for pos_forms in candidates.values()
+                                    for lemma in pos_forms))
+        lemma_records = {(lemma, pos): self.read_record(record)
+                         for lemma, pos, record in select_in(
+                             self.get_connection(),
+                             "SELECT lemma, pos, record FROM lemmas WHERE lemma IN ({0})",
+                             candidate_lemmas)}
+
+        def morphy(form, pos):
+            return [lemma for lemma in candidates[(form, pos)] if (lemma, pos) in lemma_records]
+
+        word_records = {}
+        for word in words:
+            record = make_empty_record()
+            for pos in POS_LIST:
+                for lemma in morphy(word.lower(), pos):
+                    for field in RECORD_SETS:
+                        record[field] = record[field] | lemma_records[(lemma, pos)][field]
+            record['base'] = next((lemmas[0] for lemmas in (morphy(word, pos) for pos in POS_LIST)
+                                   if lemmas), None)
+            word_records[word] = record
+        return word_records
+
+    def get_verbocean_relations(self, verb1: str, verb2: str) -> set:
+        row = self.get_connection().execute(
+            "SELECT relations FROM verbocean WHERE verb1 = ? AND verb2 = ?",
+            (verb1, verb2)).fetchone()
+        return set() if row is None else set(json.loads(row[0]))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            self.connection_pid = None
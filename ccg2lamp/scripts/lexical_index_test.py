@@ -0,0 +1,185 @@
+"""Tests of the LexicalIndex, which answers for every word without loading WordNet"""
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from nltk.corpus.reader.wordnet import WordNetCorpusReader
+
+from . import linguistic_tools
+from .lexical_index import LexicalIndex, RECORD_SETS, write_lexical_index
+
+def make_record(synsets=(), hypernyms=(), base=None):
+    record = {field: frozenset() for field in RECORD_SETS}
+    record['synsets'] = frozenset(synsets)
+    record['hypernyms'] = frozenset(hypernyms)
+    if base is not None:
+        record['base'] = base
+    return record
+
+class LexicalIndexFixture(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_file = os.path.join(self.tmp_dir.name, "lexical.db")
+        lemma_records = [
+            ('dog', 'n', make_record(['dog.n.01'], ['canine.n.02'])),
+            ('dog', 'v', make_record(['chase.v.01'])),
+            ('canine', 'n', make_record(['canine.n.02'])),
+            ('run', 'n', make_record(['run.n.01'])),
+            ('run', 'v', make_record(['run.v.01'])),
+            ('mouse', 'n', make_record(['mouse.n.01']))]
+        word_records = [
+            ('dog', make_record(['dog.n.01', 'chase.v.01'], ['canine.n.02'], base='dog')),
+            ('canine', make_record(['canine.n.02'], base='canine')),
+            ('run', make_record(['run.n.01', 'run.v.01'], base='run')),
+            ('mouse', make_record(['mouse.n.01'], base='mouse'))]
+        write_lexical_index(self.index_file, word_records,
+                            verbocean={'run': {'walk': ['stronger-than']}},
+                            lemma_records=lemma_records,
+                            exceptions={'n': {'mice': ['mouse']}, 'v': {'ran': ['run']}},
+                            substitutions=WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS)
+        self.index = LexicalIndex(self.index_file)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+class LexicalIndexTestCase(LexicalIndexFixture):
+    def test_lemma(self):
+        record = self.index.get_word_record('dog')
+        self.assertEqual('dog', record['base'])
+        self.assertEqual(frozenset(['dog.n.01', 'chase.v.01']), record['synsets'])
+        self.assertEqual(frozenset(['canine.n.02']), record['hypernyms'])
+
+    def test_regular_inflection(self):
+        record = self.index.get_word_record('dogs')
+        self.assertEqual('dog', record['base'])
+        self.assertEqual(frozenset(['dog.n.01', 'chase.v.01']), record['synsets'])
+        record = self.index.get_word_record('runs')
+        self.assertEqual('run', record['base'])
+        self.assertEqual(frozenset(['run.n.01', 'run.v.01']), record['synsets'])
+
+    def test_exception(self):
+        self.assertEqual('mouse', self.index.get_word_record('mice')['base'])
+        self.assertEqual(frozenset(['run.v.01']), self.index.get_word_record('ran')['synsets'])
+
+    def test_upper_case(self):
+        # as wn.morphy and wn.synsets, the base form is case sensitive but the synsets are not
+        record = self.index.get_word_record('Dogs')
+        self.assertIsNone(record['base'])
+        self.assertEqual(frozenset(['dog.n.01', 'chase.v.01']), record['synsets'])
+
+    def test_unknown_word(self):
+        record = self.index.get_word_record('the')
+        self.assertIsNone(record['base'])
+        for field in RECORD_SETS:
+            self.assertEqual(frozenset(), record[field])
+
+    def test_word_records(self):
+        words = ['dog', 'dogs', 'mice', 'the', 'dog']
+        word_records = self.index.get_word_records(words)
+        self.assertEqual(set(words), set(word_records))
+        for word in words:
+            self.assertEqual(self.index.get_word_record(word), word_records[word])
+
+    def test_verbocean_relations(self):
+        self.assertEqual({'stronger-than'}, self.index.get_verbocean_relations('run', 'walk'))
+        self.assertEqual(set(), self.index.get_verbocean_relations('walk', 'run'))
+
+class LinguisticToolsIndexTestCase(LexicalIndexFixture):
+    def setUp(self):
+        super().setUp()
+        self.saved_index = linguistic_tools.LEXICAL_INDEX
+        self.saved_records = dict(linguistic_tools.WORD_RECORDS)
+        self.saved_relations = dict(linguistic_tools.RELATION_CACHE)
+        self.saved_sizes = (linguistic_tools.RELATION_CACHE_SIZE, linguistic_tools.WORD_RECORDS_SIZE)
+        self.saved_find = linguistic_tools.find_linguistic_relationship
+        self.saved_store_file = linguistic_tools.RELATION_STORE_FILE
+        linguistic_tools.load_lexical_index(self.index_file)
+        linguistic_tools.RELATION_CACHE.clear()
+
+    def tearDown(self):
+        linguistic_tools.LEXICAL_INDEX.close()
+        linguistic_tools.LEXICAL_INDEX = self.saved_index
+        linguistic_tools.WORD_RECORDS.clear()
+        linguistic_tools.WORD_RECORDS.update(self.saved_records)
+        linguistic_tools.RELATION_CACHE.clear()
+        linguistic_tools.RELATION_CACHE.update(self.saved_relations)
+        (linguistic_tools.RELATION_CACHE_SIZE, linguistic_tools.WORD_RECORDS_SIZE) = self.saved_sizes
+        linguistic_tools.find_linguistic_relationship = self.saved_find
+        self.close_relation_stores()
+        linguistic_tools.RELATION_STORE_FILE = self.saved_store_file
+        super().tearDown()
+
+    def close_relation_stores(self):
+        for store in linguistic_tools.RELATION_STORES.values():
+            store.close()
+        linguistic_tools.RELATION_STORES.clear()
+
+    def start_new_run(self):
+        """forget the relations kept in memory, and fail on the relations not stored"""
+        self.close_relation_stores()
+        linguistic_tools.RELATION_CACHE.clear()
+        def find_linguistic_relationship(word1, word2):
+            raise AssertionError('{0} {1} not stored'.format(word1, word2))
+        linguistic_tools.find_linguistic_relationship = find_linguistic_relationship
+
+    def test_prefetch_word_records(self):
+        linguistic_tools.prefetch_word_records(['dogs', 'the'])
+        self.assertEqual({'dogs', 'the', 'dog'}, set(linguistic_tools.WORD_RECORDS))
+        self.assertEqual('dog', linguistic_tools.get_base_word('dogs'))
+        self.assertEqual('the', linguistic_tools.get_base_word('the'))
+
+    def test_relations_without_wordnet(self):
+        self.assertEqual([['inflection'], [], ['hypernym'], ['stronger-than']],
+                         linguistic_tools.linguistic_relationships(
+                             [('dogs', 'dog'), ('dogs', 'the'), ('dogs', 'canine'),
+                              ('ran', 'walk')]))
+
+    def test_relation_store_round_trip(self):
+        linguistic_tools.open_relation_store(os.path.join(self.tmp_dir.name, "wordnet.db"))
+        word_pairs = [('dogs', 'dog'), ('dogs', 'canine'), ('ran', 'walk'), ('dogs', 'the')]
+        linguistic_tools.warm_relation_cache(word_pairs)
+        self.start_new_run()
+        self.assertEqual([['inflection'], ['hypernym'], ['stronger-than'], []],
+                         linguistic_tools.linguistic_relationships(word_pairs))
+        self.assertEqual(set(word_pairs), set(linguistic_tools.RELATION_CACHE))
+
+    def test_relation_store_beyond_memory(self):
+        linguistic_tools.open_relation_store(os.path.join(self.tmp_dir.name, "wordnet.db"))
+        linguistic_tools.RELATION_CACHE_SIZE = 1
+        for word_pair in [('dogs', 'dog'), ('dogs', 'canine'), ('ran', 'walk')]:
+            linguistic_tools.linguistic_relationship(*word_pair)
+        self.assertEqual(1, len(linguistic_tools.RELATION_CACHE))
+        self.start_new_run()
+        self.assertEqual(['inflection'], linguistic_tools.linguistic_relationship('dogs', 'dog'))
+        self.assertEqual(['hypernym'], linguistic_tools.linguistic_relationship('dogs', 'canine'))
+
+    def test_relation_store_workers(self):
+        linguistic_tools.open_relation_store(os.path.join(self.tmp_dir.name, "wordnet.db"))
+        word_pairs = [('dogs', 'dog'), ('dogs', 'canine'), ('ran', 'walk'), ('dogs', 'the')]
+        # the worker processes forked by prove.py
+        with multiprocessing.get_context('fork').Pool(2) as pool:
+            pool.starmap(linguistic_tools.linguistic_relationship, word_pairs, chunksize=1)
+        self.assertEqual({}, linguistic_tools.RELATION_CACHE)
+        self.start_new_run()
+        self.assertEqual([['inflection'], ['hypernym'], ['stronger-than'], []],
+                         linguistic_tools.linguistic_relationships(word_pairs))
+
+    def test_bounded_caches(self):
+        linguistic_tools.RELATION_CACHE_SIZE = 2
+        linguistic_tools.WORD_RECORDS_SIZE = 3
+        linguistic_tools.warm_relation_cache([('dogs', 'dog'), ('dogs', 'canine')])
+        # reading dogs dog makes dogs canine the least recently used
+        linguistic_tools.linguistic_relationship('dogs', 'dog')
+        linguistic_tools.warm_relation_cache([('ran', 'walk')])
+        self.assertEqual([('dogs', 'dog'), ('ran', 'walk')], list(linguistic_tools.RELATION_CACHE))
+        self.assertEqual(3, len(linguistic_tools.WORD_RECORDS))
+        linguistic_tools.prefetch_word_records(['mice', 'the', 'dogs', 'canine'])
+        self.assertEqual(3, len(linguistic_tools.WORD_RECORDS))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(LexicalIndexTestCase)
+    suite2 = unittest.TestLoader().loadTestsFromTestCase(LinguisticToolsIndexTestCase)
+    suites = unittest.TestSuite([suite1, suite2])
+    unittest.TextTestRunner(verbosity=2).run(suites)
@@ -15,8 +15,157 @@
 #  limitations under the License.
 
 import json
+import os
+from collections import OrderedDict
 from nltk.corpus import wordnet as wn
 
+from .lexical_index import LexicalIndex
+from .sqlite_store import LRUStore
+
+RELATION_CACHE_SIZE = 65536
+WORD_RECORDS_SIZE = 65536
+
+# the relations of the word pairs found last, as {(word1, word2): [relation, ...]}
+RELATION_CACHE = OrderedDict()
+# the records of make_word_record of the words looked up last
+WORD_RECORDS = OrderedDict()
+
+# the SQLite file of the relations of word pairs kept across runs, or None
+RELATION_STORE_FILE = None
+# the relation stores opened by this process
+RELATION_STORES = {}
+
+def cache_get(cache, key):
+    """the value of key in an LRU cache, or None"""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+def cache_put(cache, key, value, max_size):
+    """add key to an LRU cache, dropping the least recently used keys past max_size"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+# the index of en/wordnet_to_index.py, or None to query WordNet and VerbOcean
+LEXICAL_INDEX = None
+
+def make_synsets_record(synsets):
+    """
+    The synsets, and the synsets or lemmas they are related to. The synsets
+    are kept by name, so the records read from a LexicalIndex can be
+    compared with these.
+    """
+    hyper = lambda s: s.hypernyms()
+    lemmas = [lemma for synonym in synsets for lemma in synonym.lemmas()]
+    return {
+        'synsets': frozenset(synonym.name() for synonym in synsets),
+        'hypernyms': frozenset(hypernym.name() for synonym in synsets \
+                                               for hypernym in synonym.closure(hyper)),
+        'similar': frozenset(similar.name() for synonym in synsets \
+                                            for similar in synonym.similar_tos()),
+        'holonyms': frozenset(holonym.name() for synonym in synsets \
+                                             for holonym in synonym.member_holonyms() + \
+                                                            synonym.substance_holonyms() + \
+                                                            synonym.part_holonyms()),
+        'antonyms': frozenset(antonym_synset.name() for lemma in lemmas \
+                                                    for antonym in lemma.antonyms() \
+                                                      for antonym_synset in wn.synsets(antonym.name())),
+        'entailments': frozenset(entailment.name() for synonym in synsets \
+                                                   for entailment in synonym.entailments()),
+        'derivations': frozenset(drf.name() for lemma in lemmas \
+                                            for drf in lemma.derivationally_related_forms()),
+    }
+
+def make_word_record(word):
+    """Query WordNet for the base form of a word and the record of its synsets."""
+    record = make_synsets_record(wn.synsets(word))
+    record['base'] = wn.morphy(word)
+    return record
+
+# The record of a word is computed once, from the index if there is one.
+def get_word_record(word):
+    record = cache_get(WORD_RECORDS, word)
+    if record is None:
+        if LEXICAL_INDEX is not None:
+            record = LEXICAL_INDEX.get_word_record(word)
+        else:
+            record = make_word_record(word)
+        cache_put(WORD_RECORDS, word, record, WORD_RECORDS_SIZE)
+    return record
+
+def prefetch_word_records(words):
+    """read the records of words, and of their base forms, from the index at once"""
+    if LEXICAL_INDEX is None:
+        return
+    for _ in range(2):
+        missing_words = [word for word in set(words) if word not in WORD_RECORDS]
+        for word, record in LEXICAL_INDEX.get_word_records(missing_words).items():
+            cache_put(WORD_RECORDS, word, record, WORD_RECORDS_SIZE)
+        words = [get_base_word(word) for word in words]
+
+def load_lexical_index(index_file):
+    """query the index built by en/wordnet_to_index.py instead of WordNet"""
+    global LEXICAL_INDEX
+    LEXICAL_INDEX = LexicalIndex(index_file)
+    WORD_RECORDS.clear()
+
+def get_synsets(word):
+    return get_word_record(word)['synsets']
+
+def get_base_word(word):
+    base_word = get_word_record(word)['base']
+    return word.lower() if base_word is None else base_word
+
+class RelationStore(LRUStore):
+    """
+    A store of the relations of word pairs, written as they are found, so
+    they are kept across runs and shared by the worker processes of prove.py.
+    Its size is bounded by max_bytes, not by the relations kept in memory.
+    """
+    def __init__(self, store_file, max_bytes=256 * 1024 * 1024):
+        super().__init__(store_file, "relations", [("relations", "TEXT NOT NULL")],
+                         max_bytes=max_bytes)
+
+    def make_pair_key(self, word1, word2):
+        return self.make_key(word1 + "\n" + word2)
+
+    def get_relations(self, word_pairs):
+        """the stored relations of word pairs, as {(word1, word2): [relation, ...]}"""
+        pair_keys = {self.make_pair_key(word1, word2): (word1, word2) for word1, word2 in word_pairs}
+        return {pair_keys[key]: json.loads(relations)
+                for key, (relations,) in self.get_rows(pair_keys).items()}
+
+    def put_relations(self, pair_relations):
+        """store the relations of word pairs, given as {(word1, word2): [relation, ...]}"""
+        rows = []
+        for (word1, word2), relations in pair_relations.items():
+            relations_json = json.dumps(relations)
+            rows.append((self.make_pair_key(word1, word2), (relations_json,),
+                         len(word1) + len(word2) + len(relations_json)))
+        self.put_rows(rows)
+
+def open_relation_store(store_file):
+    """read and write the relations of word pairs in a SQLite file as they are looked up"""
+    global RELATION_STORE_FILE
+    RELATION_STORE_FILE = store_file
+
+def get_relation_store():
+    """get the relation store of this process, opening it on first use, or None"""
+    if RELATION_STORE_FILE is None:
+        return None
+    # the worker processes forked by prove.py must not share the connection of their parent
+    store_key = (os.getpid(), RELATION_STORE_FILE)
+    if store_key not in RELATION_STORES:
+        RELATION_STORES[store_key] = RelationStore(RELATION_STORE_FILE)
+    return RELATION_STORES[store_key]
+
+def warm_relation_cache(word_pairs):
+    """find the relations of word pairs ahead of time"""
+    linguistic_relationships(word_pairs)
+
 # Obtain lemmas of synonyms.
 def obtain_synonyms(word):
     return set([lemma for synonym in wn.synsets(word) \
@@ -103,33 +252,18 @@ def obtain_linguistic_relationships(word):
 # between the synset of word1 and the synset of word2.
 # If word1 = 'car' and word2 = 'automobile', this function should return True.
 def is_synonym(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    common_synset = set(synsets_word1).intersection(set(synsets_word2))
-    if len(common_synset) != 0:
-        return True
-    return False
+    return not get_synsets(word1).isdisjoint(get_synsets(word2))
 
 # Check whether word1 is a hypernym of word2, by computing the synset of word2,
 # and for every possible meaning of word2, compute whether the hypernym of
 # such meaning is in the list of synonyms (synset) of word1. E.g.
 # is_hypernym('European', 'Swede') returns True.
 def is_hypernym(word1, word2):
-    hyper = lambda s: s.hypernyms()
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    for synonym in synsets_word2:
-        for hypernym in synonym.closure(hyper):
-            if hypernym in synsets_word1:
-                return True
-    return False
+    return not get_word_record(word2)['hypernyms'].isdisjoint(get_synsets(word1))
 
 # Adjective similarity. E.g. big <-> huge.
 def is_similar(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    similar_word1 = set(similar for s in synsets_word1 for similar in s.similar_tos())
-    return True if len(similar_word1.intersection(synsets_word2)) > 0 else False
+    return not get_word_record(word1)['similar'].isdisjoint(get_synsets(word2))
 
 # Check whether word1 is a hyponym of word2, by computing whether
 # word2 is a hypernym of word1. E.g.
@@ -142,16 +276,7 @@ def is_hyponym(word1, word2):
 # is in the list of meanings (synset) of word1. E.g.
 # is_holonym('door', 'lock') returns True.
 def is_holonym(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    for synonym in synsets_word2:
-        holonyms = synonym.member_holonyms() + \
-                   synonym.substance_holonyms() + \
-                   synonym.part_holonyms()
-        for holonym in holonyms:
-            if holonym in synsets_word1:
-                return True
-    return False
+    return not get_word_record(word2)['holonyms'].isdisjoint(get_synsets(word1))
 
 # Check whether word1 is a meronym of word2, by computing whether
 # word2 is a holonym of word1. E.g.
@@ -166,30 +291,12 @@ def is_meronym(word1, word2):
 # is_antonym('good', 'bad') returns True.
 # is_antonym('good', 'poor') returns False.
 def is_antonym(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    antonyms = []
-    for synonym in synsets_word1:
-        for lemma in synonym.lemmas():
-            antonyms.extend(lemma.antonyms()) # antonyms() method only works on lemmas.
-    antonym_names = [antonym.name() for antonym in antonyms]
-    for antonym_name in antonym_names:
-        synsets_antonym = wn.synsets(antonym_name)
-        common_meanings = set(synsets_word2).intersection(set(synsets_antonym))
-        if len(common_meanings) > 0:
-            return True
-    return False
+    return not get_word_record(word1)['antonyms'].isdisjoint(get_synsets(word2))
 
 # Checks whether word1 is entailed by word2. E.g.
 # is_entailed('chew', 'eat') returns True. Only works on verbs.
 def is_entailed(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    synsets_word2 = wn.synsets(word2)
-    for synonym in synsets_word2:
-        entailments = synonym.entailments()
-        if len(set(entailments).intersection(set(synsets_word1))):
-            return True
-    return False
+    return not get_word_record(word2)['entailments'].isdisjoint(get_synsets(word1))
 
 # Snippet found in Stackoverflow.
 def nounify(verb_word):
@@ -220,21 +327,7 @@ def nounify(verb_word):
 # that is, words that had variations in their morphemes or that changed
 # their POS category (e.g. converted from verb to noun).
 def is_derivation(word1, word2):
-    synsets_word1 = wn.synsets(word1)
-    # Word not found
-    if not synsets_word1:
-        return False
-    # Get all lemmas of word1
-    lemmas = [l for s in synsets_word1 for l in s.lemmas()]
-    # Get related forms
-    derivationally_related_forms = \
-      [drf for l in lemmas for drf in l.derivationally_related_forms()]
-    # Get a list of tuples, of the form [(lemma_name, POS), ...]
-    lemma_pos = \
-      [(l.name(), l.synset().name().split('.')[1]) for l in derivationally_related_forms]
-    # Returns True if word2 is in the list of lemma names
-    # that are derivations of word1.
-    return (word2 in [l[0] for l in lemma_pos])
+    return word2 in get_word_record(word1)['derivations']
 
 # Load VerbOcean dictionary.
 try:
@@ -246,6 +339,10 @@ except:
 # Query the verbocean dictionary and return a (possibly empty)
 # set of relations between two verbs.
 def get_verbocean_relations(verb1, verb2):
+    if LEXICAL_INDEX is not None:
+        relations = LEXICAL_INDEX.get_verbocean_relations(verb1, verb2)
+        if relations:
+            return relations
     if verb1 in verbocean and verb2 in verbocean[verb1]:
         return set(verbocean[verb1][verb2])
     return set()
@@ -261,15 +358,44 @@ def get_verbocean_relations(verb1, verb2):
 #   linguistic_relationship('woman', 'women') returns ['inflection'] as expected,
 #   until we implement the 'plural' relationship.
 def linguistic_relationship(word1, word2):
-    (word1, word2) = (word1.strip('"'), word2.strip('"'))
-    if word1 == word2:
-        return ['copy']
-    base_word1 = wn.morphy(word1)
-    base_word2 = wn.morphy(word2)
-    if base_word1 == None:
-        base_word1 = word1.lower()
-    if base_word2 == None:
-        base_word2 = word2.lower()
+    return linguistic_relationships([(word1, word2)])[0]
+
+def linguistic_relationships(word_pairs):
+    """
+    find the relations of word pairs, reading the relations stored by
+    earlier runs and the records of their words at once
+    """
+    word_pairs = [(word1.strip('"'), word2.strip('"')) for word1, word2 in word_pairs]
+    pair_relations = {}
+    missing_pairs = []
+    for word1, word2 in dict.fromkeys(word_pairs):
+        if word1 == word2:
+            continue
+        relations = cache_get(RELATION_CACHE, (word1, word2))
+        if relations is None:
+            missing_pairs.append((word1, word2))
+        else:
+            pair_relations[(word1, word2)] = relations
+    relation_store = get_relation_store()
+    if missing_pairs and relation_store is not None:
+        stored_relations = relation_store.get_relations(missing_pairs)
+        missing_pairs = [pair for pair in missing_pairs if pair not in stored_relations]
+    else:
+        stored_relations = {}
+    prefetch_word_records([word for word_pair in missing_pairs for word in word_pair])
+    found_relations = {(word1, word2): find_linguistic_relationship(word1, word2)
+                       for word1, word2 in missing_pairs}
+    if found_relations and relation_store is not None:
+        relation_store.put_relations(found_relations)
+    for word_pair, relations in list(stored_relations.items()) + list(found_relations.items()):
+        cache_put(RELATION_CACHE, word_pair, relations, RELATION_CACHE_SIZE)
+        pair_relations[word_pair] = relations
+    return [['copy'] if word1 == word2 else list(pair_relations[(word1, word2)])
+            for word1, word2 in word_pairs]
+
+def find_linguistic_relationship(word1, word2):
+    base_word1 = get_base_word(word1)
+    base_word2 = get_base_word(word2)
     ling_relations = []
     if word1 != word2 and base_word1 == base_word2:
         return ['inflection']
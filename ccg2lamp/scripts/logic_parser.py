@@ -13,7 +13,10 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
+import functools
 import logging
+import threading
+from collections import OrderedDict
 #import traceback
 
 from nltk.sem.logic import Expression
@@ -25,6 +28,10 @@ my_logger = logging.getLogger(__name__)
 PE_PRE = "PE:"
 PE_DEL = "|"
 
+# bounds of the caches of parsed formulas and simplified applications
+LEXPR_CACHE_SIZE = 65536
+SIMPLIFY_CACHE_SIZE = 65536
+
 class PartialExpression(Expression):
     """Store fragments of valid expressions that cannot be composed"""
     def __init__(self, exp_list):
@@ -101,7 +108,7 @@ def combine_partial_expressions(function: Expression, argument: Expression):
 
 def recover_partial_expressions(evaluation, function, argument):
     # check if evaluation is valid
-    if lexpr(str(evaluation)):
+    if lexpr_shared(str(evaluation)):
         # the expression is valid as it can be parsed
         return evaluation
     else:
@@ -122,3 +129,41 @@ def lexpr(formula_str):
         my_logger.debug(f'Failed to parse {formula_str}. Error: {e}')
         #print(traceback.print_stack())
         return None
+
+def lexpr_shared(formula_str):
+    """
+    Like lexpr, but memoized: the same formula returns the same expression.
+    The expression must not be changed, e.g. by typecheck() which sets
+    the types of its variables, so this is only for semantic composition.
+    """
+    if is_partial_expression(formula_str):
+        # partial expressions grow when combined, so they are never shared
+        return lexpr(formula_str)
+    return parse_formula(formula_str)
+
+@functools.lru_cache(maxsize=LEXPR_CACHE_SIZE)
+def parse_formula(formula_str):
+    return lexpr(formula_str)
+
+simplify_cache = OrderedDict()
+simplify_cache_lock = threading.Lock()
+def apply_and_simplify(function, argument):
+    """
+    function(argument).simplify(), memoized by the identity of both
+    expressions, which lexpr_shared and this memo share across sentences,
+    so the expressions are not printed to look them up. The cache keeps
+    them alive, so their ids are not reused while they are cached.
+    """
+    if isinstance(function, PartialExpression) or isinstance(argument, PartialExpression):
+        return function(argument).simplify()
+    key = (id(function), id(argument))
+    with simplify_cache_lock:
+        if key in simplify_cache:
+            simplify_cache.move_to_end(key)
+            return simplify_cache[key][2]
+    evaluation = function(argument).simplify()
+    with simplify_cache_lock:
+        simplify_cache[key] = (function, argument, evaluation)
+        if len(simplify_cache) > SIMPLIFY_CACHE_SIZE:
+            simplify_cache.popitem(last=False)
+    return evaluation
@@ -0,0 +1,32 @@
+"""Tests of the memoized application of the semantic composition"""
+import unittest
+
+from . import logic_parser
+from .logic_parser import apply_and_simplify, lexpr, lexpr_shared
+
+class ApplyAndSimplifyTestCase(unittest.TestCase):
+    def setUp(self):
+        with logic_parser.simplify_cache_lock:
+            logic_parser.simplify_cache.clear()
+
+    def test_shared_expressions(self):
+        function = lexpr_shared(r'\x.(_dog(x) & _run(x))')
+        argument = lexpr_shared('john')
+        evaluation = apply_and_simplify(function, argument)
+        self.assertEqual(lexpr('_dog(john) & _run(john)'), evaluation)
+        self.assertIs(evaluation, apply_and_simplify(function, argument))
+
+    def test_equal_expressions(self):
+        evaluation = apply_and_simplify(lexpr(r'\x._dog(x)'), lexpr('john'))
+        self.assertEqual(evaluation, apply_and_simplify(lexpr(r'\x._dog(x)'), lexpr('john')))
+
+    def test_reused_ids(self):
+        # the expressions of the other calls are freed, so their ids may be reused
+        for index in range(100):
+            function = lexpr(rf'\x._pred{index}(x)')
+            self.assertEqual(lexpr(f'_pred{index}(john)'), apply_and_simplify(function, lexpr('john')))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(ApplyAndSimplifyTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
@@ -16,7 +16,32 @@
 
 import re
 import codecs
+import sys
+from functools import lru_cache
 
+# The symbols replaced by normalize_token. A lone hyphen or ampersand is
+# tried before the hyphen inside a token. None of the replacements contains
+# a symbol, so one pass gives the same result as replacing them in turn.
+NORMALIZATIONS = {
+    '.': '_DOT',
+    ',': '_COMMA',
+    '(': '_LEFTB',
+    ')': '_RIGHTB',
+    '!': '_EXCLAMATION',
+    '-': '_dash_',
+}
+NORMALIZATION_REGEX = re.compile(r'^(-)$|^(&)$|[.,()!\-]')
+
+def replace_normalized_symbol(match):
+    if match.group(1):
+        return '_HYPHEN'
+    if match.group(2):
+        return '_AMPERSAND'
+    return NORMALIZATIONS[match.group(0)]
+
+# Tokens and rule attributes come from small vocabularies that repeat
+# over sentences and templates.
+@lru_cache(maxsize=65536)
 def normalize_token(token):
     """
     Convert symbols to avoid collisions with reserved punctuation
@@ -24,41 +49,74 @@ def normalize_token(token):
     To avoid collisions with reserved words, we prefix each token
     with an underscore '_'.
     """
-    normalized = token
-    normalized = re.sub(r'\.', '_DOT', normalized)
-    normalized = re.sub(r',', '_COMMA', normalized)
-    normalized = re.sub(r'\(', '_LEFTB', normalized)
-    normalized = re.sub(r'\)', '_RIGHTB', normalized)
-    normalized = re.sub(r'^-$', '_HYPHEN', normalized)
-    normalized = re.sub(r'^&$', '_AMPERSAND', normalized)
-    normalized = re.sub(r'!', '_EXCLAMATION', normalized)
-    normalized = re.sub(r'-', '_dash_', normalized)
+    normalized = NORMALIZATION_REGEX.sub(replace_normalized_symbol, token)
     if not normalized.startswith('_'):
         normalized = '_' + normalized
-    return normalized
+    return sys.intern(normalized)
 
+def normalize_token_batch(tokens):
+    """
+    Normalize a sequence of tokens, such as the base forms of
+    a <tokens> element.
+    """
+    return [normalize_token(token) for token in tokens]
+
+# The replacements of denormalize_token, in the order they are applied.
+# '_dash_' shares its underscores with its neighbours, so the order
+# changes the result (e.g. of '_dash_DOT').
+DENORMALIZATIONS = (
+    ('_DOT', r'\.'),
+    ('_COMMA', ','),
+    ('_LEFTB', r'\('),
+    ('_RIGHTB', r'\)'),
+    ('_HYPHEN', '^-$'),
+    ('_AMPERSAND', '^&$'),
+    ('_EXCLAMATION', '!'),
+    ('_dash_', '-'),
+)
+TYPE_SUFFIX_REGEX = re.compile(r'_[a-z][0-9]$')
+
+@lru_cache(maxsize=65536)
 def denormalize_token(token):
     """
     Unconvert symbols. This is the reverse operation as above.
     """
     denormalized = token
-    denormalized = re.sub('_DOT', r'\.', denormalized)
-    denormalized = re.sub('_COMMA', r',', denormalized)
-    denormalized = re.sub('_LEFTB', r'\(', denormalized)
-    denormalized = re.sub('_RIGHTB', r'\)', denormalized)
-    denormalized = re.sub('_HYPHEN', r'^-$', denormalized)
-    denormalized = re.sub('_AMPERSAND', r'^&$', denormalized)
-    denormalized = re.sub('_EXCLAMATION', r'!', denormalized)
-    denormalized = re.sub('_dash_', r'-', denormalized)
+    for normalized, symbol in DENORMALIZATIONS:
+        denormalized = denormalized.replace(normalized, symbol)
     # Remove possible suffix that was introduced to avoid type clashes.
-    denormalized = re.sub(r'_[a-z][0-9]$', '', denormalized)
+    denormalized = TYPE_SUFFIX_REGEX.sub('', denormalized)
     denormalized = denormalized.lstrip('_')
     return denormalized
 
-def substitute_invalid_chars(script, replacement_filename):
+class ReplacementTable(object):
+    """
+    Replacements of invalid characters, read once from a replacement file.
+    They are applied with one str.replace per entry, in the order of the
+    file, which scans a script faster than str.translate or a regular
+    expression for tables of a few characters.
+    """
+
+    def __init__(self, replacements):
+        self.replacements = list(dict(replacements).items())
+
+    def substitute(self, script):
+        for invalid_str, valid_str in self.replacements:
+            script = script.replace(invalid_str, valid_str)
+        return script
+
+@lru_cache(maxsize=None)
+def load_replacement_table(replacement_filename):
+    """read a replacement file once per process"""
     with codecs.open(replacement_filename, 'r', 'utf-8') as finput:
-        repl = dict(line.strip().split() for line in finput)
-        for invalid_char, valid_char in repl.items():
-            script = script.replace(invalid_char, valid_char)
-    return script
+        return ReplacementTable(line.strip().split() for line in finput)
+
+def substitute_invalid_chars(script, replacement_table):
+    """
+    Replace the invalid characters of a script, given a ReplacementTable
+    or the name of a replacement file.
+    """
+    if not isinstance(replacement_table, ReplacementTable):
+        replacement_table = load_replacement_table(replacement_table)
+    return replacement_table.substitute(script)
 
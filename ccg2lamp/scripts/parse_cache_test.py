@@ -0,0 +1,51 @@
+"""Tests of the on-disk cache of the C&C parse trees"""
+import os
+import unittest
+
+from lxml import etree
+
+from ccg2lamp.en.parse_cache import ParseCache
+from .sqlite_store_test import LRUStoreFixture
+
+def make_tree(root_id):
+    return etree.fromstring(f'<ccg root="{root_id}"><span id="{root_id}"/></ccg>')
+
+class ParseCacheTestCase(LRUStoreFixture):
+    def setUp(self):
+        super().setUp()
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache", "parses.db")
+
+    def open_cache(self, parser_identity="candc --models models", **kwargs):
+        return self.keep_store(ParseCache(self.cache_file, parser_identity, **kwargs))
+
+    def test_trees(self):
+        cache = self.open_cache()
+        sentences = [["A", "dog", "runs", "."], ["Dogs", "bark"]]
+        self.assertEqual({}, cache.get_trees(sentences))
+        cache.put_trees(sentences, [make_tree("s0"), None])
+        cached_trees = self.open_cache().get_trees(
+            [["Dogs", "bark"], ["A", "cat"], ["A", "dog", "runs", "."], ["A", "dog", "runs", "."]])
+        self.assertEqual([0, 2, 3], sorted(cached_trees))
+        # the parser failed on the sentence
+        self.assertIsNone(cached_trees[0])
+        self.assertEqual(etree.tostring(make_tree("s0")), etree.tostring(cached_trees[2]))
+        # every sentence gets its own copy of the tree
+        self.assertIsNot(cached_trees[2], cached_trees[3])
+
+    def test_parser_identity(self):
+        self.open_cache().put_trees([["Dogs", "bark"]], [make_tree("s0")])
+        self.assertEqual({}, self.open_cache("candc --models other_models").get_trees([["Dogs", "bark"]]))
+
+    def test_lru_eviction(self):
+        tree_size = len(etree.tostring(make_tree("s0")))
+        cache = self.open_cache(max_bytes=2 * tree_size)
+        cache.put_trees([["a"], ["b"]], [make_tree("s0"), make_tree("s1")])
+        # reading a makes b the least recently used
+        cache.get_trees([["a"]])
+        cache.put_trees([["c"]], [make_tree("s2")])
+        self.assertEqual([0, 2], sorted(cache.get_trees([["a"], ["b"], ["c"]])))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(ParseCacheTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
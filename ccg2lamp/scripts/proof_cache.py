@@ -0,0 +1,58 @@
+"""On-disk cache of the coqtop outputs of Coq scripts"""
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from .sqlite_store import get_path_identity, LRUStore
+
+# the caches opened by this process
+PROOF_CACHES = {}
+PROOF_CACHES_LOCK = threading.Lock()
+
+class ProofCache(LRUStore):
+    """
+    A store that maps a hash of a Coq script and of coqlib to the output
+    lines of coqtop, or to a timeout together with the time limit that was
+    exceeded. The tactics are part of the script, so they are covered by its
+    hash. When the store grows over max_bytes, the least recently used
+    outputs are evicted.
+    """
+    def __init__(self, cache_file: str,
+                 coqlib_file: str = None,
+                 max_bytes: int = 256 * 1024 * 1024):
+        coqlib_identity = get_path_identity(coqlib_file, hash_content=True) if coqlib_file else ""
+        super().__init__(cache_file, "proofs", [("output", "TEXT"), ("timeout", "INTEGER")],
+                         coqlib_identity, max_bytes)
+
+    def get_outcome(self, coq_script: str, timeout: int) -> Optional[Tuple[bool, List[str]]]:
+        """
+        Look up a script, returning (timed_out, output_lines) on a hit.
+        A timeout only counts as a hit if it was reached with a time limit
+        at least as long as the requested one.
+        """
+        key = self.make_key(coq_script)
+        row = self.get_rows([key]).get(key)
+        if row is None:
+            return None
+        output, exceeded_timeout = row
+        if output is None:
+            return (True, []) if exceeded_timeout >= timeout else None
+        return False, output.split("\n")
+
+    def put_output(self, coq_script: str, output_lines: List[str]):
+        """store the output lines of a script"""
+        output = "\n".join(output_lines)
+        self.put_rows([(self.make_key(coq_script), (output, None), len(output))])
+
+    def put_timeout(self, coq_script: str, timeout: int):
+        """store that a script did not finish within timeout seconds"""
+        self.put_rows([(self.make_key(coq_script), (None, timeout), 0)])
+
+def get_proof_cache(cache_file: str, coqlib_file: str = None) -> ProofCache:
+    """get the cache of this process for a file, opening it on first use"""
+    # the worker processes forked by prove.py must not share the connection of their parent
+    cache_key = (os.getpid(), cache_file, coqlib_file)
+    with PROOF_CACHES_LOCK:
+        if cache_key not in PROOF_CACHES:
+            PROOF_CACHES[cache_key] = ProofCache(cache_file, coqlib_file)
+        return PROOF_CACHES[cache_key]
@@ -0,0 +1,86 @@
+"""Tests of the on-disk cache of the coqtop outputs"""
+import os
+import unittest
+
+from . import proof_cache
+from .proof_cache import get_proof_cache, ProofCache
+from .sqlite_store_test import LRUStoreFixture
+
+class ProofCacheTestCase(LRUStoreFixture):
+    def setUp(self):
+        super().setUp()
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache", "proofs.db")
+        self.coqlib_file = os.path.join(self.tmp_dir.name, "coqlib.v")
+        self.write_coqlib("Ltac nltac := auto.")
+
+    def write_coqlib(self, content):
+        with open(self.coqlib_file, "w") as fout:
+            fout.write(content)
+
+    def open_cache(self, **kwargs):
+        return self.keep_store(ProofCache(self.cache_file, self.coqlib_file, **kwargs))
+
+    def test_output(self):
+        cache = self.open_cache()
+        self.assertIsNone(cache.get_outcome("script", 100))
+        cache.put_output("script", ["t1 is defined", "", "Coq <"])
+        self.assertEqual((False, ["t1 is defined", "", "Coq <"]), cache.get_outcome("script", 100))
+        # an output does not depend on the time limit
+        self.assertEqual((False, ["t1 is defined", "", "Coq <"]), cache.get_outcome("script", 1))
+        self.assertIsNone(cache.get_outcome("other script", 100))
+
+    def test_timeout(self):
+        cache = self.open_cache()
+        cache.put_timeout("script", 10)
+        self.assertEqual((True, []), cache.get_outcome("script", 5))
+        self.assertEqual((True, []), cache.get_outcome("script", 10))
+        # the script may finish with a longer time limit
+        self.assertIsNone(cache.get_outcome("script", 20))
+        cache.put_output("script", ["t1 is defined"])
+        self.assertEqual((False, ["t1 is defined"]), cache.get_outcome("script", 20))
+
+    def test_persistence(self):
+        self.open_cache().put_output("script", ["t1 is defined"])
+        self.assertEqual((False, ["t1 is defined"]), self.open_cache().get_outcome("script", 100))
+
+    def test_lru_eviction(self):
+        cache = self.open_cache(max_bytes=10)
+        cache.put_output("a", ["aaaa"])
+        cache.put_output("b", ["bbbb"])
+        # reading a makes b the least recently used
+        self.assertIsNotNone(cache.get_outcome("a", 100))
+        cache.put_output("c", ["cccc"])
+        self.assertIsNone(cache.get_outcome("b", 100))
+        self.assertEqual((False, ["aaaa"]), cache.get_outcome("a", 100))
+        self.assertEqual((False, ["cccc"]), cache.get_outcome("c", 100))
+        # timeouts take no room
+        cache.put_timeout("d", 10)
+        self.assertIsNotNone(cache.get_outcome("a", 100))
+        self.assertIsNotNone(cache.get_outcome("d", 10))
+
+    def test_coqlib_change(self):
+        self.open_cache().put_output("script", ["t1 is defined"])
+        self.write_coqlib("Ltac nltac := firstorder.")
+        self.assertIsNone(self.open_cache().get_outcome("script", 100))
+        self.write_coqlib("Ltac nltac := auto.")
+        self.assertIsNotNone(self.open_cache().get_outcome("script", 100))
+
+    def test_missing_coqlib(self):
+        cache = self.keep_store(ProofCache(self.cache_file))
+        cache.put_output("script", ["t1 is defined"])
+        os.remove(self.coqlib_file)
+        self.assertIsNotNone(self.open_cache().get_outcome("script", 100))
+
+    def test_get_proof_cache(self):
+        cache = get_proof_cache(self.cache_file, self.coqlib_file)
+        try:
+            self.assertIs(cache, get_proof_cache(self.cache_file, self.coqlib_file))
+        finally:
+            with proof_cache.PROOF_CACHES_LOCK:
+                proof_cache.PROOF_CACHES.pop((os.getpid(), self.cache_file, self.coqlib_file))
+            cache.close()
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(ProofCacheTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
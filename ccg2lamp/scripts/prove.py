@@ -29,6 +29,8 @@ import sys
 import textwrap
 import traceback
 
+from . import linguistic_tools
+from . import theorem as coq_theorem
 from .semantic_tools import prove_doc
 from .utils import time_count
 from .visualization_tools import convert_root_to_mathml
@@ -72,6 +74,25 @@ def main(args = None):
         help="Maximum running time for each possible theorem.")
     parser.add_argument("--ncores", nargs='?', type=int, default="1",
         help="Number of cores for multiprocessing.")
+    parser.add_argument("--coq_sessions", nargs='?', type=int, default="0",
+        help="Number of warm coqtop sessions per core (default: a coqtop per theorem).")
+    parser.add_argument("--proof_cache", nargs='?', type=str, default=None,
+        help="SQLite file that caches the coqtop outputs across runs and cores.")
+    parser.add_argument("--coq_workers", nargs='?', type=int, default="1",
+        help="Number of theorems and negations proved at the same time per core.")
+    parser.add_argument("--failure_logs", nargs='?', type=str, default="unknown",
+        choices=["unknown", "no"],
+        help="Analyze the failures of the unknown theorems with an extra coq run (default: unknown).")
+    parser.add_argument("--staged_tactics", action="store_true", default=False,
+        help="Try cheap tactics with timeouts adapted to the dataset before the full tactics.")
+    parser.add_argument("--wordnet_cache", nargs='?', type=str, default=None,
+        help="SQLite file of the WordNet relations of word pairs, read and written while proving.")
+    parser.add_argument("--lexical_index", nargs='?', type=str, default=None,
+        help="SQLite index built by en/wordnet_to_index.py, queried instead of WordNet.")
+    parser.add_argument("--batch_axiom_checks", action="store_true", default=False,
+        help="Check the types of all the candidate axioms of an abduction in one coq run.")
+    parser.add_argument("--ranked_semantics", action="store_true", default=False,
+        help="Prove the n-best theorems best first and skip the failed conclusions.")
     ARGS = parser.parse_args()
 
     logging.basicConfig(level=logging.WARNING)
@@ -97,6 +118,8 @@ def prove_entail(root):
     global DOCS
     global ABDUCTION
 
+    # the timeouts adapt to the latencies of this dataset only
+    coq_theorem.TACTIC_LATENCIES.clear()
     if ARGS.abduction == "spsa":
         from .abduction_spsa import AxiomsWordnet
         ABDUCTION = AxiomsWordnet()
@@ -104,6 +127,11 @@ def prove_entail(root):
         from .abduction_naive import AxiomsWordnet
         ABDUCTION = AxiomsWordnet()
 
+    if ARGS.lexical_index:
+        linguistic_tools.load_lexical_index(ARGS.lexical_index)
+    if ARGS.wordnet_cache:
+        linguistic_tools.open_relation_store(ARGS.wordnet_cache)
+
     DOCS = root.findall('.//document')
     document_inds = range(len(DOCS))
     proof_nodes = prove_docs(document_inds, ARGS.ncores)
@@ -149,7 +177,7 @@ def prove_doc_ind(document_ind):
         proof_node.set('status', 'success')
         inference_result = theorem.result
         proof_node.set('inference_result', inference_result)
-        theorems_node = theorem.to_xml()
+        theorems_node = theorem.to_xml(ARGS.failure_logs != "no")
         proof_node.append(theorems_node)
     except TimeoutExpired as e:
         proof_node.set('status', 'timedout')
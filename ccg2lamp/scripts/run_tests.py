@@ -17,6 +17,7 @@
 
 import unittest
 
+from .abduction_tools_test import AxiomCheckTestCase
 from .abduction_tools_test import GetPremisesThatMatchConclusionArgsTestCase
 from .abduction_tools_test import GetTreePredArgsTestCase
 from .category_test import CategoryTestCase
@@ -27,6 +28,7 @@ from .ccg2lambda_tools_test import TypeRaiseTestCase
 from .knowledge_test import LexicalRelationsTestCase
 from .nltk2coq_test import Nltk2coqTestCase
 from .semantic_index_test import GetSemanticRepresentationTestCase
+from .semantic_index_test import GetRelevantRulesTestCase
 from .semantic_tools_test import resolve_prefix_to_infix_operationsTestCase
 from .semantic_types_test import ArbiAutoTypesTestCase
 from .semantic_types_test import build_arbitrary_dynamic_libraryTestCase
@@ -34,6 +36,23 @@ from .semantic_types_test import build_dynamic_libraryTestCase
 from .semantic_types_test import Coq2NLTKTypesTestCase
 from .semantic_types_test import Coq2NLTKSignaturesTestCase
 from .semantic_types_test import combine_signatures_or_rename_predsTestCase
+from .xml_utils_test import SerializeTreeToFileTestCase
+from .lexical_index_test import LexicalIndexTestCase
+from .lexical_index_test import LinguisticToolsIndexTestCase
+from .theorem_test import GenerateRankedCombinationsTestCase
+from .theorem_test import MasterTheoremLazyTestCase
+from .theorem_test import ProveScriptsTestCase
+from .theorem_test import MasterTheoremProveTestCase
+from .theorem_test import TacticLatenciesTestCase
+from .theorem_test import TacticStagesTestCase
+from .proof_cache_test import ProofCacheTestCase
+from .parse_cache_test import ParseCacheTestCase
+from .candc2transccg_test import AlignCCGTreesTestCase
+from .step_syn_parser_test import SplitIntoShardsTestCase
+from .step_sem_parser_test import CCGSemParserCloseTestCase
+from .logic_parser_test import ApplyAndSimplifyTestCase
+from .sqlite_store_test import SelectInTestCase
+from .sqlite_store_test import GetPathIdentityTestCase
 
 if __name__ == '__main__':
     suite1  = unittest.TestLoader().loadTestsFromTestCase(AssignSemanticsToCCGTestCase)
@@ -53,7 +72,31 @@ if __name__ == '__main__':
     suite15 = unittest.TestLoader().loadTestsFromTestCase(GetPremisesThatMatchConclusionArgsTestCase)
     suite16 = unittest.TestLoader().loadTestsFromTestCase(combine_signatures_or_rename_predsTestCase)
     suite17 = unittest.TestLoader().loadTestsFromTestCase(CategoryTestCase)
+    suite18 = unittest.TestLoader().loadTestsFromTestCase(GetRelevantRulesTestCase)
+    suite19 = unittest.TestLoader().loadTestsFromTestCase(AxiomCheckTestCase)
+    suite20 = unittest.TestLoader().loadTestsFromTestCase(SerializeTreeToFileTestCase)
+    suite21 = unittest.TestLoader().loadTestsFromTestCase(LexicalIndexTestCase)
+    suite22 = unittest.TestLoader().loadTestsFromTestCase(LinguisticToolsIndexTestCase)
+    suite23 = unittest.TestLoader().loadTestsFromTestCase(GenerateRankedCombinationsTestCase)
+    suite24 = unittest.TestLoader().loadTestsFromTestCase(MasterTheoremLazyTestCase)
+    suite25 = unittest.TestLoader().loadTestsFromTestCase(ProveScriptsTestCase)
+    suite26 = unittest.TestLoader().loadTestsFromTestCase(MasterTheoremProveTestCase)
+    suite27 = unittest.TestLoader().loadTestsFromTestCase(ProofCacheTestCase)
+    suite28 = unittest.TestLoader().loadTestsFromTestCase(ParseCacheTestCase)
+    suite29 = unittest.TestLoader().loadTestsFromTestCase(GetPathIdentityTestCase)
+    suite30 = unittest.TestLoader().loadTestsFromTestCase(AlignCCGTreesTestCase)
+    suite31 = unittest.TestLoader().loadTestsFromTestCase(SplitIntoShardsTestCase)
+    suite32 = unittest.TestLoader().loadTestsFromTestCase(TacticLatenciesTestCase)
+    suite33 = unittest.TestLoader().loadTestsFromTestCase(CCGSemParserCloseTestCase)
+    suite34 = unittest.TestLoader().loadTestsFromTestCase(ApplyAndSimplifyTestCase)
+    suite35 = unittest.TestLoader().loadTestsFromTestCase(SelectInTestCase)
+    suite36 = unittest.TestLoader().loadTestsFromTestCase(TacticStagesTestCase)
     suites  = unittest.TestSuite([suite1, suite2, suite3, suite4, suite5, suite6,
                                   suite7, suite8, suite9, suite10, suite11, suite12,
-                                  suite13, suite14, suite15, suite16, suite17])
+                                  suite13, suite14, suite15, suite16, suite17, suite18,
+                                  suite19, suite20, suite21, suite22,
+                                  suite23, suite24, suite25, suite26,
+                                  suite27, suite28, suite29, suite30,
+                                  suite31, suite32, suite33, suite34,
+                                  suite35, suite36])
     unittest.TextTestRunner(verbosity=2).run(suites)
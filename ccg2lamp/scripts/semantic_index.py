@@ -16,16 +16,21 @@
 
 import codecs
 from lxml import etree
+import re
 import simplejson
 import yaml
 
 from .category import Category
 from .etree_utils import get_node_at_path
-from .logic_parser import lexpr, combine_partial_expressions
+from .logic_parser import lexpr, lexpr_shared, combine_partial_expressions, apply_and_simplify
+from .logic_parser import PartialExpression
 from .normalization import normalize_token
 from .semantic_rule import SemanticRule
 from ccg2lamp.scripts.logic_parser import recover_partial_expressions
 
+# The attributes whose values discriminate the rules in the index.
+INDEX_ATTRIBUTES = ('rule', 'surf', 'base', 'pos')
+
 class SemanticIndex(object):
     def __init__(self, contents):
         # Input might be a string containing a filename, or a list of rules.
@@ -36,6 +41,37 @@ class SemanticIndex(object):
         else:
             self.rules = []
 
+    @property
+    def rules(self):
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._rules = rules
+        self.rule_index = build_rule_index(rules)
+
+    def get_candidate_rules(self, rule_pattern):
+        """
+        Returns, in their original order, the only rules that may match
+        the rule pattern according to the index.
+        """
+        is_terminal = rule_pattern.is_terminal_rule()
+        skeleton = get_category_skeleton(rule_pattern.category.types)
+        category_keys = [None] if skeleton is None else [skeleton, None]
+        candidates = []
+        for category_key in category_keys:
+            rules_by_attribute = self.rule_index.get((is_terminal, category_key))
+            if not rules_by_attribute:
+                continue
+            candidates.extend(rules_by_attribute.get(None, []))
+            for attribute_name in INDEX_ATTRIBUTES:
+                attribute_value = rule_pattern.attributes.get(attribute_name)
+                if isinstance(attribute_value, str):
+                    candidates.extend(
+                        rules_by_attribute.get((attribute_name, attribute_value.lower()), []))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [rule for _, rule in candidates]
+
     def get_relevant_rules(self, rule_pattern):
         """
         Given a rule pattern (that is, a SemanticRule with several features
@@ -43,12 +79,12 @@ class SemanticIndex(object):
         rules with the same features but with associated semantics.
         """
         relevant_rules = []
-        for rule in self.rules:
+        for rule in self.get_candidate_rules(rule_pattern):
             if rule.match(rule_pattern):
                 relevant_rules.append(rule)
         return relevant_rules
 
-    def get_semantic_representation(self, ccg_tree, tokens):
+    def get_semantic_representation(self, ccg_tree, tokens, node_semantics=None):
         rule_pattern = make_rule_pattern_from_ccg_node(ccg_tree, tokens)
         # Obtain the semantic template.
         relevant_rules = self.get_relevant_rules(rule_pattern)
@@ -69,12 +105,12 @@ class SemanticIndex(object):
               .format(etree.tostring(ccg_tree, pretty_print=True),
                       rule_pattern.attributes)
             predicate_string = base if base != '*' else surf
-            predicate = lexpr(predicate_string)
+            predicate = lexpr_shared(predicate_string)
 
             # robust semantic composition
             semantics = combine_partial_expressions(semantic_template, predicate)
             if not semantics:
-                semantics = semantic_template(predicate).simplify()
+                semantics = apply_and_simplify(semantic_template, predicate)
             semantics = recover_partial_expressions(semantics, semantic_template, predicate)
 
             # Assign coq types.
@@ -85,12 +121,12 @@ class SemanticIndex(object):
             else:
                 ccg_tree.set('coq_type', "")
         elif len(ccg_tree) == 1:
-            predicate = lexpr(ccg_tree[0].get('sem'))
+            predicate = get_node_semantics(ccg_tree[0], node_semantics)
 
             # robust semantic composition
             semantics = combine_partial_expressions(semantic_template, predicate)
             if not semantics:
-                semantics = semantic_template(predicate).simplify()
+                semantics = apply_and_simplify(semantic_template, predicate)
             semantics = recover_partial_expressions(semantics, semantic_template, predicate)
 
             # Assign coq types.
@@ -101,14 +137,14 @@ class SemanticIndex(object):
             coq_types_list = []
             for path in var_paths:
                 child_node = get_node_at_path(ccg_tree, path)
-                child_semantics = lexpr(child_node.get('sem'))
+                child_semantics = get_node_semantics(child_node, node_semantics)
 
                 # robust semantic composition
                 partial_semantics = combine_partial_expressions(semantics, child_semantics)
                 if partial_semantics:
                     semantics = partial_semantics
                 else:
-                    full_semantics = semantics(child_semantics).simplify()
+                    full_semantics = apply_and_simplify(semantics, child_semantics)
                     semantics = recover_partial_expressions(full_semantics, semantics, child_semantics)
 
                 child_coq_types = child_node.get('coq_type', None)
@@ -117,13 +153,14 @@ class SemanticIndex(object):
             if coq_types_list:
                 ccg_tree.set('coq_type', ' ||| '.join(coq_types_list))
                 
-        assert lexpr(str(semantics)) is not None
+        assert lexpr_shared(str(semantics)) is not None
         return semantics
 
 def get_attributes_from_ccg_node_recursively(ccg_tree, tokens):
     """
     Copies attributes from children node into the current node,
     to make them accessible in constant time.
+    tokens is a <tokens> node or the index of its nodes by id.
     """
     if 'child' in ccg_tree.attrib:
         attributes = ccg_tree.attrib
@@ -141,6 +178,37 @@ def get_attributes_from_ccg_node_recursively(ccg_tree, tokens):
         attributes['id'] = node_id
     return attributes
 
+def get_node_semantics(ccg_node, node_semantics=None):
+    """
+    Returns the semantics of a node, from node_semantics if it is kept
+    there by node id, or else parsed from its 'sem' attribute.
+    """
+    node_id = ccg_node.get('id')
+    if node_semantics is not None and node_id in node_semantics:
+        semantics = node_semantics[node_id]
+        if isinstance(semantics, PartialExpression):
+            # partial expressions grow when combined, the node keeps its own
+            semantics = PartialExpression(list(semantics.exp_list))
+        return semantics
+    return lexpr_shared(ccg_node.get('sem'))
+
+def set_node_semantics(ccg_node, semantics, node_semantics=None):
+    """
+    Keeps the semantics of a node in node_semantics by node id,
+    or else serializes them to its 'sem' attribute.
+    """
+    if node_semantics is not None:
+        node_semantics[ccg_node.get('id')] = semantics
+    else:
+        ccg_node.set('sem', str(semantics))
+
+def serialize_node_semantics(ccg_tree, node_semantics):
+    """Serializes the semantics kept in node_semantics to the 'sem' attributes."""
+    for ccg_node in ccg_tree.iter(etree.Element):
+        node_id = ccg_node.get('id')
+        if node_id in node_semantics:
+            ccg_node.set('sem', str(node_semantics[node_id]))
+
 def make_rule_pattern_from_ccg_node(ccg_tree, tokens):
     attributes = get_attributes_from_ccg_node_recursively(ccg_tree, tokens)
     category = ccg_tree.get('category')
@@ -150,12 +218,65 @@ def make_rule_pattern_from_ccg_node(ccg_tree, tokens):
     rule_pattern = SemanticRule(category, semantics, attributes)
     return rule_pattern
 
+def index_nodes_by_id(xml_tree):
+    """
+    Map the id of every node in xml_tree to the node, so that
+    find_node_by_id does not scan the whole tree on every lookup.
+    """
+    node_index = {}
+    for node in xml_tree.iter(etree.Element):
+        node_id = node.get('id')
+        # keep the first node in document order, as the XPath does
+        if node_id is not None and node_id not in node_index:
+            node_index[node_id] = node
+    return node_index
+
+def index_tree_by_id(xml_tree):
+    """index the nodes of xml_tree by id, or None if there is no tree"""
+    return None if xml_tree is None else index_nodes_by_id(xml_tree)
+
 def find_node_by_id(node_id, xml_tree):
-    nodes = xml_tree.xpath('.//descendant-or-self::*[@id="%s"]' % node_id)
+    """xml_tree is an XML node or the index of its nodes by id"""
+    if isinstance(xml_tree, dict):
+        nodes = [xml_tree[node_id]] if node_id in xml_tree else []
+    else:
+        nodes = xml_tree.xpath('.//descendant-or-self::*[@id="%s"]' % node_id)
     if not nodes:
         raise(ValueError(f'It should have found a span for id {node_id} in {xml_tree}'))
     return nodes[0]
 
+def get_category_skeleton(types):
+    r"""
+    Returns the types of a category with every slash as "|", which a
+    category must share with the rules that match it.
+    types="(S\NP)/NP" --> skeleton="(S|NP)|NP"
+    Types with regex characters (e.g. ".") have no skeleton: they may
+    match categories of any shape.
+    """
+    if not re.fullmatch(r'[\w/\\|()]+', types):
+        return None
+    return types.replace('/', '|').replace('\\', '|')
+
+def build_rule_index(rules):
+    """
+    Files every rule, with its position, under whether it is terminal and
+    its category skeleton, then under the first attribute of INDEX_ATTRIBUTES
+    it specifies, or None. A rule pattern can only match the rules filed
+    under its own values or under None.
+    """
+    rule_index = {}
+    for position, rule in enumerate(rules):
+        category_key = get_category_skeleton(rule.category.types)
+        rules_by_attribute = rule_index.setdefault((rule.is_terminal_rule(), category_key), {})
+        attribute_key = None
+        for attribute_name in INDEX_ATTRIBUTES:
+            attribute_value = rule.attributes.get(attribute_name)
+            if isinstance(attribute_value, str):
+                attribute_key = (attribute_name, attribute_value.lower())
+                break
+        rules_by_attribute.setdefault(attribute_key, []).append((position, rule))
+    return rule_index
+
 def load_semantic_rules(fn):
     semantic_rules = []
     loaded = None
@@ -188,5 +309,5 @@ def build_default_template(rule_pattern, ccg_tree):
         template_string = r'\P.P'
     else:
         template_string = r'\E O.O'
-    template = lexpr(template_string)
+    template = lexpr_shared(template_string)
     return template
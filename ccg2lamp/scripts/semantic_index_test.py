@@ -187,7 +187,33 @@ class GetSemanticRepresentationTestCase(unittest.TestCase):
         expected_semantics = lexpr(r'(_base1 -> _base2)')
         self.assertEqual(expected_semantics, semantics)
 
+class GetRelevantRulesTestCase(unittest.TestCase):
+    def test_indexed_rules_keep_order(self):
+        semantic_rules = [SemanticRule(r'N', r'\P.P', {}),
+                          SemanticRule(r'N|N', r'\P.P', {}),
+                          SemanticRule(r'N', r'\P.P', {'surf' : 'dog'}),
+                          SemanticRule(r'.', r'\P.P', {}),
+                          SemanticRule(r'N', r'\P.P', {'surf' : 'cat'}),
+                          SemanticRule(r'N', r'\P.P', {'base' : 'Dog'}),
+                          SemanticRule(r'N', r'\P.P', {'rule' : '>'})]
+        semantic_index = SemanticIndex(semantic_rules)
+        rule_pattern = SemanticRule(r'N', None, {'surf' : 'dog', 'base' : 'dog'})
+        relevant_rules = semantic_index.get_relevant_rules(rule_pattern)
+        expected_rules = [semantic_rules[i] for i in [0, 2, 5]]
+        self.assertEqual(expected_rules, relevant_rules)
+        self.assertEqual([r for r in semantic_rules if r.match(rule_pattern)],
+                         relevant_rules)
+
+    def test_index_follows_new_rules(self):
+        semantic_index = SemanticIndex([SemanticRule(r'N/N', r'\P.P', {})])
+        rule_pattern = SemanticRule(r'N\N', None, {'surf' : 'dog'})
+        self.assertEqual([], semantic_index.get_relevant_rules(rule_pattern))
+        semantic_rule = SemanticRule(r'N|N', r'\P.P', {})
+        semantic_index.rules = [semantic_rule]
+        self.assertEqual([semantic_rule], semantic_index.get_relevant_rules(rule_pattern))
+
 if __name__ == '__main__':
     suite1  = unittest.TestLoader().loadTestsFromTestCase(GetSemanticRepresentationTestCase)
-    suites  = unittest.TestSuite([suite1])
+    suite2  = unittest.TestLoader().loadTestsFromTestCase(GetRelevantRulesTestCase)
+    suites  = unittest.TestSuite([suite1, suite2])
     unittest.TextTestRunner(verbosity=2).run(suites)
@@ -19,14 +19,14 @@ import re
 
 from nltk.sem.logic import Expression
 
-from .category import Category
+from .category import Category, intern_category, match_categories
 from .logic_parser import lexpr
 from .normalization import normalize_token
 
 class SemanticRule(object):
     def __init__(self, category, semantics, attributes = {}):
         if not isinstance(category, Category):
-            self.category = Category(category)
+            self.category = intern_category(category)
         else:
             self.category = category
         if semantics and not isinstance(semantics, Expression):
@@ -93,9 +93,7 @@ def attributes_match(attribute_name, src_attr_value, trg_attr_value):
     if not 'category' in attribute_name:
         return src_attr_value.lower() == trg_attr_value.lower()
     # Comparing categories needs feature unification:
-    src_category = Category(src_attr_value)
-    trg_category = Category(trg_attr_value)
-    return src_category.match(trg_category)
+    return match_categories(src_attr_value, trg_attr_value)
 
 def any_attribute_matches(attribute_name, src_attributes, trg_attributes):
     wildcard_names = re.findall(r'_any_(.*)', attribute_name)
@@ -107,9 +105,7 @@ def any_attribute_matches(attribute_name, src_attributes, trg_attributes):
                        if key.endswith(wildcard_name)]
     for trg_attr_value in trg_attr_values:
         if wildcard_name == 'category':
-            src_category = Category(src_attr_value)
-            trg_category = Category(trg_attr_value)
-            if src_category.match(trg_category):
+            if match_categories(src_attr_value, trg_attr_value):
                 return True
         else:
             if src_attr_value.lower() == trg_attr_value.lower():
@@ -20,6 +20,7 @@ import codecs
 from collections import defaultdict
 from copy import deepcopy
 import functools
+import itertools
 import logging
 import re
 import traceback
@@ -42,7 +43,7 @@ from nltk.sem.logic import typecheck
 
 from .knowledge import get_tokens_from_xml_node
 from .logic_parser import lexpr, PartialExpression
-from .normalization import normalize_token, substitute_invalid_chars
+from .normalization import normalize_token_batch, substitute_invalid_chars
 from .tree_tools import tree_or_string
 from .nltk2normal import remove_true
 
@@ -263,7 +264,7 @@ def replace_function_names(expr, resolution_guide, active=None):
             'Expression not recognized: {0}, type: {1}'.format(expr, type(expr)))
     return expr
 
-def combine_signatures_or_rename_preds(exprs, preferred_sigs=None):
+def combine_signatures_or_rename_preds(exprs, preferred_sigs=None, expr_signatures=None):
     """
     `signatures` is a list of dictionaries. Each dictionary has key-value
       pairs where key is a predicate name, and value is a type object.
@@ -273,12 +274,17 @@ def combine_signatures_or_rename_preds(exprs, preferred_sigs=None):
     predicate is renamed and each version is associated to a different type
     in the signature dictionary. The target predicate is also renamed in
     the logical expressions.
+    `expr_signatures` optionally gives the result of get_formula_signatures
+    for each expression, so that their types are not inferred again.
     """
     if preferred_sigs is None:
         preferred_sigs = [{}] * len(exprs)
     elif isinstance(preferred_sigs, dict):
         preferred_sigs = [preferred_sigs]
-    signatures = [resolve_types_rec(remove_true(expr)) for expr in exprs]
+    if expr_signatures is None:
+        signatures = [resolve_types_rec(remove_true(expr)) for expr in exprs]
+    else:
+        signatures = [expr_signature[0] for expr_signature in expr_signatures]
     signature = defaultdict(list)
     for s, preferred_sig in zip(signatures, preferred_sigs):
         for pred, type_and_expr_list in s.items():
@@ -295,13 +301,24 @@ def combine_signatures_or_rename_preds(exprs, preferred_sigs=None):
                 if (pred, new_pred_name) not in resolution_guide[ex]:
                     resolution_guide[ex].append((pred, new_pred_name))
 
-    resolution_guide_local = deepcopy(resolution_guide)
+    if expr_signatures is None:
+        # the keys are parts of exprs, which are renamed in place below
+        resolution_guide_local = deepcopy(resolution_guide)
+    else:
+        resolution_guide_local = resolution_guide
     new_exprs = []
     for expr in exprs:
         if not isinstance(expr, ConstantExpression):
             expr = replace_function_names(expr, resolution_guide_local)
         new_exprs.append(expr)
-    signature = type_check_safe(new_exprs)
+    checked_signatures = None
+    if expr_signatures is not None:
+        # only the expressions that mention a renamed predicate are checked again
+        renamed_preds = set(pred for (pred, _) in itertools.chain(*resolution_guide.values()))
+        checked_signatures = [
+            None if any(pred in expr_str for pred in renamed_preds) else checked_signature
+            for (_, checked_signature, expr_str) in expr_signatures]
+    signature = type_check_safe(new_exprs, checked_signatures)
     signature = combine_signatures(preferred_sigs + [signature])
 
     signature = remove_reserved_predicates(signature)
@@ -311,11 +328,16 @@ def combine_signatures_or_rename_preds(exprs, preferred_sigs=None):
     signature = resolve_types_in_signature(signature)
     return signature, new_exprs
 
-def type_check_safe(exprs):
+def type_check_safe(exprs, signatures=None):
     """
     Returns the signature most specific (longest), ignoring type conflicts.
+    The signature of an expression may be given in `signatures`, or None
+    to infer it.
     """
-    signatures = [resolve_types_rec(expr) for expr in exprs]
+    if signatures is None:
+        signatures = [None] * len(exprs)
+    signatures = [resolve_types_rec(expr) if signature is None else signature
+                  for expr, signature in zip(exprs, signatures)]
     combined_signature = {}
     for signature in signatures:
         for predicate, predicate_types_exprs in signature.items():
@@ -344,22 +366,51 @@ def remove_reserved_predicates(signature):
             del signature[reserved_predicate]
     return signature
 
+@functools.lru_cache(maxsize=4096)
+def get_formula_signatures(formula):
+    """
+    Infer the types of the predicates of a formula string on its own, as
+    combine_signatures_or_rename_preds and type_check_safe do. Returns the
+    signature of the formula without TrueP, the signature of the formula
+    and the printed formula, or None if the formula cannot be parsed.
+    The n-best combinations of a document share the formulas of each
+    sentence, so these are only inferred once. The expressions in the
+    signatures come from a parse of their own, so they are never renamed.
+    """
+    expr = lexpr(formula)
+    if expr is None:
+        return None
+    return (dict(resolve_types_rec(remove_true(expr))),
+            dict(resolve_types_rec(expr)),
+            str(expr))
+
+@functools.lru_cache(maxsize=4096)
+def get_arbitrary_signature(types):
+    """
+    The signature of a set of type annotations
+    "predicate : basic_type -> ... -> basic_type".
+    """
+    coq_lib = ['Parameter {0}.'.format(
+                   substitute_invalid_chars(t, ccg2lamp.CCG2LAMP_REPLACEMENT_FILE))
+               for t in types]
+    return convert_coq_signatures_to_nltk(coq_lib)
+
 def get_dynamic_library_from_doc(doc, semantics_nodes):
     # Each type is of the form "predicate : basic_type -> ... -> basic_type."
-    types_sets = []
-    for semantics_node in semantics_nodes:
-      types = set(semantics_node.xpath('./span/@type'))
-      types_sets.append(types)
-    types_sets = [[substitute_invalid_chars(t, ccg2lamp.CCG2LAMP_REPLACEMENT_FILE) 
-                   for t in types] 
-                   for types in types_sets]
-    coq_libs = [['Parameter {0}.'.format(t) for t in types] for types in types_sets]
-    nltk_sigs_arbi = [convert_coq_signatures_to_nltk(coq_lib) for coq_lib in coq_libs]
+    nltk_sigs_arbi = [get_arbitrary_signature(
+                          frozenset(map(str, semantics_node.xpath('./span/@type'))))
+                      for semantics_node in semantics_nodes]
     nltk_sig_arbi = combine_signatures(nltk_sigs_arbi)
 
-    formulas = [sem.xpath('./span[1]/@sem')[0] for sem in semantics_nodes]
-    formulas = parse_exprs_if_str(formulas)
-    nltk_sig_auto, formulas = combine_signatures_or_rename_preds(formulas, nltk_sigs_arbi)
+    # plain strings, so the caches do not keep the documents alive
+    formulas = [str(sem.xpath('./span[1]/@sem')[0]) for sem in semantics_nodes]
+    # the formulas are renamed in place, so each combination parses its own
+    exprs = parse_exprs_if_str(formulas)
+    expr_signatures = [get_formula_signatures(formula) for formula in formulas]
+    expr_signatures = [expr_signature for expr_signature in expr_signatures
+                       if expr_signature is not None]
+    nltk_sig_auto, formulas = combine_signatures_or_rename_preds(
+        exprs, nltk_sigs_arbi, expr_signatures)
     # coq_static_lib_path is useful to get reserved predicates.
     # ccg_xml_trees is useful to get full list of tokens
     # for which we need to specify types.
@@ -536,7 +587,7 @@ def merge_dynamic_libraries(sig_arbi, sig_auto, doc):
     base_forms = get_tokens_from_xml_node(doc)
     base_forms = [substitute_invalid_chars(t, ccg2lamp.CCG2LAMP_REPLACEMENT_FILE) 
                   for t in base_forms]
-    required_predicates = set(normalize_token(t) for t in base_forms)
+    required_predicates = set(normalize_token_batch(base_forms))
     sig_merged = sig_auto
     sig_merged.update(sig_arbi) # overwrites automatically inferred types.
     # Remove predicates that are reserved or not required (e.g. variables).
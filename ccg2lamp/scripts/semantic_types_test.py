@@ -113,6 +113,47 @@ class combine_signatures_or_rename_predsTestCase(unittest.TestCase):
         self.assertEqual(expected_coq_types, coq_types,
             msg="\n{0}\nvs\n{1}".format(expected_coq_types, coq_types))
 
+    def test_nbest_combinations_share_sentence(self):
+        doc_str = r"""
+        <document>
+          <sentences>
+            <sentence id="s1">
+              <tokens>
+                <token base="pred" pos="pos1" surf="surf1" id="t1_1"/>
+              </tokens>
+              <semantics status="success">
+                <span sem="exists x. _pred(x)"/>
+              </semantics>
+              <semantics status="success">
+                <span sem="exists e. _pred(e)"/>
+              </semantics>
+            </sentence>
+            <sentence id="s2">
+              <tokens>
+                <token base="pred" pos="pos1" surf="surf1" id="t2_1"/>
+              </tokens>
+              <semantics status="success">
+                <span sem="exists e. _pred(e)"/>
+              </semantics>
+            </sentence>
+          </sentences>
+        </document>
+        """
+        doc = etree.fromstring(doc_str)
+        sem_nodes1 = doc.xpath('./sentences/sentence[1]/semantics')
+        sem_nodes2 = doc.xpath('./sentences/sentence[2]/semantics')
+        # the types of the second sentence only conflict with the first reading
+        for _ in range(2):
+            lib, formulas = get_dynamic_library_from_doc(doc, [sem_nodes1[0], sem_nodes2[0]])
+            self.assertEqual(["Parameter _pred_e2 : Entity -> Prop.",
+                              "Parameter _pred_v2 : Event -> Prop."], lib.split('\n'))
+            self.assertEqual([lexpr(r'exists x. _pred_e2(x)'), lexpr(r'exists e. _pred_v2(e)')],
+                             formulas)
+            lib, formulas = get_dynamic_library_from_doc(doc, [sem_nodes1[1], sem_nodes2[0]])
+            self.assertEqual(["Parameter _pred : Event -> Prop."], lib.split('\n'))
+            self.assertEqual([lexpr(r'exists e. _pred(e)'), lexpr(r'exists e. _pred(e)')],
+                             formulas)
+
 # TODO: also test for types that are Propositions 't'.
 
 def nltk_sig_to_coq_lib(nltk_sig):
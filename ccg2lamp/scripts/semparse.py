@@ -25,6 +25,7 @@ from multiprocessing import Pool
 import os
 import sys
 import textwrap
+import threading
 import traceback
 
 from nltk.sem.logic import LogicalExpressionException
@@ -34,31 +35,143 @@ from .semantic_index import SemanticIndex
 
 from .xml_utils import serialize_tree_to_file, deserialize_file_to_tree
 
-SEMANTIC_INDEX=None
-ARGS=None
-SENTENCES=None
 kMaxTasksPerChild=None
 
 my_logger = logging.getLogger(__name__)
 
-def sem_parse(root):
-    """extend sentence nodes with semantic nodes"""
-    global SENTENCES, SEMANTIC_INDEX
-
-    SEMANTIC_INDEX = SemanticIndex(ARGS.templates)
-    SENTENCES = root.findall('.//sentence')
-    # print('Found {0} sentences'.format(len(SENTENCES)))
-    # from pudb import set_trace; set_trace()
-    sentence_inds = range(len(SENTENCES))
-    sem_nodes_lists = semantic_parse_sentences(sentence_inds, ARGS.ncores)
-    assert len(sem_nodes_lists) == len(SENTENCES), \
-        'Element mismatch: {0} vs {1}'.format(len(sem_nodes_lists), len(SENTENCES))
-    my_logger.info('Adding XML semantic nodes to sentences...')
-    for sentence, sem_nodes in zip(SENTENCES, sem_nodes_lists):
-        sentence.extend(sem_nodes)
-    
+# the semantic parser of a worker process, loaded once by init_worker
+WORKER_PARSER=None
+
+def init_worker(templates, arbi_types, gold_trees, nbest):
+    """load the templates once when a worker process starts"""
+    global WORKER_PARSER
+    WORKER_PARSER = SemanticParser(templates, arbi_types=arbi_types,
+                                   gold_trees=gold_trees, nbest=nbest, ncores=1)
+
+def parse_sentence_in_worker(sentence_item):
+    sentence_str, sentence_ind = sentence_item
+    return WORKER_PARSER.parse_sentence_str(sentence_str, sentence_ind)
+
+class SemanticParser(object):
+    """
+    Assigns semantics to the CCG trees of the sentences with the templates
+    loaded once into a SemanticIndex. It keeps no state of the documents
+    it parses, so parse() can be called concurrently. When ncores > 1, the
+    sentences are sent in chunks to a pool of worker processes that is
+    started on first use and kept until close().
+    """
+    def __init__(self, templates, arbi_types=False, gold_trees=False, nbest=0, ncores=1):
+        self.templates = templates
+        self.arbi_types = arbi_types
+        self.gold_trees = gold_trees
+        self.nbest = nbest
+        self.ncores = ncores
+        self.semantic_index = SemanticIndex(templates)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def __getstate__(self):
+        # the pool belongs to the process that started it
+        state = self.__dict__.copy()
+        state['pool'] = None
+        del state['pool_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.pool_lock = threading.Lock()
+
+    def get_pool(self):
+        """start the worker processes on first use"""
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = Pool(processes=self.ncores,
+                                 initializer=init_worker,
+                                 initargs=(self.templates, self.arbi_types,
+                                           self.gold_trees, self.nbest),
+                                 maxtasksperchild=kMaxTasksPerChild)
+            return self.pool
+
+    def close(self):
+        """stop the worker processes"""
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+
+    def parse(self, root):
+        """extend sentence nodes with semantic nodes"""
+        sentences = root.findall('.//sentence')
+        # print('Found {0} sentences'.format(len(sentences)))
+        sem_nodes_lists = self.parse_sentences(sentences)
+        assert len(sem_nodes_lists) == len(sentences), \
+            'Element mismatch: {0} vs {1}'.format(len(sem_nodes_lists), len(sentences))
+        my_logger.info('Adding XML semantic nodes to sentences...')
+        for sentence, sem_nodes in zip(sentences, sem_nodes_lists):
+            sentence.extend(sem_nodes)
+
+    def parse_sentences(self, sentences):
+        if self.ncores <= 1:
+            return [self.parse_sentence(sentence, sentence_ind)
+                    for sentence_ind, sentence in enumerate(sentences)]
+        # the worker processes exchange the sentences and semantics as strings
+        sentence_items = [(etree.tostring(sentence), sentence_ind)
+                          for sentence_ind, sentence in enumerate(sentences)]
+        # a few chunks per worker balance the load without a message per sentence
+        chunksize = max(1, len(sentence_items) // (self.ncores * 4))
+        sem_nodes_lists = list(self.get_pool().imap(parse_sentence_in_worker,
+                                                     sentence_items, chunksize))
+        return [[etree.fromstring(s) for s in sem_nodes] for sem_nodes in sem_nodes_lists]
+
+    def parse_sentence_str(self, sentence_str, sentence_ind):
+        sentence = etree.fromstring(sentence_str)
+        sem_nodes = self.parse_sentence(sentence, sentence_ind)
+        return [etree.tostring(sem_node) for sem_node in sem_nodes]
+
+    def parse_sentence(self, sentence, sentence_ind):
+        """
+        `sentence` is an lxml tree with tokens and ccg nodes.
+        It returns a list of lxml semantics nodes.
+        """
+        sem_nodes = []
+        # TODO: try to prevent semantic parsing for fragmented CCG trees.
+        # Otherwise, produce fragmented semantics.
+        if self.gold_trees:
+            # In xpath, elements are 1-indexed.
+            # However, gold_tree annotations assumed zero-index.
+            # This line fixes it.
+            tree_indices = [int(sentence.get('gold_tree', '0')) + 1]
+        if self.nbest != 1:
+            tree_indices = get_tree_indices(sentence, self.nbest)
+        for tree_index in tree_indices: 
+            sem_node = etree.Element('semantics')        
+            ccg_tree = sentence.xpath(f'./ccg[{tree_index}]/@id')[0]
+            ccg_root = sentence.xpath(f'./ccg[{tree_index}]/@root')[0]
+
+            try:
+                status, sem_tree = assign_semantics_to_ccg(sentence, self.semantic_index, tree_index)
+                filter_attributes(sem_tree)
+                sem_node.extend(sem_tree.xpath('.//descendant-or-self::span'))
+                sem_node.set('status', 'success' if status else "partial")
+            except Exception as e:
+                # on complete failure: add a special child span node with EMPTY formula
+                empty_span = etree.Element("span")
+                empty_span.set("id", f"s{sentence_ind}_sp0")
+                empty_span.set("sem", "EMPTY")
+                sem_node.append(empty_span)
+                sem_node.set('status', 'failed')
+
+                sentence_surf = ' '.join(sentence.xpath('tokens/token/@surf'))
+                my_logger.debug(f'Semantic parse failed with: {e}\nSentence: {sentence_surf}\n')
+                print(traceback.print_exc())
+
+            sem_node.set('ccg_id', ccg_tree)
+            sem_node.set('root', ccg_root)
+            sem_nodes.append(sem_node)
+        return sem_nodes
+
 def main(args = None):
-    global ARGS
     DESCRIPTION=textwrap.dedent("""\
             categories_template.yaml should contain the semantic templates
               in YAML format.
@@ -85,89 +198,29 @@ def main(args = None):
     parser.add_argument("--nbest", nargs='?', type=int, default="0")
     parser.add_argument("--ncores", nargs='?', type=int, default="3",
         help="Number of cores for multiprocessing.")
-    ARGS = parser.parse_args()
+    args = parser.parse_args(args)
       
-    if not os.path.exists(ARGS.templates):
-        print('File does not exist: {0}'.format(ARGS.templates))
+    if not os.path.exists(args.templates):
+        print('File does not exist: {0}'.format(args.templates))
         sys.exit(1)
-    if not os.path.exists(ARGS.ccg):
-        print('File does not exist: {0}'.format(ARGS.ccg))
+    if not os.path.exists(args.ccg):
+        print('File does not exist: {0}'.format(args.ccg))
         sys.exit(1)
     
     logging.basicConfig(level=logging.WARNING)
 
-    root = deserialize_file_to_tree(ARGS.ccg)
+    root = deserialize_file_to_tree(args.ccg)
 
-    sem_parse(root)        
+    semantic_parser = SemanticParser(args.templates,
+                                     arbi_types=args.arbi_types,
+                                     gold_trees=args.gold_trees,
+                                     nbest=args.nbest,
+                                     ncores=args.ncores)
+    semantic_parser.parse(root)
+    semantic_parser.close()
     my_logger.info('Finished adding XML semantic nodes to sentences.')
 
-    serialize_tree_to_file(root, ARGS.sem)
-
-def semantic_parse_sentences(sentence_inds, ncores=1):
-    if ncores <= 1:
-        sem_nodes_lists = semantic_parse_sentences_seq(sentence_inds)
-    else:
-        sem_nodes_lists = semantic_parse_sentences_par(sentence_inds, ncores)
-    sem_nodes_lists = [
-        [etree.fromstring(s) for s in sem_nodes] for sem_nodes in sem_nodes_lists]
-    return sem_nodes_lists
-
-def semantic_parse_sentences_par(sentence_inds, ncores=3):
-    pool = Pool(processes=ncores, maxtasksperchild=kMaxTasksPerChild)
-    sem_nodes = pool.map(semantic_parse_sentence, sentence_inds)
-    pool.close()
-    pool.join()
-    return sem_nodes
-
-def semantic_parse_sentences_seq(sentence_inds):
-    sem_nodes = []
-    for sentence_ind in sentence_inds:
-        sem_node = semantic_parse_sentence(sentence_ind)
-        sem_nodes.append(sem_node)
-    return sem_nodes
-
-def semantic_parse_sentence(sentence_ind):
-    """
-    `sentence` is an lxml tree with tokens and ccg nodes.
-    It returns an lxml semantics node.
-    """
-    sentence = SENTENCES[sentence_ind]
-    sem_nodes = []
-    # TODO: try to prevent semantic parsing for fragmented CCG trees.
-    # Otherwise, produce fragmented semantics.
-    if ARGS.gold_trees:
-        # In xpath, elements are 1-indexed.
-        # However, gold_tree annotations assumed zero-index.
-        # This line fixes it.
-        tree_indices = [int(sentence.get('gold_tree', '0')) + 1]
-    if ARGS.nbest != 1:
-        tree_indices = get_tree_indices(sentence, ARGS.nbest)
-    for tree_index in tree_indices: 
-        sem_node = etree.Element('semantics')        
-        ccg_tree = sentence.xpath(f'./ccg[{tree_index}]/@id')[0]
-        ccg_root = sentence.xpath(f'./ccg[{tree_index}]/@root')[0]
-
-        try:
-            status, sem_tree = assign_semantics_to_ccg(sentence, SEMANTIC_INDEX, tree_index)
-            filter_attributes(sem_tree)
-            sem_node.extend(sem_tree.xpath('.//descendant-or-self::span'))
-            sem_node.set('status', 'success' if status else "partial")
-        except Exception as e:
-            # on complete failure: add a special child span node with EMPTY formula
-            empty_span = etree.Element("span")
-            empty_span.set("id", f"s{sentence_ind}_sp0")
-            empty_span.set("sem", "EMPTY")
-            sem_node.append(empty_span)
-            sem_node.set('status', 'failed')
-
-            sentence_surf = ' '.join(sentence.xpath('tokens/token/@surf'))
-            my_logger.debug(f'Semantic parse failed with: {e}\nSentence: {sentence_surf}\n')
-            print(traceback.print_exc())
-
-        sem_node.set('ccg_id', ccg_tree)
-        sem_node.set('root', ccg_root)
-        sem_nodes.append(sem_node)
-    return [etree.tostring(sem_node) for sem_node in sem_nodes]
+    serialize_tree_to_file(root, args.sem)
 
 def get_tree_indices(sentence, nbest):
     num_ccg_trees = int(sentence.xpath('count(./ccg)'))
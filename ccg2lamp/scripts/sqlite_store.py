@@ -0,0 +1,132 @@
+"""SQLite stores shared by the caches of the pipelines"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+my_logger = logging.getLogger(__name__)
+
+# the number of values of an IN (...) clause, below the SQLite limit on query parameters
+SELECT_IN_BATCH = 500
+
+def select_in(connection: sqlite3.Connection, query: str, values: Sequence):
+    """run a query with an IN ({0}) clause on values, in batches"""
+    for start in range(0, len(values), SELECT_IN_BATCH):
+        batch_values = values[start:start + SELECT_IN_BATCH]
+        marks = ",".join("?" * len(batch_values))
+        yield from connection.execute(query.format(marks), batch_values)
+
+def get_path_identity(path: str, hash_content: bool = False) -> str:
+    """
+    Describe a file, or every file under a directory, by its relative path,
+    size and modification time, or return an empty string if it is missing.
+    The parser models are too large to hash their content at every start,
+    but small files can be described by the hash of their content instead.
+    """
+    if not os.path.exists(path):
+        return ""
+    if os.path.isfile(path):
+        file_paths = [path]
+    else:
+        file_paths = []
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            file_paths.extend(os.path.join(dir_path, file_name) for file_name in sorted(file_names))
+    file_identities = []
+    for file_path in file_paths:
+        if hash_content:
+            with open(file_path, "rb") as fin:
+                description = hashlib.sha256(fin.read()).hexdigest()
+        else:
+            stat = os.stat(file_path)
+            description = f"{stat.st_size} {stat.st_mtime_ns}"
+        file_identities.append(f"{os.path.relpath(file_path, path)} {description}")
+    return hashlib.sha256("\n".join(file_identities).encode("utf-8")).hexdigest()
+
+class LRUStore():
+    """
+    A SQLite table from the hash of a content and of the identity of what
+    produced its value to the value columns. When the values grow over
+    max_bytes, the least recently used are evicted. The store can be shared
+    by the threads and the processes of a pipeline.
+    """
+    def __init__(self, store_file: str,
+                 table: str,
+                 value_columns: List[Tuple[str, str]],
+                 identity: str = "",
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.store_file = store_file
+        self.table = table
+        self.value_names = ", ".join(name for name, _ in value_columns)
+        self.identity = identity
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        store_dir = os.path.dirname(store_file)
+        if store_dir and not os.path.exists(store_dir):
+            os.makedirs(store_dir, exist_ok=True)
+        self.connection = sqlite3.connect(store_file, timeout=60,
+                                          check_same_thread=False)
+        column_definitions = "".join(f"{name} {definition}, " for name, definition in value_columns)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                                        key TEXT PRIMARY KEY, {column_definitions}
+                                        size INTEGER NOT NULL,
+                                        last_used REAL NOT NULL)""")
+            self.connection.execute(f"""CREATE INDEX IF NOT EXISTS {table}_last_used
+                                        ON {table} (last_used)""")
+
+    def make_key(self, content: str) -> str:
+        """hash a content with the identity of the store"""
+        return hashlib.sha256((self.identity + "\n" + content).encode("utf-8")).hexdigest()
+
+    def get_rows(self, keys: Iterable[str]) -> Dict[str, tuple]:
+        """the value columns of the stored keys, which become the most recently used"""
+        with self.lock:
+            stored_rows = {row[0]: row[1:] for row in select_in(
+                self.connection,
+                f"SELECT key, {self.value_names} FROM {self.table} WHERE key IN ({{0}})",
+                list(set(keys)))}
+            if stored_rows:
+                with self.connection:
+                    self.connection.executemany(
+                        f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in stored_rows])
+        return stored_rows
+
+    def put_rows(self, rows: Iterable[Tuple[str, tuple, int]]):
+        """store the value columns of keys, given as (key, values, size in bytes)"""
+        rows = [(key,) + tuple(values) + (size, time.time()) for key, values, size in rows]
+        if not rows:
+            return
+        marks = ", ".join("?" * len(rows[0]))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, {self.value_names}, size, last_used) "
+                f"VALUES ({marks})", rows)
+            self.evict()
+
+    def evict(self):
+        """drop the least recently used values until the store fits in max_bytes"""
+        total_bytes = self.connection.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted_keys = []
+        rows = self.connection.execute(f"SELECT key, size FROM {self.table} ORDER BY last_used")
+        for key, size in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            evicted_keys.append((key,))
+            total_bytes -= size
+        self.connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted_keys)
+        my_logger.debug(f"{len(evicted_keys)} {self.table} evicted from {self.store_file}")
+
+    def close(self):
+        """close the connection to the store"""
+        with self.lock:
+            self.connection.close()
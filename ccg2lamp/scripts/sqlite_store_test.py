@@ -0,0 +1,99 @@
+"""Tests of the SQLite stores shared by the caches, and their fixture"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from . import sqlite_store
+from .sqlite_store import get_path_identity, select_in
+
+class FakeClock(object):
+    """stands for the time module, one second later at every call"""
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        self.now += 1.0
+        return self.now
+
+class LRUStoreFixture(unittest.TestCase):
+    """a temporary directory for the stores, which see a fake clock, closed after each test"""
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.saved_time = sqlite_store.time
+        sqlite_store.time = FakeClock()
+        self.stores = []
+
+    def tearDown(self):
+        sqlite_store.time = self.saved_time
+        for store in self.stores:
+            store.close()
+        self.tmp_dir.cleanup()
+
+    def keep_store(self, store):
+        self.stores.append(store)
+        return store
+
+class SelectInTestCase(unittest.TestCase):
+    def test_batches(self):
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE numbers (number INTEGER PRIMARY KEY)")
+        connection.executemany("INSERT INTO numbers VALUES (?)", [(i,) for i in range(2000)])
+        values = list(range(0, 3000, 2))
+        self.assertGreater(len(values), sqlite_store.SELECT_IN_BATCH)
+        rows = select_in(connection, "SELECT number FROM numbers WHERE number IN ({0})", values)
+        self.assertEqual(list(range(0, 2000, 2)), sorted(number for number, in rows))
+        self.assertEqual([], list(select_in(connection, "SELECT number FROM numbers WHERE number IN ({0})", [])))
+        connection.close()
+
+class GetPathIdentityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_dir = os.path.join(self.tmp_dir.name, "models")
+        os.makedirs(os.path.join(self.model_dir, "parser"))
+        self.write("parser/weights", "0.5 0.25")
+        self.write("config", "beta 0.075")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, file_name, content, mtime=1000000000):
+        file_path = os.path.join(self.model_dir, file_name)
+        with open(file_path, "w") as fout:
+            fout.write(content)
+        os.utime(file_path, (mtime, mtime))
+
+    def test_missing(self):
+        self.assertEqual("", get_path_identity(os.path.join(self.tmp_dir.name, "missing")))
+
+    def test_directory(self):
+        identity = get_path_identity(self.model_dir)
+        self.assertEqual(identity, get_path_identity(self.model_dir))
+        # rebuilt models of the same size
+        self.write("parser/weights", "0.5 0.75", mtime=1000000001)
+        rebuilt_identity = get_path_identity(self.model_dir)
+        self.assertNotEqual(identity, rebuilt_identity)
+        self.write("parser/extra", "")
+        self.assertNotEqual(rebuilt_identity, get_path_identity(self.model_dir))
+
+    def test_file(self):
+        file_path = os.path.join(self.model_dir, "config")
+        identity = get_path_identity(file_path)
+        self.assertNotEqual("", identity)
+        self.write("config", "beta 0.0075")
+        self.assertNotEqual(identity, get_path_identity(file_path))
+
+    def test_hash_content(self):
+        file_path = os.path.join(self.model_dir, "config")
+        identity = get_path_identity(file_path, hash_content=True)
+        # rewritten with the same content
+        self.write("config", "beta 0.075", mtime=1000000001)
+        self.assertEqual(identity, get_path_identity(file_path, hash_content=True))
+        self.write("config", "beta 0.076")
+        self.assertNotEqual(identity, get_path_identity(file_path, hash_content=True))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(SelectInTestCase)
+    suite2 = unittest.TestLoader().loadTestsFromTestCase(GetPathIdentityTestCase)
+    suites = unittest.TestSuite([suite1, suite2])
+    unittest.TextTestRunner(verbosity=2).run(suites)
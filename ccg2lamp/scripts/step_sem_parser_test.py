@@ -0,0 +1,48 @@
+"""Tests of the worker processes of the semantic parser step"""
+import gc
+import unittest
+
+from ccg2lamp.pipelines.step_sem_parser import CCGSemParser
+from ccg2lamp.pipelines.step_tree_io import CCGTreeReader
+
+SYN_FILE = "datasets/corpus_fail/sem_fail.syn.xml"
+
+class CCGSemParserCloseTestCase(unittest.TestCase):
+    def parse(self, sem_parser):
+        sem_parser.transform(CCGTreeReader().transform(SYN_FILE))
+        self.assertIsNotNone(sem_parser.sem_parser.pool)
+        # the worker processes of the pool
+        return list(sem_parser.sem_parser.pool._pool)
+
+    def assert_stopped(self, workers):
+        for worker in workers:
+            worker.join(10)
+            self.assertFalse(worker.is_alive())
+
+    def test_close(self):
+        sem_parser = CCGSemParser(use_ncores=2)
+        workers = self.parse(sem_parser)
+        sem_parser.close()
+        self.assertIsNone(sem_parser.sem_parser.pool)
+        self.assert_stopped(workers)
+        # the workers start again on the next parse
+        workers = self.parse(sem_parser)
+        sem_parser.close()
+        self.assert_stopped(workers)
+
+    def test_context_manager(self):
+        with CCGSemParser(use_ncores=2) as sem_parser:
+            workers = self.parse(sem_parser)
+        self.assert_stopped(workers)
+
+    def test_del(self):
+        sem_parser = CCGSemParser(use_ncores=2)
+        workers = self.parse(sem_parser)
+        del sem_parser
+        gc.collect()
+        self.assert_stopped(workers)
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(CCGSemParserCloseTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
@@ -0,0 +1,38 @@
+"""Tests of the split of the sentences into shards parsed in parallel"""
+import unittest
+
+from ccg2lamp.pipelines.step_syn_parser import split_into_shards
+
+def make_sentences(num_sentences):
+    return [[f"word{i}", "."] for i in range(num_sentences)]
+
+class SplitIntoShardsTestCase(unittest.TestCase):
+    def test_order_preserved(self):
+        sentences = make_sentences(10)
+        for num_shards in range(1, 12):
+            shards = split_into_shards(sentences, num_shards)
+            self.assertEqual(sentences, [tokens for shard in shards for tokens in shard])
+
+    def test_even_sizes(self):
+        shards = split_into_shards(make_sentences(10), 4)
+        self.assertEqual([3, 3, 2, 2], [len(shard) for shard in shards])
+        shards = split_into_shards(make_sentences(9), 3)
+        self.assertEqual([3, 3, 3], [len(shard) for shard in shards])
+
+    def test_more_shards_than_sentences(self):
+        sentences = make_sentences(3)
+        self.assertEqual([[tokens] for tokens in sentences], split_into_shards(sentences, 8))
+
+    def test_single_shard(self):
+        sentences = make_sentences(3)
+        self.assertEqual([sentences], split_into_shards(sentences, 1))
+        self.assertEqual([sentences], split_into_shards(sentences, 0))
+
+    def test_empty(self):
+        # a single empty shard, so the shards still join back to the input
+        self.assertEqual([[]], split_into_shards([], 4))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(SplitIntoShardsTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)
@@ -14,6 +14,11 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import re
+
+# the first stage of the tactics, e.g. "Set Firstorder Depth 1. nltac."
+FIRSTORDER_STAGE_REGEX = re.compile(r'Set Firstorder Depth \d+\.\s+[^.]+\.')
+
 def get_tactics():
     tactics = 'Set Firstorder Depth 1. nltac. Set Firstorder Depth 6. nltac. Qed'
     try:
@@ -23,3 +28,21 @@ def get_tactics():
         pass
     return tactics
 
+
+def get_tactic_stages():
+    """
+    Return the tactics of staged proving, from the cheapest to the full
+    tactics of get_tactics, which are tried only if the cheaper ones fail.
+    The cheap tactics are the first "Set Firstorder Depth N. <tactic>." of
+    the full tactics, closed as they are. Without such a first stage, the
+    full tactics are the only stage.
+    """
+    tactics = get_tactics()
+    first_stage = FIRSTORDER_STAGE_REGEX.match(tactics)
+    if first_stage is None:
+        return [tactics]
+    proof_end = tactics[tactics.rstrip('.').rfind('.') + 1:].strip()
+    cheap_tactics = '{0} {1}'.format(first_stage.group(0), proof_end)
+    if cheap_tactics == tactics:
+        return [tactics]
+    return [cheap_tactics, tactics]
@@ -19,24 +19,76 @@ import ccg2lamp
 
 import codecs
 from collections import OrderedDict
+from concurrent.futures import as_completed, CancelledError, ThreadPoolExecutor
+import bisect
+import heapq
 import itertools
 import logging
 from lxml import etree
 import subprocess
+import threading
+import time
 
 from .coq_analyzer import analyze_coq_output
+from .coq_session import CoqCancelled
+from .coq_session import get_session_pool
+from .coq_session import run_coqtop_process
+from .proof_cache import get_proof_cache
 from .nltk2coq import normalize_interpretation
 from .semantic_types import get_dynamic_library_from_doc
 from .tactics import get_tactics
+from .tactics import get_tactic_stages
 from .normalization import substitute_invalid_chars
 
+# timeout of the cheap tactics before their latencies are known
+CHEAP_TACTICS_TIMEOUT = 10
+# the latencies of coq for the tactics of every stage in this dataset
+TACTIC_LATENCIES = {}
+TACTIC_LATENCIES_LOCK = threading.Lock()
+# the rank of the status of a semantic parse, the lower the better
+SEMANTICS_STATUS_RANKS = {'success': 0, 'partial': 1, 'failed': 2}
+
+class ProverConfig(object):
+    """
+    The options of the prover, given to MasterTheorem.from_doc and passed
+    on to its theorems and to the functions that run their coq scripts.
+    """
+
+    def __init__(self, coq_sessions=0, proof_cache_file=None, prove_workers=1,
+                 staged_tactics=False, ranked_semantics=False, batch_axiom_checks=False):
+        # number of warm coqtop sessions, or 0 to start a coqtop for every script
+        self.coq_sessions = coq_sessions
+        # file of the cache of coqtop outputs, or None to always run coqtop
+        self.proof_cache_file = proof_cache_file
+        # number of scripts proved at the same time, or 1 to prove them one after the other
+        self.prove_workers = prove_workers
+        # try cheap tactics with short timeouts before the full tactics
+        self.staged_tactics = staged_tactics
+        # build the n-best theorems best first, without the failed conclusions
+        self.ranked_semantics = ranked_semantics
+        # check all the candidate axioms of an abduction in a single coq run
+        self.batch_axiom_checks = batch_axiom_checks
+
+    @staticmethod
+    def from_args(args):
+        """the options of the command line of prove.py, the defaults for those missing"""
+        return ProverConfig(
+            coq_sessions=getattr(args, 'coq_sessions', 0),
+            proof_cache_file=getattr(args, 'proof_cache', None),
+            prove_workers=getattr(args, 'coq_workers', 1),
+            staged_tactics=getattr(args, 'staged_tactics', False),
+            ranked_semantics=getattr(args, 'ranked_semantics', False),
+            batch_axiom_checks=getattr(args, 'batch_axiom_checks', False))
+
+DEFAULT_PROVER_CONFIG = ProverConfig()
+
 class Theorem(object):
     """
     Manage a theorem and its variations.
     """
 
     def __init__(self, premises, conclusion, axioms=None, dynamic_library_str='',
-                 is_negated=False):
+                 is_negated=False, config=None):
         self.premises = premises
         self.conclusion = conclusion
         self.axioms = set() if axioms is None else axioms
@@ -49,6 +101,7 @@ class Theorem(object):
         self.failure_log = None
         self.timeout = 100
         self.labels = []
+        self.config = DEFAULT_PROVER_CONFIG if config is None else config
 
     def __repr__(self):
         return self.coq_script
@@ -84,7 +137,7 @@ class Theorem(object):
             is_negated = self.is_negated
         theorem = Theorem(
             new_premises, new_conclusion, new_axioms,
-            self.dynamic_library_str, is_negated=is_negated)
+            self.dynamic_library_str, is_negated=is_negated, config=self.config)
         theorem.doc = self.doc
         theorem.timeout = self.timeout
         self.variations.append(theorem)
@@ -123,7 +176,7 @@ class Theorem(object):
         current_tactics = get_tactics()
         debug_tactics = 'repeat nltac_base. try substitution. Qed'
         coq_script = coq_script.replace(current_tactics, debug_tactics)
-        output_lines = run_coq_script(coq_script, self.timeout)
+        output_lines = run_coq_script(coq_script, self.timeout, config=self.config)
 
         if is_theorem_defined(output_lines):
             if axioms == self.axioms:
@@ -142,15 +195,30 @@ class Theorem(object):
             self.conclusion,
             self.dynamic_library_str,
             self.axioms)
-        self.inference_result = prove_script(self.coq_script, self.timeout)
+        self.inference_result = prove_script(self.coq_script, self.timeout, config=self.config)
         return
 
-    def prove(self, abduction=None):
-        self.prove_simple()
+    def make_coq_scripts(self, tactics=None):
+        """make the scripts of the theorem and of its negation"""
+        return [make_coq_script(self.premises, conclusion,
+                                self.dynamic_library_str, self.axioms, tactics)
+                for conclusion in (self.conclusion, negate_conclusion(self.conclusion))]
+
+    def prove(self, abduction=None, coq_scripts=None, inference_results=None):
+        """
+        Prove the theorem and, if it fails, its negation. The results of
+        make_coq_scripts can be given if they were proved with other theorems.
+        """
+        if coq_scripts is None:
+            coq_scripts, inference_results = prove_scripts_staged(
+                self.make_coq_scripts, self.timeout, self.config)
+        self.coq_script = coq_scripts[0]
+        self.inference_result = inference_results[0]
         self.variations.append(self)
         if self.inference_result is False:
             neg_theorem = self.negate()
-            neg_theorem.prove_simple()
+            neg_theorem.coq_script = coq_scripts[1]
+            neg_theorem.inference_result = inference_results[1]
         if abduction and self.result == 'unknown' and self.doc is not None:
             abduction.attempt(self)
         return
@@ -160,7 +228,18 @@ class Theorem(object):
             return None
         return self.copy([self.conclusion], self.premises[0])
 
-    def to_xml(self):
+    def get_failure_log(self):
+        """analyze why the theorem is not proved, running coq only the first time"""
+        if self.failure_log is None:
+            _, self.failure_log = self.prove_debug()
+        return self.failure_log
+
+    def to_xml(self, failure_logs=True):
+        """
+        Make the XML of the theorem and its variations. If failure_logs,
+        the failure of every unknown variation is analyzed with an extra
+        run of coq, otherwise only the failure logs already known are written.
+        """
         ts_node = etree.Element('theorems')
         if self.labels:
             ts_node.append(make_parser_labels_node(self.labels))
@@ -202,8 +281,10 @@ class Theorem(object):
         for theorem in self.variations:
             t_node = etree.Element('theorem')
             ts_node.append(t_node)
-            if theorem.failure_log is None:
-                _, failure_log = theorem.prove_debug()
+            if failure_logs and theorem.result_simple == 'unknown':
+                failure_log = theorem.get_failure_log()
+            else:
+                failure_log = theorem.failure_log
             t_node.set('inference_result', theorem.result_simple)
             t_node.set('is_negated', str(theorem.is_negated))
             s_node = etree.Element('coq_script')
@@ -287,12 +368,14 @@ def make_coq_formulae(premise_interpretations, conclusion, reverse=False):
     coq_formulae = ' -> '.join(interpretations)
     return coq_formulae
 
-def make_coq_script(premise_interpretations, conclusion, dynamic_library = '', axioms=None):
+def make_coq_script(premise_interpretations, conclusion, dynamic_library = '', axioms=None,
+                    tactics=None):
     # Transform these interpretations into coq format:
     #   interpretation1 -> interpretation2 -> ... -> conclusion
     coq_formulae = make_coq_formulae(premise_interpretations, conclusion)
     # Input these formulae to coq and retrieve the results.
-    tactics = get_tactics()
+    if tactics is None:
+        tactics = get_tactics()
     coq_script = "Require Export coqlib.\n{0}\nTheorem t1: {1}. {2}.".format(
         dynamic_library, coq_formulae, tactics)
     if axioms is not None and len(axioms) > 0:
@@ -300,26 +383,191 @@ def make_coq_script(premise_interpretations, conclusion, dynamic_library = '', a
     coq_script = substitute_invalid_chars(coq_script, ccg2lamp.CCG2LAMP_REPLACEMENT_FILE)
     return coq_script
 
-def prove_script(coq_script, timeout=100):
-    output_lines = run_coq_script(coq_script, timeout)
+def prove_script(coq_script, timeout=100, cancel_event=None, latencies=None,
+                 config=DEFAULT_PROVER_CONFIG):
+    output_lines = run_coq_script(coq_script, timeout, cancel_event, latencies, config)
     return is_theorem_defined(output_lines)
 
-def run_coq_script(coq_script, timeout=100):
+class TacticLatencies(object):
+    """
+    Keep the times coq takes to finish the scripts of some tactics, and
+    derive a timeout from a high percentile of them, so the long tail
+    of a dataset does not hold up the rest.
+    """
+
+    def __init__(self, percentile=95, factor=2.0, min_samples=20, min_timeout=2):
+        self.percentile = percentile
+        self.factor = factor
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+        with self.lock:
+            bisect.insort(self.latencies, latency)
+
+    def get_timeout(self, max_timeout, initial_timeout=None):
+        """the timeout for the next script, at most max_timeout"""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                timeout = max_timeout if initial_timeout is None else initial_timeout
+            else:
+                latency = self.latencies[
+                    int(self.percentile / 100 * (len(self.latencies) - 1))]
+                timeout = max(self.min_timeout, latency * self.factor)
+        return min(timeout, max_timeout)
+
+def get_tactic_latencies(tactics):
+    with TACTIC_LATENCIES_LOCK:
+        if tactics not in TACTIC_LATENCIES:
+            TACTIC_LATENCIES[tactics] = TacticLatencies()
+        return TACTIC_LATENCIES[tactics]
+
+def prove_scripts_staged(make_scripts, timeout=100, config=DEFAULT_PROVER_CONFIG):
+    """
+    Prove the scripts made by make_scripts(tactics), with the cheap tactics
+    of get_tactic_stages first if config.staged_tactics. A stage tries again only
+    the scripts before the first proved one, since those have priority,
+    with a timeout adapted to the latencies of its tactics. Timeouts end a
+    stage early, but only the last stage raises them. Returns the scripts
+    of the last stage each script was tried in, and their results.
+    """
+    if not config.staged_tactics:
+        coq_scripts = make_scripts(None)
+        return coq_scripts, prove_scripts(coq_scripts, timeout, config=config)
+    tactic_stages = get_tactic_stages()
+    coq_scripts, results = None, None
+    for stage_index, tactics in enumerate(tactic_stages):
+        is_last_stage = stage_index == len(tactic_stages) - 1
+        stage_scripts = make_scripts(tactics)
+        if results is None:
+            coq_scripts, results = [None] * len(stage_scripts), [None] * len(stage_scripts)
+        first_proved = next((i for i, result in enumerate(results) if result), len(results))
+        pending = list(range(first_proved))
+        if not pending:
+            break
+        latencies = get_tactic_latencies(tactics)
+        stage_timeout = timeout if is_last_stage else \
+            latencies.get_timeout(timeout, CHEAP_TACTICS_TIMEOUT)
+        stage_results = prove_scripts([stage_scripts[i] for i in pending], stage_timeout,
+                                      raise_timeouts=is_last_stage, latencies=latencies,
+                                      config=config)
+        for script_index, result in zip(pending, stage_results):
+            coq_scripts[script_index] = stage_scripts[script_index]
+            results[script_index] = result
+    return coq_scripts, results
+
+def prove_scripts(coq_scripts, timeout=100, raise_timeouts=True, latencies=None,
+                  config=DEFAULT_PROVER_CONFIG):
+    """
+    Prove scripts in priority order, config.prove_workers at the same time. Once a
+    script is proved, or times out, the scripts after it are not needed, so
+    the running ones are cancelled. Returns the results up to that script,
+    and None for the cancelled scripts. A timeout is raised only if all the
+    scripts before it failed, as if they were proved one after the other,
+    and only if raise_timeouts, otherwise the script just fails.
+    """
+    def prove(coq_script, cancel_event=None):
+        try:
+            return prove_script(coq_script, timeout, cancel_event, latencies, config)
+        except subprocess.TimeoutExpired:
+            if raise_timeouts:
+                raise
+            return False
+
+    results = [None] * len(coq_scripts)
+    if config.prove_workers <= 1:
+        for script_index, coq_script in enumerate(coq_scripts):
+            results[script_index] = prove(coq_script)
+            if results[script_index]:
+                break
+        return results
+
+    cancel_events = [threading.Event() for _ in coq_scripts]
+    errors = [None] * len(coq_scripts)
+    with ThreadPoolExecutor(max_workers=config.prove_workers) as executor:
+        futures = {executor.submit(prove, coq_script, cancel_event): script_index
+                   for script_index, (coq_script, cancel_event) in
+                   enumerate(zip(coq_scripts, cancel_events))}
+        for future in as_completed(futures):
+            script_index = futures[future]
+            try:
+                results[script_index] = future.result()
+            except (CoqCancelled, CancelledError):
+                continue
+            except Exception as e:
+                errors[script_index] = e
+            if results[script_index] or errors[script_index]:
+                for later_future, later_index in futures.items():
+                    if later_index > script_index:
+                        cancel_events[later_index].set()
+                        later_future.cancel()
+    for script_index, error in enumerate(errors):
+        if results[script_index]:
+            break
+        if error is not None:
+            raise error
+    return results
+
+def run_coq_script(coq_script, timeout=100, cancel_event=None, latencies=None,
+                   config=DEFAULT_PROVER_CONFIG):
     """
     Receives coq script of the form:
       Require Export coqlib.
       Parameter ...
       Parameter ...
       Theorem t1 ... <tactics>. Qed.
-    Returns the output lines.
+    Returns the output lines. The times of the coqtop runs that finished
+    are added to latencies.
     """
     coq_script = substitute_invalid_chars(coq_script, ccg2lamp.CCG2LAMP_REPLACEMENT_FILE)
+    if config.proof_cache_file is None:
+        return run_timed_coqtop(coq_script, timeout, cancel_event, latencies, config.coq_sessions)
+    proof_cache = get_proof_cache(config.proof_cache_file, ccg2lamp.CCG2LAMP_COQ_LIB)
+    outcome = proof_cache.get_outcome(coq_script, timeout)
+    if outcome is not None:
+        timed_out, output_lines = outcome
+        if timed_out:
+            raise subprocess.TimeoutExpired(('coqtop',), timeout)
+        return output_lines
     try:
-        output = subprocess.check_output(
-            ('coqtop',),
-            input=coq_script.encode('utf-8'),
-            stderr=subprocess.STDOUT,
-            timeout=timeout)
+        output_lines = run_timed_coqtop(coq_script, timeout, cancel_event, latencies,
+                                        config.coq_sessions)
+    except subprocess.TimeoutExpired:
+        proof_cache.put_timeout(coq_script, timeout)
+        raise
+    # an empty output signals an error of coqtop, which may not happen again
+    if output_lines:
+        proof_cache.put_output(coq_script, output_lines)
+    return output_lines
+
+def run_timed_coqtop(coq_script, timeout=100, cancel_event=None, latencies=None,
+                     coq_sessions=0):
+    """
+    Run coqtop and add the time of the run to latencies if it finished.
+    A timed out run only tells that its script needs more than the time
+    limit, and adding the limit would pull the percentile towards it.
+    """
+    if latencies is None:
+        return run_coqtop(coq_script, timeout, cancel_event, coq_sessions)
+    start_time = time.monotonic()
+    output_lines = run_coqtop(coq_script, timeout, cancel_event, coq_sessions)
+    latencies.add(time.monotonic() - start_time)
+    return output_lines
+
+def run_coqtop(coq_script, timeout=100, cancel_event=None, coq_sessions=0):
+    """run a coq script on one of coq_sessions warm sessions, or on a new coqtop if 0"""
+    if coq_sessions > 0:
+        try:
+            return get_session_pool(coq_sessions).run_script(coq_script, timeout, cancel_event)
+        except subprocess.CalledProcessError as e:
+            logging.error(
+                'Error when running the following script:\n{0}\nMessage was: {1}'.format(
+                coq_script, e))
+            return []
+    try:
+        output = run_coqtop_process(coq_script, timeout, cancel_event)
     except subprocess.CalledProcessError as e:
         logging.error(
             'Error when running the following script:\n{0}\nMessage was: {1}'.format(
@@ -376,15 +624,18 @@ class MasterTheorem(Theorem):
     theorems and build an ensemble of judgements.
     """
 
-    def __init__(self, theorems=None):
-        self.theorems = [] if theorems is None else theorems
+    def __init__(self, theorems=None, config=None):
+        # the theorems built so far, and those still to be built, in n-best order
+        self.theorems = []
+        self.pending_theorems = iter(() if theorems is None else theorems)
         self.doc = None
         self.inference_result = None
         self.failure_log = None
         self.timeout = 100
+        self.config = DEFAULT_PROVER_CONFIG if config is None else config
 
     def __repr__(self):
-        return '\n'.join(t.coq_script for t in self.theorems)
+        return '\n'.join(t.coq_script for t in self.iter_theorems())
 
     def __hash__(self):
         return hash(self.__repr__())
@@ -396,63 +647,145 @@ class MasterTheorem(Theorem):
     def from_doc(doc, args=None):
         """
         Build multiple theorems from an XML document produced by semparse.py script.
+        The theorems are only built when they are needed, see iter_theorems.
+        The options of the prover are taken from args, see ProverConfig.from_args.
         """
         use_gold_trees = False if args is None else args.gold_trees
         timeout = 100 if args is None else args.timeout
-        theorems = []
-        for semantics in generate_semantics_from_doc(doc, 100, use_gold_trees):
-            formulas = [sem.xpath('./span[1]/@sem')[0] for sem in semantics]
-            assert formulas and len(formulas) > 1
-            dynamic_library_str, formulas = get_dynamic_library_from_doc(doc, semantics)
-            premises, conclusion = formulas[:-1], formulas[-1]
-            theorem = Theorem(premises, conclusion, set(), dynamic_library_str)
-            labels = [(s.get('ccg_id', None), s.get('ccg_parser', None)) for s in semantics]
-            theorem.labels = labels
-            theorem.doc = doc
-            theorem.timeout = timeout
-            theorems.append(theorem)
-        master_theorem = MasterTheorem(theorems)
+        config = ProverConfig.from_args(args)
+        master_theorem = MasterTheorem(
+            generate_theorems_from_doc(doc, 100, use_gold_trees, timeout, config), config)
         master_theorem.timeout = timeout
         return master_theorem
 
+    def iter_theorems(self):
+        """
+        Iterate over the theorems in n-best order, building the next ones
+        only when the iteration reaches them.
+        """
+        yield from self.theorems
+        for theorem in self.pending_theorems:
+            self.theorems.append(theorem)
+            yield theorem
+
     def prove(self, abduction=None):
-        for theorem in self.theorems:
-            theorem.prove(abduction)
-            if theorem.result != 'unknown':
-                break
-        return
+        if self.config.prove_workers <= 1:
+            for theorem in self.iter_theorems():
+                theorem.prove(abduction)
+                if theorem.result != 'unknown':
+                    break
+            return
+        # prove the theorems and their negations at the same time, in n-best order,
+        # building the theorems of a batch only if the previous ones are unknown
+        theorems = self.iter_theorems()
+        while True:
+            batch = list(itertools.islice(theorems, self.config.prove_workers))
+            if not batch:
+                return
+            def make_coq_scripts(tactics):
+                return [coq_script for theorem in batch
+                        for coq_script in theorem.make_coq_scripts(tactics)]
+            coq_scripts, inference_results = prove_scripts_staged(
+                make_coq_scripts, self.timeout, self.config)
+            for theorem_index, theorem in enumerate(batch):
+                theorem.prove(abduction, coq_scripts[2 * theorem_index:2 * theorem_index + 2],
+                              inference_results[2 * theorem_index:2 * theorem_index + 2])
+                if theorem.result != 'unknown':
+                    return
 
     @property
     def result(self):
+        # the theorems not built yet were not proved
         for theorem in self.theorems:
             if theorem.result != 'unknown':
                 return theorem.result
         return 'unknown'
 
     def get_best_theorem(self):
-        if not self.theorems:
-            return None
         for theorem in self.theorems:
             if theorem.result != 'unknown':
                 return theorem
-        return self.theorems[0]
+        return next(self.iter_theorems(), None)
 
-    def to_xml_(self):
+    def to_xml_(self, failure_logs=True):
         theorem = self.get_best_theorem()
         if not theorem:
             ts_node = etree.Element('theorems')
         else:
-            ts_node = theorem.to_xml()
+            ts_node = theorem.to_xml(failure_logs)
         return ts_node
 
-    def to_xml(self):
+    def to_xml(self, failure_logs=True):
         mt_node = etree.Element('master_theorem')
-        for theorem in self.theorems:
-            mt_node.append(theorem.to_xml())
+        for theorem in self.iter_theorems():
+            mt_node.append(theorem.to_xml(failure_logs))
         return mt_node
 
 
-def generate_semantics_from_doc(doc, max_gen=1, use_gold_trees=False, min_sentences=2):
+def get_semantics_cost(sentence, semantics, nbest_index):
+    """
+    The cost of a semantic parse of a sentence, to rank the n-best theorems:
+    its status, then the score of its CCG tree if the parser gave one (the
+    higher the better), then its n-best position.
+    """
+    status_rank = SEMANTICS_STATUS_RANKS.get(
+        semantics.get('status', 'failed'), len(SEMANTICS_STATUS_RANKS))
+    scores = sentence.xpath('./ccg[@id=$ccg_id]/@score', ccg_id=semantics.get('ccg_id', ''))
+    try:
+        score = float(scores[0]) if scores else 0.0
+    except ValueError:
+        score = 0.0
+    return (status_rank, -score, nbest_index)
+
+def generate_ranked_combinations(cost_lists):
+    """
+    Generate the combinations of one item of every list in increasing order
+    of their summed costs, given lists of (cost, item) where costs are
+    tuples of numbers. A heap holds the next candidates of the combinations
+    generated so far, so the product of the lists is never materialized.
+    """
+    sorted_lists = [sorted(cost_list, key=lambda cost_item: cost_item[0])
+                    for cost_list in cost_lists]
+    if not sorted_lists or not all(sorted_lists):
+        return
+
+    def get_total_cost(indices):
+        costs = [sorted_list[index][0] for sorted_list, index in zip(sorted_lists, indices)]
+        return tuple(map(sum, zip(*costs)))
+
+    start = (0,) * len(sorted_lists)
+    heap = [(get_total_cost(start), start)]
+    while heap:
+        _, indices = heapq.heappop(heap)
+        yield tuple(sorted_list[index][1] for sorted_list, index in zip(sorted_lists, indices))
+        # a combination is only reached from the one with its last non-zero index decreased
+        last_increased = max([i for i, index in enumerate(indices) if index > 0], default=0)
+        for list_index in range(last_increased, len(indices)):
+            if indices[list_index] + 1 < len(sorted_lists[list_index]):
+                next_indices = indices[:list_index] + (indices[list_index] + 1,) + indices[list_index + 1:]
+                heapq.heappush(heap, (get_total_cost(next_indices), next_indices))
+
+def generate_theorems_from_doc(doc, max_gen=1, use_gold_trees=False, timeout=100,
+                               config=DEFAULT_PROVER_CONFIG):
+    """
+    Build the theorem of every combination of semantic interpretations
+    given by generate_semantics_from_doc, one at a time.
+    """
+    for semantics in generate_semantics_from_doc(doc, max_gen, use_gold_trees,
+                                                 ranked=config.ranked_semantics):
+        formulas = [sem.xpath('./span[1]/@sem')[0] for sem in semantics]
+        assert formulas and len(formulas) > 1
+        dynamic_library_str, formulas = get_dynamic_library_from_doc(doc, semantics)
+        premises, conclusion = formulas[:-1], formulas[-1]
+        theorem = Theorem(premises, conclusion, set(), dynamic_library_str, config=config)
+        labels = [(s.get('ccg_id', None), s.get('ccg_parser', None)) for s in semantics]
+        theorem.labels = labels
+        theorem.doc = doc
+        theorem.timeout = timeout
+        yield theorem
+
+def generate_semantics_from_doc(doc, max_gen=1, use_gold_trees=False, min_sentences=2,
+                                ranked=False):
     """
     Returns string representations of logical formulas,
     as stored in the "sem" attribute of the root node
@@ -460,6 +793,8 @@ def generate_semantics_from_doc(doc, max_gen=1, use_gold_trees=False, min_senten
     If a premise has no semantic representation, it is ignored.
     If there are no semantic representation at all, or the conclusion
     has no semantic representation, it returns None to signal an error.
+    If ranked, the combinations are generated by increasing
+    get_semantics_cost and the failed conclusions are skipped.
     """
     sentences = doc.xpath('./sentences/sentence')
     # There are not enough correctly parsed sentences to form a theorem.
@@ -479,12 +814,23 @@ def generate_semantics_from_doc(doc, max_gen=1, use_gold_trees=False, min_senten
                         sentence.attrib, semantics[gold_ind].attrib))
                 semantics = [semantics[gold_ind]]
         semantics_lists.append(semantics)
+    if ranked:
+        # a failed conclusion cannot be proved from any premises
+        semantics_lists[-1] = [sem for sem in semantics_lists[-1]
+                               if sem.get('status', 'failed') != 'failed']
     # Case: the conclusion has no semantic interpretations.
     if len(semantics_lists[-1]) == 0:
         return
 
+    if ranked:
+        combinations = generate_ranked_combinations(
+            [[(get_semantics_cost(sentence, sem, nbest_index), sem)
+              for nbest_index, sem in enumerate(semantics)]
+             for sentence, semantics in zip(sentences, semantics_lists)])
+    else:
+        combinations = itertools.product(*semantics_lists)
     i = 0
-    for sems in itertools.product(*semantics_lists):
+    for sems in combinations:
         assert all(sem.xpath('./span[1]/@sem') for sem in sems)
         # from pudb import set_trace; set_trace()
         if i >= max_gen:
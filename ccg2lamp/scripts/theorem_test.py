@@ -0,0 +1,296 @@
+"""Tests of the n-best theorems and of the order they are proved in"""
+import itertools
+import random
+import subprocess
+import threading
+import time
+import unittest
+
+from . import tactics
+from . import theorem
+from .coq_session import CoqCancelled
+from .logic_parser import lexpr
+from .theorem import generate_ranked_combinations, MasterTheorem, prove_scripts, Theorem
+from .theorem import ProverConfig
+from .theorem import run_timed_coqtop, TacticLatencies
+from .tactics import get_tactic_stages
+
+def get_total_cost(combination, costs):
+    return tuple(map(sum, zip(*[costs[item] for item in combination])))
+
+def sort_product(cost_lists):
+    """the combinations of itertools.product, sorted by their summed costs"""
+    costs = {item: cost for cost_list in cost_lists for cost, item in cost_list}
+    combinations = itertools.product(*[[item for _, item in cost_list] for cost_list in cost_lists])
+    return sorted(combinations, key=lambda combination: get_total_cost(combination, costs)), costs
+
+class GenerateRankedCombinationsTestCase(unittest.TestCase):
+    def assert_same_as_sorted_product(self, cost_lists):
+        expected, costs = sort_product(cost_lists)
+        combinations = list(generate_ranked_combinations(cost_lists))
+        # combinations of the same cost may come in any order
+        self.assertEqual([get_total_cost(c, costs) for c in expected],
+                         [get_total_cost(c, costs) for c in combinations])
+        self.assertEqual(sorted(expected), sorted(combinations))
+
+    def test_distinct_costs(self):
+        # every item has its own power of two, so no two combinations cost the same
+        cost_lists = [[((2 ** (3 * i + j),), f"s{i}_{j}") for j in (2, 0, 1)] for i in range(3)]
+        expected, _ = sort_product(cost_lists)
+        self.assertEqual(expected, list(generate_ranked_combinations(cost_lists)))
+
+    def test_random_costs(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            cost_lists = [[((rng.randint(0, 2), rng.random(), j), f"s{i}_{j}")
+                           for j in range(rng.randint(1, 4))]
+                          for i in range(rng.randint(1, 4))]
+            self.assert_same_as_sorted_product(cost_lists)
+
+    def test_ties(self):
+        cost_lists = [[((0,), f"s{i}_{j}") for j in range(3)] for i in range(3)]
+        self.assert_same_as_sorted_product(cost_lists)
+
+    def test_empty(self):
+        self.assertEqual([], list(generate_ranked_combinations([])))
+        self.assertEqual([], list(generate_ranked_combinations([[((0,), 'a')], []])))
+
+class FakeTheorem(object):
+    def __init__(self, result):
+        self.final_result = result
+        self.result = 'unknown'
+
+    def make_coq_scripts(self, tactics):
+        return [(self, False), (self, True)]
+
+    def prove(self, abduction=None, coq_scripts=None, inference_results=None):
+        self.result = self.final_result
+
+class MasterTheoremLazyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.prove_scripts_staged = theorem.prove_scripts_staged
+        self.built = []
+
+    def tearDown(self):
+        theorem.prove_scripts_staged = self.prove_scripts_staged
+
+    def generate_theorems(self, results):
+        for result in results:
+            fake_theorem = FakeTheorem(result)
+            self.built.append(fake_theorem)
+            yield fake_theorem
+
+    def test_sequential(self):
+        master_theorem = MasterTheorem(self.generate_theorems(['unknown', 'yes', 'no', 'no']),
+                                       ProverConfig(prove_workers=1))
+        master_theorem.prove()
+        self.assertEqual('yes', master_theorem.result)
+        self.assertEqual(2, len(self.built))
+        self.assertIs(self.built[1], master_theorem.get_best_theorem())
+        # the XML still has every theorem
+        self.assertEqual(4, len(list(master_theorem.iter_theorems())))
+
+    def test_parallel(self):
+        batches = []
+        def prove_scripts_staged(make_coq_scripts, timeout=100, config=None):
+            coq_scripts = make_coq_scripts(None)
+            batches.append(coq_scripts)
+            return coq_scripts, [None] * len(coq_scripts)
+        theorem.prove_scripts_staged = prove_scripts_staged
+        master_theorem = MasterTheorem(
+            self.generate_theorems(['unknown', 'unknown', 'no', 'yes', 'yes', 'yes']),
+            ProverConfig(prove_workers=2))
+        master_theorem.prove()
+        self.assertEqual('no', master_theorem.result)
+        self.assertEqual(4, len(self.built))
+        self.assertEqual([4, 4], [len(batch) for batch in batches])
+
+    def test_no_theorem(self):
+        master_theorem = MasterTheorem(self.generate_theorems([]))
+        master_theorem.prove()
+        self.assertEqual('unknown', master_theorem.result)
+        self.assertIsNone(master_theorem.get_best_theorem())
+
+class FakeCoqtop(object):
+    """
+    Stands for theorem.run_coqtop: a script is proved, fails or times out
+    after a delay, as given by the first (substring, outcome, delay) of
+    outcomes found in the script. A cancelled script stops waiting.
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.started = []
+        self.cancelled = []
+        self.lock = threading.Lock()
+
+    def __call__(self, coq_script, timeout=100, cancel_event=None, coq_sessions=0):
+        outcome, delay = next((outcome, delay) for substring, outcome, delay in self.outcomes
+                              if substring in coq_script)
+        with self.lock:
+            self.started.append(coq_script)
+        if cancel_event is None:
+            time.sleep(delay)
+        elif cancel_event.wait(delay):
+            with self.lock:
+                self.cancelled.append(coq_script)
+            raise CoqCancelled()
+        if outcome == 'timeout':
+            raise subprocess.TimeoutExpired(('coqtop',), timeout)
+        return ['t1 is defined'] if outcome == 'proved' else ['Error: incomplete proof']
+
+class FakeCoqtopTestCase(unittest.TestCase):
+    def setUp(self):
+        self.run_coqtop = theorem.run_coqtop
+
+    def tearDown(self):
+        theorem.run_coqtop = self.run_coqtop
+
+    def fake_coqtop(self, outcomes):
+        theorem.run_coqtop = FakeCoqtop(outcomes)
+        return theorem.run_coqtop
+
+class ProveScriptsTestCase(FakeCoqtopTestCase):
+    def prove(self, outcomes, prove_workers=3, raise_timeouts=True):
+        fake_coqtop = self.fake_coqtop(
+            [(f"script{i}", outcome, delay) for i, (outcome, delay) in enumerate(outcomes)])
+        start_time = time.monotonic()
+        results = prove_scripts([f"script{i}" for i in range(len(outcomes))],
+                                raise_timeouts=raise_timeouts,
+                                config=ProverConfig(prove_workers=prove_workers))
+        self.assertLess(time.monotonic() - start_time, 2)
+        return results, fake_coqtop
+
+    def test_first_proved_wins(self):
+        # the third script is proved first, but the second one has priority
+        results, _ = self.prove([('failed', 0.2), ('proved', 0.1), ('proved', 0.01)])
+        self.assertEqual([False, True, True], results)
+
+    def test_later_scripts_cancelled(self):
+        results, fake_coqtop = self.prove([('failed', 0.05), ('proved', 0.1), ('failed', 5)])
+        self.assertEqual([False, True, None], results)
+        self.assertEqual(['script2'], fake_coqtop.cancelled)
+
+    def test_later_scripts_not_started(self):
+        results, fake_coqtop = self.prove(
+            [('proved', 0.05), ('failed', 5), ('failed', 5), ('failed', 5)], prove_workers=2)
+        self.assertEqual([True, None, None, None], results)
+        # the worker of the proved script may start the next one before it is cancelled
+        self.assertNotIn('script3', fake_coqtop.started)
+        self.assertEqual(set(fake_coqtop.started[1:]), set(fake_coqtop.cancelled))
+
+    def test_sequential(self):
+        results, fake_coqtop = self.prove(
+            [('failed', 0), ('proved', 0), ('proved', 0)], prove_workers=1)
+        self.assertEqual([False, True, None], results)
+        self.assertEqual(['script0', 'script1'], fake_coqtop.started)
+
+    def test_raise_timeouts(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.prove([('failed', 0.05), ('timeout', 0.01), ('failed', 5)])
+
+    def test_timeout_after_proved(self):
+        # the timeout does not matter, since a script before it is proved
+        results, _ = self.prove([('proved', 0.1), ('timeout', 0.01)])
+        self.assertEqual([True, None], results)
+
+    def test_no_raise_timeouts(self):
+        results, _ = self.prove([('timeout', 0.01), ('proved', 0.05)], raise_timeouts=False)
+        self.assertEqual([False, True], results)
+
+class MasterTheoremProveTestCase(FakeCoqtopTestCase):
+    def make_master_theorem(self, prove_workers):
+        config = ProverConfig(prove_workers=prove_workers)
+        premises = [lexpr('exists x. _dog(x)')]
+        return MasterTheorem((Theorem(premises, lexpr(f"exists x. {predicate}(x)"), config=config)
+                              for predicate in ('_first', '_second', '_third')), config)
+
+    def test_parallel(self):
+        # the negation of the second theorem is proved, the third one is proved sooner
+        outcomes = [('(not (exists x, (_second', 'proved', 0.1),
+                    ('_third', 'proved', 0.01),
+                    ('', 'failed', 0.05)]
+        for prove_workers in (1, 2, 6):
+            fake_coqtop = self.fake_coqtop(outcomes)
+            master_theorem = self.make_master_theorem(prove_workers)
+            master_theorem.prove()
+            self.assertEqual('no', master_theorem.result)
+            self.assertEqual(lexpr('exists x. _second(x)'),
+                             master_theorem.get_best_theorem().conclusion)
+            # the third theorem is only tried if it is in the batch of the second one
+            third_started = any('_third' in script for script in fake_coqtop.started)
+            self.assertEqual(prove_workers >= 3, third_started)
+
+    def test_timeout(self):
+        self.fake_coqtop([('_first', 'timeout', 0.01), ('', 'proved', 0.05)])
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.make_master_theorem(6).prove()
+
+class TacticLatenciesTestCase(FakeCoqtopTestCase):
+    def test_initial_timeout(self):
+        latencies = TacticLatencies(min_samples=3)
+        for latency in (1, 2):
+            latencies.add(latency)
+        self.assertEqual(10, latencies.get_timeout(100, 10))
+        self.assertEqual(100, latencies.get_timeout(100))
+        self.assertEqual(5, latencies.get_timeout(5, 10))
+
+    def test_percentile(self):
+        latencies = TacticLatencies(percentile=90, factor=2.0, min_samples=10, min_timeout=2)
+        for latency in (10, 9, 8, 7, 6, 5, 4, 3, 2, 1):
+            latencies.add(latency)
+        # the 90th percentile of 10 samples is the 9th smallest
+        self.assertEqual(18, latencies.get_timeout(100, 10))
+        self.assertEqual(15, latencies.get_timeout(15, 10))
+
+    def test_min_timeout(self):
+        latencies = TacticLatencies(min_samples=2, min_timeout=2)
+        for latency in (0.1, 0.2):
+            latencies.add(latency)
+        self.assertEqual(2, latencies.get_timeout(100))
+
+    def test_timeouts_not_added(self):
+        latencies = TacticLatencies()
+        self.fake_coqtop([('slow', 'timeout', 0.05), ('', 'proved', 0)])
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_timed_coqtop('slow script', 0.05, latencies=latencies)
+        self.assertEqual([], latencies.latencies)
+        run_timed_coqtop('fast script', 0.05, latencies=latencies)
+        self.assertEqual(1, len(latencies.latencies))
+
+class TacticStagesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.get_tactics = tactics.get_tactics
+
+    def tearDown(self):
+        tactics.get_tactics = self.get_tactics
+
+    def get_stages(self, full_tactics):
+        tactics.get_tactics = lambda: full_tactics
+        return get_tactic_stages()
+
+    def test_first_depth_stage(self):
+        full_tactics = 'Set Firstorder Depth 1. nltac. Set Firstorder Depth 6. nltac. Qed'
+        self.assertEqual(['Set Firstorder Depth 1. nltac. Qed', full_tactics],
+                         self.get_stages(full_tactics))
+
+    def test_other_tactics(self):
+        full_tactics = ('Set Firstorder Depth 2. nltac_final. nltac_set; nltac_final. '
+                        'Set Firstorder Depth 3. nltac_final. Qed.')
+        self.assertEqual(['Set Firstorder Depth 2. nltac_final. Qed.', full_tactics],
+                         self.get_stages(full_tactics))
+
+    def test_single_stage(self):
+        for full_tactics in ('nltac. Qed', 'Set Firstorder Depth 1. nltac. Qed',
+                             'nltac. Set Firstorder Depth 1. nltac. Qed'):
+            self.assertEqual([full_tactics], self.get_stages(full_tactics))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(GenerateRankedCombinationsTestCase)
+    suite2 = unittest.TestLoader().loadTestsFromTestCase(MasterTheoremLazyTestCase)
+    suite3 = unittest.TestLoader().loadTestsFromTestCase(ProveScriptsTestCase)
+    suite4 = unittest.TestLoader().loadTestsFromTestCase(MasterTheoremProveTestCase)
+    suite5 = unittest.TestLoader().loadTestsFromTestCase(TacticLatenciesTestCase)
+    suite6 = unittest.TestLoader().loadTestsFromTestCase(TacticStagesTestCase)
+    suites = unittest.TestSuite([suite1, suite2, suite3, suite4, suite5, suite6])
+    unittest.TextTestRunner(verbosity=2).run(suites)
@@ -6,7 +6,7 @@ import re
 
 from .ccg2lambda_tools import build_ccg_tree
 from lxml import etree
-from .semantic_index import find_node_by_id
+from .semantic_index import find_node_by_id, index_nodes_by_id, index_tree_by_id
 
 kUpwardsTree = True
 kDisplaySemantics = True
@@ -158,7 +158,8 @@ def convert_doc_to_latex(doc, verbatim_strings = [], use_gold_trees=False):
     for i in range(len(ccg_trees)):
         sentence_surface = ' '.join(tokens[i].xpath('token/@surf'))
         latex_str += "\n\n\\vspace{2em}\n\n\\noindent\n" + sentence_ids[i] + sentence_surface + "\n\n\medskip\n\n" \
-                    + convert_node_to_latex(ccg_trees[i], sem_trees[i], tokens[i])
+                    + convert_node_to_latex(ccg_trees[i], index_tree_by_id(sem_trees[i]),
+                                            index_nodes_by_id(tokens[i]))
 
     verbatim_text = ""
     if verbatim_strings:
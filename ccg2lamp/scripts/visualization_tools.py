@@ -23,7 +23,7 @@ from lxml import etree
 
 from .ccg2lambda_tools import build_ccg_tree
 from .knowledge import get_tokens_from_xml_node
-from .semantic_index import find_node_by_id
+from .semantic_index import find_node_by_id, index_nodes_by_id, index_tree_by_id
 
 kUpwardsTree = True
 kDisplaySemantics = True
@@ -196,11 +196,11 @@ def convert_doc_to_mathml(doc, use_gold_trees=False):
                 ccg_tree_id += " (gold)"
             sem_tree = None if i >= len(sem_trees) else sem_trees[i]
             if sem_tree is not None:
-                sem_tree = build_ccg_tree(sem_tree)
+                sem_tree = index_tree_by_id(build_ccg_tree(sem_tree))
             mathml_str += "<p>{0}, tree {1}: {2}</p>\n".format(
                             sentence_label, ccg_tree_id, sentence_text) \
                         + "<math xmlns='http://www.w3.org/1998/Math/MathML'>\n" \
-                        + convert_node_to_mathml(ccg_tree, sem_tree, tokens) \
+                        + convert_node_to_mathml(ccg_tree, sem_tree, index_nodes_by_id(tokens)) \
                         + "</math>\n"
     verbatim_strings = doc.xpath('./proof/master_theorem/theorems/theorem/coq_script/text()')
     verbatim_text = ""
@@ -279,7 +279,8 @@ def convert_doc_to_mathml_(doc, verbatim_strings = [], use_gold_trees=False):
         sentence_surface = ' '.join(tokens[i].xpath('token/@surf'))
         mathml_str += "<p>" + sentence_ids[i] + sentence_surface + "</p>\n" \
                     + "<math xmlns='http://www.w3.org/1998/Math/MathML'>" \
-                    + convert_node_to_mathml(ccg_trees[i], sem_trees[i], tokens[i]) \
+                    + convert_node_to_mathml(ccg_trees[i], index_tree_by_id(sem_trees[i]),
+                                             index_nodes_by_id(tokens[i])) \
                     + "</math>"
 
     verbatim_text = ""
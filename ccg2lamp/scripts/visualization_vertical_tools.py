@@ -8,7 +8,7 @@ from lxml import etree
 from nltk.sem.logic import *
 
 from .ccg2lambda_tools import build_ccg_tree
-from .semantic_index import find_node_by_id
+from .semantic_index import find_node_by_id, index_nodes_by_id, index_tree_by_id
 
 ## Conversion to vertical notation
 from .logic_parser import lexpr
@@ -172,7 +172,8 @@ def convert_vertical_to_mathml(doc, verbatim_strings = [], use_gold_trees=False)
         sentence_surface = ' '.join(tokens[i].xpath('token/@surf'))
         mathml_str += "<p>" + sentence_ids[i] + sentence_surface + "</p>\n" \
                     + "<math xmlns='http://www.w3.org/1998/Math/MathML'>" \
-                    + convert_node_to_mathml(ccg_trees[i], sem_trees[i], tokens[i]) \
+                    + convert_node_to_mathml(ccg_trees[i], index_tree_by_id(sem_trees[i]),
+                                             index_nodes_by_id(tokens[i])) \
                     + "</math>"
 
     verbatim_text = ""
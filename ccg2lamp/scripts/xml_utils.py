@@ -13,10 +13,64 @@ def serialize_tree(tree, encoding='utf-8'):
         tree, xml_declaration=True, encoding=encoding, pretty_print=True)
     return tree_str
 
+# the elements above this depth (root, document, sentences) are written
+# one child at a time, so a corpus is never serialized as a whole
+STREAM_DEPTH = 3
+
+def can_stream_element(element):
+    """an element with only element children and no text can be written child by child"""
+    return (len(element) > 0
+            and not element.text
+            and not element.nsmap
+            and all(isinstance(child.tag, str) and not child.tail for child in element))
+
+def can_stream_tree(root):
+    """the root must also have nothing around it, as a doctype or a stylesheet"""
+    tree = root.getroottree()
+    return (can_stream_element(root)
+            and not root.tail
+            and not tree.docinfo.doctype
+            and root.getprevious() is None
+            and root.getnext() is None)
+
+def write_element_stream(xml_file, element, pretty_print=True, depth=0):
+    """
+    Write an element with etree.xmlfile, one child at a time above
+    STREAM_DEPTH. With pretty_print, the elements streamed are written one
+    tag per line and each child below STREAM_DEPTH is indented on its own.
+    """
+    if depth >= STREAM_DEPTH or not can_stream_element(element):
+        xml_file.write(element, pretty_print=pretty_print)
+        return
+    with xml_file.element(element.tag, attrib=dict(element.attrib)):
+        if pretty_print:
+            xml_file.write("\n")
+        for child in element:
+            write_element_stream(xml_file, child, pretty_print, depth + 1)
+    # nothing can be written after the root, its line ends outside of xml_file
+    if pretty_print and depth > 0:
+        xml_file.write("\n")
+
 @time_count
-def serialize_tree_to_file(tree_xml, fname, encoding='utf-8'):
-    root_xml_str = serialize_tree(tree_xml, encoding)
+def serialize_tree_to_file(tree_xml, fname, encoding='utf-8', pretty_print=True):
+    """
+    Write a tree with an XML declaration. The root, the documents and their
+    sentences are written one child at a time by etree.xmlfile, so a corpus
+    is never held in memory as one string, but each child below STREAM_DEPTH
+    (e.g. a sentence) is serialized whole. The indentation of pretty_print
+    starts over at each of these children.
+    """
+    root = tree_xml.getroot() if isinstance(tree_xml, etree._ElementTree) else tree_xml
+    if not can_stream_tree(root):
+        root_xml_str = etree.tostring(
+            tree_xml, xml_declaration=True, encoding=encoding, pretty_print=pretty_print)
+        with codecs.open(fname, 'wb') as fout:
+            fout.write(root_xml_str + b"\n")
+        return
     with codecs.open(fname, 'wb') as fout:
-        fout.write(root_xml_str + b"\n")
+        with etree.xmlfile(fout, encoding=encoding) as xml_file:
+            xml_file.write_declaration()
+            write_element_stream(xml_file, root, pretty_print)
+        if pretty_print:
+            fout.write(b"\n")
     return
-
@@ -0,0 +1,101 @@
+"""Tests of the streaming XML writer"""
+import os
+import tempfile
+import unittest
+
+from lxml import etree
+
+from .xml_utils import deserialize_file_to_tree, serialize_tree_to_file
+
+def make_corpus(num_documents=2, num_sentences=3):
+    """a corpus without blank text, as the pipelines read it"""
+    root = etree.Element('root')
+    for doc_index in range(num_documents):
+        document = etree.SubElement(root, 'document', id=f"d{doc_index}")
+        sentences = etree.SubElement(document, 'sentences')
+        for sent_index in range(num_sentences):
+            sentence = etree.SubElement(sentences, 'sentence', id=f"s{sent_index}")
+            tokens = etree.SubElement(sentence, 'tokens')
+            etree.SubElement(tokens, 'token', base="café", surf="a>b&c")
+            etree.SubElement(sentence, 'ccg', root="sp0")
+        proof = etree.SubElement(document, 'proof', status="success")
+        theorem = etree.SubElement(proof, 'theorem')
+        # a coq script keeps its line breaks and is not indented
+        theorem.text = "Require Export coqlib.\nTheorem t1: True.\n  trivial.\nQed."
+        etree.SubElement(document, 'empty')
+    return etree.ElementTree(root)
+
+class SerializeTreeToFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.xml_file = os.path.join(self.tmp_dir.name, "out.xml")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, tree, **kwargs):
+        serialize_tree_to_file(tree, self.xml_file, **kwargs)
+        with open(self.xml_file, 'rb') as fin:
+            return fin.read()
+
+    def assert_same_tree(self, tree, encoding='utf-8'):
+        before = etree.tostring(tree)
+        output = self.write(tree, encoding=encoding)
+        declaration = "<?xml version='1.0' encoding='{0}'?>\n".format(encoding).encode(encoding)
+        self.assertTrue(output.startswith(declaration))
+        self.assertTrue(output.endswith(b"</root>\n"))
+        self.assertEqual(before, etree.tostring(deserialize_file_to_tree(self.xml_file)))
+        # the tree is left as it was
+        self.assertEqual(before, etree.tostring(tree))
+        return output
+
+    def assert_same_as_tostring(self, tree, encoding='utf-8'):
+        expected = etree.tostring(
+            tree, xml_declaration=True, encoding=encoding, pretty_print=True) + b"\n"
+        self.assertEqual(expected, self.write(tree, encoding=encoding))
+
+    def test_multiple_documents(self):
+        output = self.assert_same_tree(make_corpus())
+        # the streamed elements take a line each, the sentences are indented on their own
+        self.assertIn(b'<sentences>\n<sentence id="s0">\n  <tokens>\n    <token ', output)
+        self.assertIn(b'</sentence>\n</sentences>\n<proof status="success">\n<theorem>', output)
+        self.assertIn(b'<empty/>\n</document>\n<document id="d1">\n', output)
+
+    def test_single_document_many_sentences(self):
+        self.assert_same_tree(make_corpus(num_documents=1, num_sentences=20))
+
+    def test_encoding(self):
+        self.assert_same_tree(make_corpus(), encoding='UTF-8')
+
+    def test_root_element(self):
+        tree = make_corpus()
+        self.assertEqual(self.write(tree), self.write(tree.getroot()))
+
+    def test_mixed_content_is_not_split(self):
+        tree = make_corpus()
+        sentences = tree.getroot()[0][0]
+        sentences.text = "text"
+        sentences[0].tail = "tail"
+        output = self.assert_same_tree(tree)
+        self.assertIn(b'<sentences>text<sentence id="s0">', output)
+
+    def test_tree_with_blank_text(self):
+        tree = etree.ElementTree(etree.fromstring("<root>\n <document/>\n <document/>\n</root>"))
+        self.assert_same_as_tostring(tree)
+
+    def test_stylesheet(self):
+        tree = etree.ElementTree(etree.fromstring(
+            '<?xml-stylesheet type="text/xsl" href="a.xsl"?><root><document/></root>'))
+        self.assert_same_as_tostring(tree)
+
+    def test_no_pretty_print(self):
+        tree = make_corpus()
+        output = self.write(tree, pretty_print=False)
+        self.assertTrue(output.startswith(b"<?xml version='1.0' encoding='utf-8'?>"))
+        self.assertNotIn(b"\n  <", output)
+        self.assertEqual(etree.tostring(tree), etree.tostring(etree.fromstring(output)))
+
+if __name__ == '__main__':
+    suite1 = unittest.TestLoader().loadTestsFromTestCase(SerializeTreeToFileTestCase)
+    suites = unittest.TestSuite([suite1])
+    unittest.TextTestRunner(verbosity=2).run(suites)